@@ -1,22 +1,46 @@
 from flask import Flask, request, make_response
 from flask_cors import CORS
+from werkzeug.middleware.proxy_fix import ProxyFix
 from utils.tokens import JsonWebToken
 from utils.requests import (
     getLoginCredentialsFromRequest,
     getRegisterCredentialsFromRequest,
+    getTokensFromRequestBody,
+    getUserIdsFromRequestBody,
 )
-from utils.hash import checkPasswordMatchesHash, hash
+from utils.hash import (
+    checkPasswordMatchesHash,
+    configureWorkFactor,
+    getWorkFactor,
+    hash,
+    needsRehash
+)
+from utils.hash_pool import HashWorkerPool, HashPoolFullError
 from db.token_storage import TokenStorage
-from db.user_storage import UserStorage
+from db.user_storage import UserStorage, UserAlreadyExistsError
+from utils.revocation import RevocationList
+from utils.rate_limit import (
+    RateLimiter,
+    InMemoryBucketStore,
+    DynamoDBBucketStore
+)
 from middleware.tokens import (
     authTokenRequired,
     refreshTokenRequired,
     validateRefreshToken,
-    allowExpiredAccessToken
+    allowExpiredAccessToken,
+    revokeAccessTokens
+)
+from middleware.requests import (
+    addRequestSenderDataToContext,
+    rateLimited,
+    serviceSecretRequired
 )
-from middleware.requests import addRequestSenderDataToContext
+from hashlib import sha256
 import os
 import json
+import tempfile
+import time
 
 # Create a new Flask app
 app = Flask(__name__)
@@ -27,23 +51,133 @@ allowed_origins = os.environ.get("ALLOWED_ORIGINS") or "*"
 # Set up CORS
 CORS(app, resources={r"/*": {"origins": allowed_origins}})
 
+# trust the X-Forwarded-For entries added by this many proxies, such as the
+# load balancer, so request.remote_addr is the client's address. Only set
+# it when every request goes through those proxies, otherwise clients can
+# pick their own address
+trusted_proxy_hops = int(os.environ.get('TRUSTED_PROXY_HOPS', 0))
+if trusted_proxy_hops:
+    app.wsgi_app = ProxyFix(app.wsgi_app, x_for=trusted_proxy_hops)
+
 # create manager for JWTs
 public_key = os.environ.get('TOKEN_PUBLIC_KEY', None)
 private_key = os.environ.get('TOKEN_PRIVATE_KEY', None)
-jwt = JsonWebToken(public_key, private_key)
+token_algorithm = os.environ.get('TOKEN_ALGORITHM', 'RS256')
+token_cache_size = int(os.environ.get('TOKEN_CACHE_MAX_SIZE', 10000))
+
+# public keys of retired signing keys, kept until their tokens expire
+pem_end = '-----END PUBLIC KEY-----'
+additional_public_keys = [
+    f'{pem.strip()}\n{pem_end}\n'
+    for pem in os.environ.get('TOKEN_ADDITIONAL_PUBLIC_KEYS', '').split(pem_end)
+    if pem.strip()]
+
+jwt = JsonWebToken(public_key, private_key,
+                   algorithm=token_algorithm, cache_size=token_cache_size,
+                   additional_public_keys=additional_public_keys)
+
+# the key set only changes on deploy so its body and ETag are built once
+jwks_body = json.dumps(jwt.get_jwks(), sort_keys=True)
+jwks_etag = sha256(jwks_body.encode()).hexdigest()
+jwks_max_age = int(os.environ.get('JWKS_MAX_AGE', 300))
+
+# create worker pool used to hash and verify passwords
+hash_workers = os.environ.get('PASSWORD_HASH_WORKERS')
+hash_max_queue = os.environ.get('PASSWORD_HASH_MAX_QUEUE')
+hash_pool = HashWorkerPool(
+    int(hash_workers) if hash_workers else None,
+    int(hash_max_queue) if hash_max_queue else None)
+hash_retry_after = os.environ.get('PASSWORD_HASH_RETRY_AFTER', '1')
+
+# pick the bcrypt cost that meets the hash latency target on this CPU. The
+# result is cached in BCRYPT_CALIBRATION_FILE, which should be on a volume
+# that outlives the container. The temporary directory fallback only saves
+# the calibration across restarts of the same container
+configureWorkFactor(
+    float(os.environ.get('BCRYPT_TARGET_MS', 250)),
+    int(os.environ.get('BCRYPT_MIN_ROUNDS', 10)),
+    int(os.environ.get('BCRYPT_MAX_ROUNDS', 16)),
+    os.environ.get('BCRYPT_CALIBRATION_FILE') or os.path.join(
+        tempfile.gettempdir(), 'bcrypt_calibration.json'))
 
 # create token database
 token_table_name = os.environ.get('TOKEN_DYNAMODB_TABLE_NAME')
 aws_region = os.environ.get('AWS_REGION')
-token_database = TokenStorage(token_table_name, aws_region)
+token_database = TokenStorage(
+    token_table_name, aws_region,
+    revocation_shards=int(os.environ.get('REVOCATION_SHARDS', 8)))
+
+# tables without a native TTL can have expired tokens swept periodically
+token_sweep_interval = float(os.environ.get('TOKEN_SWEEP_INTERVAL', 0))
+if token_sweep_interval > 0:
+    token_database.start_sweeper(
+        token_sweep_interval, int(os.environ.get('TOKEN_SWEEP_SEGMENTS', 4)))
+
+# when access tokens are stateless they are never saved to the tokens table
+# and revoking one only adds its id to the in-memory revocation list
+stateless_access_tokens = os.environ.get(
+    'STATELESS_ACCESS_TOKENS', 'false').lower() == 'true'
+
+# create revocation list and keep it in sync with other instances
+access_token_lifetime = 60 * 20
+revocation_list = RevocationList(access_token_lifetime)
+revocation_list.start_sync(
+    token_database.query_revocations,
+    float(os.environ.get('REVOCATION_SYNC_INTERVAL', 5)))
+
+# throttle login and refresh requests per IP address and per account. The
+# buckets can be kept in a DynamoDB table so the limits span every instance
+rate_limit_table_name = os.environ.get('RATE_LIMIT_DYNAMODB_TABLE_NAME')
+rate_limit_store = DynamoDBBucketStore(rate_limit_table_name, aws_region) \
+    if rate_limit_table_name else InMemoryBucketStore()
+rate_limiter = RateLimiter({
+    'ip': (float(os.environ.get('RATE_LIMIT_IP_CAPACITY', 20)),
+           float(os.environ.get('RATE_LIMIT_IP_PER_SECOND', 0.5))),
+    'account': (float(os.environ.get('RATE_LIMIT_ACCOUNT_CAPACITY', 5)),
+                float(os.environ.get('RATE_LIMIT_ACCOUNT_PER_SECOND', 0.05))),
+}, rate_limit_store)
+
+# introspection results for active tokens may only be cached for a short
+# time since the token can be revoked later. Only other services holding
+# the introspection secret may introspect tokens
+introspection_secret = os.environ.get('INTROSPECTION_SECRET')
+introspection_max_tokens = int(os.environ.get('INTROSPECTION_MAX_TOKENS', 100))
+introspection_cache_seconds = int(
+    os.environ.get('INTROSPECTION_CACHE_SECONDS', 30))
 
 # create user database
 users_table_name = os.environ.get('USER_DYNAMODB_TABLE_NAME')
-user_database = UserStorage(users_table_name, aws_region)
+profiles_table_name = os.environ.get('USER_PROFILES_DYNAMODB_TABLE_NAME')
+user_database = UserStorage(
+    users_table_name, aws_region, profiles_table_name,
+    cache_size=int(os.environ.get('USER_CACHE_MAX_SIZE', 10000)),
+    cache_ttl=float(os.environ.get('USER_CACHE_TTL', 60)),
+    negative_cache_ttl=float(os.environ.get('USER_CACHE_NEGATIVE_TTL', 10)))
+user_batch_max_ids = int(os.environ.get('USER_BATCH_MAX_IDS', 100))
+
+
+def getLoginAccountKey(context):
+    """
+    helper function to get the email a login request is for so it can be
+    rate limited
+    """
+    credentials = getLoginCredentialsFromRequest(request)
+    if not credentials:
+        return None
+    return str(credentials.get('email')).lower()
+
+
+def getRefreshAccountKey(context):
+    """
+    helper function to get the user a refresh request is for so it can be
+    rate limited
+    """
+    return context.get('refreshToken', {}).get('userId')
 
 
 @app.route("/api/v1/auth/login", methods=["POST"])
 @addRequestSenderDataToContext
+@rateLimited('login', getLoginAccountKey)
 def handleUserLogin(context={}):
     """
     ENDPOINT: /api/v1/auth/login
@@ -66,15 +200,30 @@ def handleUserLogin(context={}):
     # check that the provided password matches stored password
     providedPassword = credentials.get('password')
     password = user.get('password')
-    if not checkPasswordMatchesHash(providedPassword, password):
+    try:
+        passwordMatches = hash_pool.run(
+            checkPasswordMatchesHash, providedPassword, password)
+    except HashPoolFullError:
+        return {'error': 'server is busy, try again later'}, 503, \
+            {'Retry-After': hash_retry_after}
+    if not passwordMatches:
         return {"error": "invalid credentials"}, 400
 
+    # upgrade or downgrade the stored hash if its cost is not the target.
+    # failing to do so should not fail the login
+    if needsRehash(password):
+        try:
+            newPassword = hash_pool.run(hash, providedPassword)
+            user_database.update_password(email, newPassword)
+        except HashPoolFullError:
+            pass
+
     # Create an access token to identify the user in new requests
     userId = user.get('userId')
     token_data = {'userId': userId, 'tokenType': 'access'}
     twenty_minutes_in_seconds = 60 * 20
-    access_token_id, access_token = jwt.create(
-        token_data, twenty_minutes_in_seconds)
+    access_token_id, access_token, access_token_expires_at = \
+        jwt.create_with_expiry(token_data, twenty_minutes_in_seconds)
     if access_token is None:
         return {'error': 'unable to create auth token'}, 500
 
@@ -83,23 +232,20 @@ def handleUserLogin(context={}):
                   'accessTokenId': access_token_id,
                   'tokenType': 'refresh'}
     seven_days_in_seconds = 60 * 60 * 24 * 7
-    refresh_token_id, refresh_token = jwt.create(
-        token_data, seven_days_in_seconds)
+    refresh_token_id, refresh_token, refresh_token_expires_at = \
+        jwt.create_with_expiry(token_data, seven_days_in_seconds)
     if refresh_token is None:
         return {'error': 'unable to create refresh token'}, 500
 
-    # save the users access token
+    # save the users access and refresh tokens
     userAgent = context.get('userAgent')
-    wasTokenSaved = token_database.save_access_token(
-        access_token_id, userId, ipAddr, userAgent)
-    if not wasTokenSaved:
-        return {'error': 'unable to save auth token'}, 500
-
-    # save the users refresh token
-    wasTokenSaved = token_database.save_refresh_token(
-        refresh_token_id, userId, access_token_id, ipAddr, userAgent)
-    if not wasTokenSaved:
-        return {'error': 'unable to save refresh token'}, 500
+    wereTokensSaved = token_database.save_token_pair(
+        access_token_id, refresh_token_id, userId, ipAddr, userAgent,
+        access_token_expires_at=access_token_expires_at,
+        refresh_token_expires_at=refresh_token_expires_at,
+        persist_access_token=not stateless_access_tokens)
+    if not wereTokensSaved:
+        return {'error': 'unable to save auth tokens'}, 500
 
     # create response to the user
     res = make_response()
@@ -128,25 +274,27 @@ def handleUserRegister(context={}):
     if not credentials:
         return {"error": "username, email, and password not provided"}, 400
 
-    # check that a user with the given email does not exist
-    user = user_database.query_by_email(credentials.get('email'))
-    if user:
-        return {"error": "email already in use"}, 400
-
     # Hash user password and create new user in the database
-    hashedPassword = hash(credentials['password'])
+    try:
+        hashedPassword = hash_pool.run(hash, credentials['password'])
+    except HashPoolFullError:
+        return {'error': 'server is busy, try again later'}, 503, \
+            {'Retry-After': hash_retry_after}
     username = credentials.get('username')
     email = credentials.get('email')
-    newUser = user_database.create(username, email, hashedPassword)
+    try:
+        newUser = user_database.create(username, email, hashedPassword)
+    except UserAlreadyExistsError:
+        return {"error": "email already in use"}, 409
     if not newUser:
         return {'error': 'unable to create a new user account'}, 500
 
     # Create an access token to identify the user in new requests
-    userId = user.get('userId')
+    userId = newUser.get('userId')
     token_data = {'userId': userId, 'tokenType': 'access'}
     twenty_minutes_in_seconds = 60 * 20
-    access_token_id, access_token = jwt.create(
-        token_data, twenty_minutes_in_seconds)
+    access_token_id, access_token, access_token_expires_at = \
+        jwt.create_with_expiry(token_data, twenty_minutes_in_seconds)
     if access_token is None:
         return {'error': 'unable to create auth token'}, 500
 
@@ -155,24 +303,21 @@ def handleUserRegister(context={}):
                   'accessTokenId': access_token_id,
                   'tokenType': 'refresh'}
     seven_days_in_seconds = 60 * 60 * 24 * 7
-    refresh_token_id, refresh_token = jwt.create(
-        token_data, seven_days_in_seconds)
+    refresh_token_id, refresh_token, refresh_token_expires_at = \
+        jwt.create_with_expiry(token_data, seven_days_in_seconds)
     if refresh_token is None:
         return {'error': 'unable to create refresh token'}, 500
 
-    # save the users access token
+    # save the users access and refresh tokens
     userAgent = context.get('userAgent')
     ipAddr = context.get('ipAddr')
-    wasTokenSaved = token_database.save_access_token(
-        access_token_id, userId, ipAddr, userAgent)
-    if not wasTokenSaved:
-        return {'error': 'unable to save auth token'}, 500
-
-    # save the users refresh token
-    wasTokenSaved = token_database.save_refresh_token(
-        refresh_token_id, userId, access_token_id, ipAddr, userAgent)
-    if not wasTokenSaved:
-        return {'error': 'unable to save refresh token'}, 500
+    wereTokensSaved = token_database.save_token_pair(
+        access_token_id, refresh_token_id, userId, ipAddr, userAgent,
+        access_token_expires_at=access_token_expires_at,
+        refresh_token_expires_at=refresh_token_expires_at,
+        persist_access_token=not stateless_access_tokens)
+    if not wereTokensSaved:
+        return {'error': 'unable to save auth tokens'}, 500
 
     # create response to the user
     res = make_response()
@@ -181,7 +326,7 @@ def handleUserRegister(context={}):
     res.set_cookie('refresh_token', refresh_token, httponly=True)
 
     # also send token in response body
-    res.set_data(json.dumps({"user": user, "token": access_token}))
+    res.set_data(json.dumps({"user": newUser, "token": access_token}))
     return res, 200
 
 
@@ -198,10 +343,13 @@ def handleUserLogout(context={}):
     refreshToken = context.get('refreshToken')
     accessToken = context.get('accessToken')
 
-    didDeleteAccessToken = token_database.delete(
-        accessToken['tokenId'], userId)
-    if not didDeleteAccessToken:
-        return {'error': 'could not revoke access token'}, 400
+    if not stateless_access_tokens:
+        didDeleteAccessToken = token_database.delete(
+            accessToken['tokenId'], userId)
+        if not didDeleteAccessToken:
+            return {'error': 'could not revoke access token'}, 400
+    revokeAccessTokens(
+        [(accessToken['tokenId'], context.get('accessTokenExpiresAt'))])
 
     didDeleteRefreshToken = token_database.delete(
         refreshToken['tokenId'], userId)
@@ -213,11 +361,87 @@ def handleUserLogout(context={}):
     return res, 200
 
 
+@app.route("/api/v1/auth/sessions", methods=["GET"])
+@authTokenRequired
+def handleGetSessionsRequest(context={}):
+    """
+    ENDPOINT: /api/v1/auth/sessions
+    EXCEPTED METHODS: GET
+    """
+    userId = context.get('userId')
+    accessTokenId = context.get('accessToken', {}).get('tokenId')
+
+    try:
+        tokens = token_database.query_by_user(userId)
+    except Exception:
+        return {'error': 'unable to retrieve sessions'}, 500
+
+    # every refresh token represents one signed in device. The table's TTL
+    # can take days to delete expired tokens so they are skipped here
+    now = time.time()
+    sessions = [{
+        'sessionId': token['tokenId'],
+        'ipAddr': token.get('ipAddr'),
+        'userAgent': token.get('userAgent'),
+        'current': token.get('accessTokenId') == accessTokenId,
+    } for token in tokens if token.get('type') == 'refresh'
+        and (token.get('expiresAt') is None or token['expiresAt'] > now)]
+
+    return {'sessions': sessions}, 200
+
+
+@app.route("/api/v1/auth/logout-all", methods=["POST"])
+@authTokenRequired
+def handleLogoutAllRequest(context={}):
+    """
+    ENDPOINT: /api/v1/auth/logout-all
+    EXCEPTED METHODS: POST
+    """
+    userId = context.get('userId')
+    accessToken = context.get('accessToken')
+
+    try:
+        tokens = token_database.query_by_user(userId)
+    except Exception:
+        return {'error': 'unable to retrieve sessions'}, 500
+
+    didDeleteTokens = token_database.delete_many(
+        [token['tokenId'] for token in tokens], userId)
+    if not didDeleteTokens:
+        return {'error': 'could not revoke sessions'}, 500
+
+    # access tokens stay valid until they expire unless they are revoked.
+    # Access token entries store their own expiry and refresh token entries
+    # store the expiry of the access token they were issued with
+    accessTokens = {accessToken['tokenId']:
+                    context.get('accessTokenExpiresAt')}
+    for token in tokens:
+        if token.get('type') == 'access':
+            tokenId, expiresAt = token['tokenId'], token.get('expiresAt')
+        elif token.get('accessTokenId'):
+            tokenId = token['accessTokenId']
+            expiresAt = token.get('accessTokenExpiresAt')
+        else:
+            continue
+
+        # keep the latest known expiry of every access token
+        knownExpiresAt = accessTokens.get(tokenId)
+        if knownExpiresAt is None or (
+                expiresAt is not None and expiresAt > knownExpiresAt):
+            accessTokens[tokenId] = expiresAt
+    revokeAccessTokens(accessTokens.items())
+
+    res = make_response()
+    res.set_cookie('refresh_token', '', httponly=True)
+    return res, 200
+
+
 @app.route("/api/v1/auth/refresh-token", methods=["POST"])
 @allowExpiredAccessToken
 @refreshTokenRequired
-@validateRefreshToken
 @addRequestSenderDataToContext
+@rateLimited('refresh', getRefreshAccountKey)
+@validateRefreshToken
 def handleRefreshTokenRequest(context={}):
     """
     ENDPOINT: /api/v1/auth/refresh-token
@@ -227,20 +451,11 @@ def handleRefreshTokenRequest(context={}):
     userId = refreshToken.get('userId', None)
     accessTokenId = refreshToken.get('accessTokenId')
 
-    didDeleteAccessToken = token_database.delete(accessTokenId, userId)
-    if not didDeleteAccessToken:
-        return {'error': 'could not revoke access token'}, 400
-
-    didDeleteRefreshToken = token_database.delete(
-        refreshToken['tokenId'], userId)
-    if not didDeleteRefreshToken:
-        return {'error': 'could not revoke access token'}, 400
-
     # Create an access token to identify the user in new requests
     token_data = {'userId': userId, 'tokenType': 'access'}
     twenty_minutes_in_seconds = 60 * 20
-    access_token_id, access_token = jwt.create(
-        token_data, twenty_minutes_in_seconds)
+    access_token_id, access_token, access_token_expires_at = \
+        jwt.create_with_expiry(token_data, twenty_minutes_in_seconds)
     if access_token is None:
         return {'error': 'unable to create auth token'}, 500
 
@@ -249,24 +464,28 @@ def handleRefreshTokenRequest(context={}):
                   'accessTokenId': access_token_id,
                   'tokenType': 'refresh'}
     seven_days_in_seconds = 60 * 60 * 24 * 7
-    refresh_token_id, refresh_token = jwt.create(
-        token_data, seven_days_in_seconds)
+    refresh_token_id, refresh_token, refresh_token_expires_at = \
+        jwt.create_with_expiry(token_data, seven_days_in_seconds)
     if refresh_token is None:
         return {'error': 'unable to create refresh token'}, 500
 
-    # save the users access token
+    # save the new token pair and revoke the old one in one transaction
     userAgent = context.get('userAgent')
     ipAddr = context.get('ipAddr')
-    wasTokenSaved = token_database.save_access_token(
-        access_token_id, userId, ipAddr, userAgent)
-    if not wasTokenSaved:
-        return {'error': 'unable to save auth token'}, 500
-
-    # save the users refresh token
-    wasTokenSaved = token_database.save_refresh_token(
-        refresh_token_id, userId, access_token_id, ipAddr, userAgent)
-    if not wasTokenSaved:
-        return {'error': 'unable to save refresh token'}, 500
+    wereTokensSaved = token_database.save_token_pair(
+        access_token_id, refresh_token_id, userId, ipAddr, userAgent,
+        access_token_expires_at=access_token_expires_at,
+        refresh_token_expires_at=refresh_token_expires_at,
+        previous_access_token_id=None if stateless_access_tokens
+        else accessTokenId,
+        previous_refresh_token_id=refreshToken['tokenId'],
+        persist_access_token=not stateless_access_tokens)
+    if not wereTokensSaved:
+        return {'error': 'unable to rotate auth tokens'}, 500
+
+    # the old access token may still be valid so it has to be revoked
+    revokeAccessTokens(
+        [(accessTokenId, context.get('accessTokenExpiresAt'))])
 
     # create response to the user
     res = make_response()
@@ -280,14 +499,152 @@ def handleRefreshTokenRequest(context={}):
 
 
 @app.route("/api/v1/auth/public-key", methods=["GET"])
-@authTokenRequired
 def handlePublicKeyRequest():
     """
     ENDPOINT: /api/v1/auth/public-key
     EXCEPTED METHODS: GET
     """
     public_key = jwt.get_public_key()
-    return {'public_key': public_key}, 200
+    return {'public_key': public_key, 'kid': jwt.get_key_id()}, 200
+
+
+@app.route("/api/v1/auth/jwks", methods=["GET"])
+def handleJwksRequest():
+    """
+    ENDPOINT: /api/v1/auth/jwks
+    EXCEPTED METHODS: GET
+    """
+    res = make_response(jwks_body)
+    res.mimetype = 'application/json'
+    res.set_etag(jwks_etag)
+    res.headers['Cache-Control'] = f'public, max-age={jwks_max_age}'
+
+    # answers with 304 Not Modified if the caller's copy is current
+    return res.make_conditional(request)
+
+
+@app.route("/api/v1/auth/introspect", methods=["POST"])
+@serviceSecretRequired(introspection_secret)
+def handleIntrospectionRequest(context={}):
+    """
+    ENDPOINT: /api/v1/auth/introspect
+    EXCEPTED METHODS: POST
+    """
+    tokens = getTokensFromRequestBody(request, introspection_max_tokens)
+    if tokens is None:
+        return {'error': f'a list of at most {introspection_max_tokens} '
+                         'tokens must be provided'}, 400
+
+    # verify every token locally before touching the database
+    decoded = [jwt.decode_with_expiry(token) for token in tokens]
+
+    # look up every token that should be saved with a single BatchGetItem
+    keys = []
+    for payload, _ in decoded:
+        if not payload or not payload.get('userId'):
+            continue
+        if payload.get('tokenType') == 'access' and stateless_access_tokens:
+            continue
+        keys.append((payload.get('tokenId'), payload.get('userId')))
+
+    checked_keys = set(keys)
+    try:
+        saved_tokens = token_database.batch_query(keys)
+    except Exception:
+        return {'error': 'unable to look up saved tokens'}, 500
+
+    now = int(time.time())
+    results = []
+    for payload, exp in decoded:
+        if not payload or not payload.get('userId'):
+            results.append({
+                'active': False,
+                'cacheTtl': introspection_cache_seconds,
+            })
+            continue
+
+        tokenId = payload.get('tokenId')
+        userId = payload.get('userId')
+        saved_token = saved_tokens.get((tokenId, userId))
+        revoked = revocation_list.is_revoked(tokenId)
+        if (tokenId, userId) in checked_keys:
+            revoked = revoked or saved_token is None \
+                or saved_token.get('hasBeenRevoked', False)
+
+        # revoked tokens stay revoked so they can be cached until they
+        # expire, while active tokens are only cached briefly
+        cacheTtl = max(exp - now, 0) if exp else 0
+        if not revoked:
+            cacheTtl = min(cacheTtl, introspection_cache_seconds)
+
+        results.append({
+            'active': not revoked,
+            'revoked': revoked,
+            'userId': userId,
+            'tokenId': tokenId,
+            'tokenType': payload.get('tokenType'),
+            'exp': exp,
+            'cacheTtl': cacheTtl,
+        })
+
+    return {'results': results}, 200
+
+
+@app.route("/api/v1/auth/users/batch", methods=["POST"])
+@authTokenRequired
+def handleBatchUserRequest(context={}):
+    """
+    ENDPOINT: /api/v1/auth/users/batch
+    EXCEPTED METHODS: POST
+    """
+    userIds = getUserIdsFromRequestBody(request, user_batch_max_ids)
+    if userIds is None:
+        return {'error': f'a list of at most {user_batch_max_ids} '
+                         'user ids must be provided'}, 400
+
+    try:
+        profiles = user_database.batch_query_by_user_ids(userIds)
+    except Exception:
+        return {'error': 'unable to retrieve users'}, 500
+
+    return {'users': profiles}, 200
+
+
+@app.route("/api/v1/auth/revocations", methods=["GET"])
+def handleRevocationsRequest():
+    """
+    ENDPOINT: /api/v1/auth/revocations
+    EXCEPTED METHODS: GET
+    """
+    since = request.args.get('since')
+    if since is not None:
+        try:
+            since = float(since)
+        except ValueError:
+            return {'error': 'since must be a number'}, 400
+
+    revocations = [{'tokenId': tokenId,
+                    'expiresAt': int(expiresAt),
+                    'revokedAt': int(revokedAt)}
+                   for tokenId, expiresAt, revokedAt
+                   in revocation_list.get_revocations(since)]
+    return {'revocations': revocations}, 200
+
+
+@app.route("/api/v1/auth/metrics", methods=["GET"])
+def handleMetricsRequest():
+    """
+    ENDPOINT: /api/v1/auth/metrics
+    EXCEPTED METHODS: GET
+    """
+    return {
+        'passwordHashing': {
+            **hash_pool.stats(), 'bcryptRounds': getWorkFactor()},
+        'tokenCache': jwt.get_cache_stats(),
+        'userCache': user_database.get_cache_stats(),
+        'revocations': revocation_list.stats(),
+        'rateLimits': rate_limiter.stats(),
+    }, 200
 
 
 @app.route("/api/v1/auth/health-check", methods=["GET, PUT, POST"])
@@ -0,0 +1,20 @@
+from db.user_storage import UserStorage
+import os
+
+
+def main():
+    """
+    Creates the profile of every user that was created before profiles
+    were saved along with the user
+    """
+    user_database = UserStorage(
+        os.environ.get('USER_DYNAMODB_TABLE_NAME'),
+        os.environ.get('AWS_REGION'),
+        os.environ.get('USER_PROFILES_DYNAMODB_TABLE_NAME'))
+
+    written = user_database.backfill_profiles()
+    print(f'wrote {written} user profiles')
+
+
+if __name__ == '__main__':
+    main()
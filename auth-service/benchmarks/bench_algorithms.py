@@ -0,0 +1,56 @@
+"""
+Benchmark comparing sign and verify throughput and token size for each
+signing algorithm supported by JsonWebToken.
+
+usage: python -m benchmarks.bench_algorithms [iterations]
+"""
+import sys
+import jwt
+from cryptography.hazmat.backends import default_backend
+from cryptography.hazmat.primitives.asymmetric import ec, ed25519, rsa
+from benchmarks.bench_tokens import ops_per_second
+
+
+def generate_private_key(algorithm: str):
+    """helper function to generate a private key for the given algorithm"""
+    if algorithm == 'RS256':
+        return rsa.generate_private_key(backend=default_backend(),
+                                        public_exponent=65537,
+                                        key_size=2048)
+    if algorithm == 'ES256':
+        return ec.generate_private_key(ec.SECP256R1(), default_backend())
+    if algorithm == 'EdDSA':
+        return ed25519.Ed25519PrivateKey.generate()
+
+    raise ValueError(f'unsupported algorithm {algorithm}')
+
+
+def run(iterations: int):
+    claims = {
+        'payload': '{"userId": "0123456789abcdef0123456789abcdef", '
+                   '"tokenType": "access", '
+                   '"tokenId": "0123456789abcdef0123456789abcdef"}',
+        'exp': 4102444800,
+    }
+
+    print(f'{"algorithm":<10}{"sign ops/s":>14}{"verify ops/s":>14}'
+          f'{"token bytes":>14}')
+    for algorithm in ('RS256', 'ES256', 'EdDSA'):
+        private_key = generate_private_key(algorithm)
+        public_key = private_key.public_key()
+        token = jwt.encode(claims, private_key, algorithm=algorithm)
+
+        sign_rate = ops_per_second(
+            lambda: jwt.encode(claims, private_key, algorithm=algorithm),
+            iterations)
+        verify_rate = ops_per_second(
+            lambda: jwt.decode(token, public_key, algorithms=[algorithm]),
+            iterations)
+
+        print(f'{algorithm:<10}{sign_rate:>14.1f}{verify_rate:>14.1f}'
+              f'{len(token):>14}')
+
+
+if __name__ == '__main__':
+    iterations = int(sys.argv[1]) if len(sys.argv) > 1 else 500
+    run(iterations)
@@ -0,0 +1,50 @@
+"""
+Benchmark comparing the size and decode cost of tokens whose payload is
+stored as a JSON string in a single claim against tokens with flat, short
+claim names.
+
+usage: python -m benchmarks.bench_claims [iterations]
+"""
+import sys
+import json
+import jwt
+from benchmarks.bench_tokens import ops_per_second
+from benchmarks.bench_algorithms import generate_private_key
+from utils.tokens import JsonWebToken
+
+
+def run(iterations: int):
+    payload = {
+        'userId': '0123456789abcdef0123456789abcdef',
+        'accessTokenId': '0123456789abcdef0123456789abcdef',
+        'tokenType': 'refresh',
+        'tokenId': '0123456789abcdef0123456789abcdef',
+    }
+    exp = 4102444800
+
+    formats = {
+        'nested': {'payload': json.dumps(payload), 'exp': exp},
+        'flat': JsonWebToken._to_claims(payload, exp),
+    }
+
+    print(f'{"format":<10}{"algorithm":<10}{"decode ops/s":>14}'
+          f'{"token bytes":>14}')
+    for algorithm in ('RS256', 'ES256', 'EdDSA'):
+        private_key = generate_private_key(algorithm)
+        public_key = private_key.public_key()
+
+        for name, claims in formats.items():
+            token = jwt.encode(claims, private_key, algorithm=algorithm)
+
+            def decode():
+                JsonWebToken._from_claims(jwt.decode(
+                    token, public_key, algorithms=[algorithm]))
+
+            decode_rate = ops_per_second(decode, iterations)
+            print(f'{name:<10}{algorithm:<10}{decode_rate:>14.1f}'
+                  f'{len(token):>14}')
+
+
+if __name__ == '__main__':
+    iterations = int(sys.argv[1]) if len(sys.argv) > 1 else 500
+    run(iterations)
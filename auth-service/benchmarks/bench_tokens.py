@@ -0,0 +1,75 @@
+"""
+Microbenchmark comparing JWT sign/verify throughput when PyJWT is handed
+PEM bytes on every call (parsing the RSA key each time) against reusing
+key objects that were parsed once.
+
+usage: python -m benchmarks.bench_tokens [iterations]
+"""
+import sys
+import time
+import jwt
+from cryptography.hazmat.backends import default_backend
+from cryptography.hazmat.primitives import serialization
+from cryptography.hazmat.primitives.asymmetric import rsa
+
+
+def generate_pem_key_pair():
+    """helper function to generate a 2048 bit RSA key pair as PEM strings"""
+    key = rsa.generate_private_key(backend=default_backend(),
+                                   public_exponent=65537,
+                                   key_size=2048)
+
+    private_pem = key.private_bytes(
+        encoding=serialization.Encoding.PEM,
+        format=serialization.PrivateFormat.TraditionalOpenSSL,
+        encryption_algorithm=serialization.NoEncryption())
+    public_pem = key.public_key().public_bytes(
+        encoding=serialization.Encoding.PEM,
+        format=serialization.PublicFormat.SubjectPublicKeyInfo)
+
+    return public_pem.decode(), private_pem.decode()
+
+
+def ops_per_second(operation, iterations: int) -> float:
+    """helper function to measure how many times per second operation runs"""
+    start = time.perf_counter()
+    for _ in range(iterations):
+        operation()
+    elapsed = time.perf_counter() - start
+    return iterations / elapsed
+
+
+def run(iterations: int):
+    public_key, private_key = generate_pem_key_pair()
+    private_key_obj = serialization.load_pem_private_key(
+        private_key.encode(), password=None, backend=default_backend())
+    public_key_obj = serialization.load_pem_public_key(
+        public_key.encode(), backend=default_backend())
+
+    claims = {'payload': '{"userId": "benchmark"}'}
+    token = jwt.encode(claims, private_key_obj, algorithm="RS256")
+
+    results = {
+        'sign (PEM per call)': ops_per_second(
+            lambda: jwt.encode(claims, private_key.encode(),
+                               algorithm="RS256"),
+            iterations),
+        'sign (parsed key)': ops_per_second(
+            lambda: jwt.encode(claims, private_key_obj, algorithm="RS256"),
+            iterations),
+        'verify (PEM per call)': ops_per_second(
+            lambda: jwt.decode(token, public_key.encode(),
+                               algorithms=["RS256"]),
+            iterations),
+        'verify (parsed key)': ops_per_second(
+            lambda: jwt.decode(token, public_key_obj, algorithms=["RS256"]),
+            iterations),
+    }
+
+    for name, rate in results.items():
+        print(f'{name:<24}{rate:>12.1f} ops/s')
+
+
+if __name__ == '__main__':
+    iterations = int(sys.argv[1]) if len(sys.argv) > 1 else 500
+    run(iterations)
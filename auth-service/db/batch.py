@@ -0,0 +1,44 @@
+import random
+import time
+
+
+class UnprocessedKeysError(Exception):
+    """
+    Raised when DynamoDB still has not processed some keys of a batch read
+    after every retry
+    """
+
+
+# BatchGetItem accepts at most 100 keys per request
+BATCH_GET_MAX_KEYS = 100
+
+
+def batchGetItems(client, table_name: str, keys, max_attempts: int = 5,
+                  base_delay: float = 0.05, max_delay: float = 1):
+    """
+    Function to retrieve the items with the given keys from a table with
+    BatchGetItem. Keys are sent in chunks of 100 and keys DynamoDB could
+    not process are retried after a jittered exponential backoff. Raises
+    UnprocessedKeysError if keys are left after max_attempts requests, so a
+    throttled table fails the request instead of holding its thread
+    """
+    items = []
+    for start in range(0, len(keys), BATCH_GET_MAX_KEYS):
+        request = {table_name: {
+            'Keys': keys[start:start + BATCH_GET_MAX_KEYS]}}
+
+        for attempt in range(max_attempts):
+            if attempt:
+                time.sleep(random.uniform(
+                    0, min(base_delay * 2 ** attempt, max_delay)))
+
+            response = client.batch_get_item(RequestItems=request)
+            items.extend(response['Responses'].get(table_name, []))
+
+            request = response.get('UnprocessedKeys')
+            if not request:
+                break
+        else:
+            raise UnprocessedKeysError(table_name)
+
+    return items
@@ -1,4 +1,10 @@
 import boto3
+from db.batch import batchGetItems
+from boto3.dynamodb.conditions import Key, Attr
+from concurrent.futures import ThreadPoolExecutor
+import threading
+import time
+import zlib
 
 
 class TokenStorage:
@@ -8,6 +14,15 @@ class TokenStorage:
     """
     __instance = None
 
+    # prefix of the partitions holding the ids of revoked tokens. Tokens
+    # are spread over several partitions so revoking tokens and the sync of
+    # every instance do not all land on one partition key. Instances
+    # before sharding wrote to the prefix itself, which is still read
+    REVOCATIONS_PARTITION = '#revoked'
+    # sparse global secondary index holding only revocations, ordered by
+    # the time they were made
+    REVOCATIONS_INDEX = 'revokedAtIndex'
+
     @staticmethod
     def get_instance():
         """
@@ -20,7 +35,7 @@ class TokenStorage:
             raise Exception(msg)
         return TokenStorage.__instance
 
-    def __init__(self, table_name, aws_region):
+    def __init__(self, table_name, aws_region, revocation_shards: int = 8):
         if TokenStorage.__instance is not None:
             msg = 'TokenStorage has already been \
                     instantiated and is a singleton'
@@ -31,6 +46,19 @@ class TokenStorage:
             dynamodb = boto3.resource(
                 'dynamodb', region_name=self._aws_region)
             self._tokens_table = dynamodb.Table(self._table_name)
+            # the resource's client converts python types to and from
+            # the DynamoDB format just like the table resource does
+            self._client = dynamodb.meta.client
+
+            self._revocation_shards = revocation_shards
+            self._revocation_partitions = [
+                TokenStorage.REVOCATIONS_PARTITION] + [
+                f'{TokenStorage.REVOCATIONS_PARTITION}#{shard}'
+                for shard in range(revocation_shards)]
+            # reads the revocation partitions in parallel
+            self._revocation_executor = ThreadPoolExecutor(
+                max_workers=len(self._revocation_partitions),
+                thread_name_prefix='revocations')
 
             TokenStorage.__instance = self
 
@@ -54,42 +82,153 @@ class TokenStorage:
         except Exception:
             return None
 
-    def save_access_token(self, tokenId: str, userId: str, ipAddr: str, userAgent: str):
+    @staticmethod
+    def _access_token_item(tokenId: str, userId: str, ipAddr: str, userAgent: str,
+                           expiresAt: int = None):
+        """
+        helper function to build the tokens table entry for an access token.
+        expiresAt is the epoch second the token expires at and is used by
+        the table's TTL to delete the entry
+        """
+        item = {
+            'userId': userId,
+            'tokenId': tokenId,
+            'ipAddr': ipAddr,
+            'userAgent': userAgent,
+            'type': 'access',
+            'hasBeenRevoked': False,
+        }
+        if expiresAt is not None:
+            item['expiresAt'] = int(expiresAt)
+        return item
+
+    @staticmethod
+    def _refresh_token_item(tokenId: str, userId: str, access_token_id: str, ipAddr: str,
+                            userAgent: str, expiresAt: int = None,
+                            accessTokenExpiresAt: int = None):
+        """
+        helper function to build the tokens table entry for a refresh token.
+        The expiry of its access token is kept so the access token can be
+        revoked until it expires even when it is not saved itself
+        """
+        item = {
+            'userId': userId,
+            'tokenId': tokenId,
+            'accessTokenId': access_token_id,
+            'ipAddr': ipAddr,
+            'userAgent': userAgent,
+            'type': 'refresh',
+            'hasBeenRevoked': False,
+        }
+        if expiresAt is not None:
+            item['expiresAt'] = int(expiresAt)
+        if accessTokenExpiresAt is not None:
+            item['accessTokenExpiresAt'] = int(accessTokenExpiresAt)
+        return item
+
+    def batch_query(self, keys):
         """
-        helper function to create a new entry in the tokens dynamoDB table
+        helper function to retrieve several tokens with BatchGetItem. keys
+        is a list of (tokenId, userId) pairs and the saved tokens are
+        returned in a dict keyed by the same pairs. Tokens that are not
+        saved are missing from the dict
+        """
+        items = batchGetItems(self._client, self._table_name, [
+            {'userId': userId, 'tokenId': tokenId}
+            for tokenId, userId in dict.fromkeys(keys)
+        ])
+        return {(item['tokenId'], item['userId']): item for item in items}
+
+    def save_token_pair(self, access_token_id: str, refresh_token_id: str, userId: str,
+                        ipAddr: str, userAgent: str, previous_access_token_id: str = None,
+                        previous_refresh_token_id: str = None,
+                        persist_access_token: bool = True,
+                        access_token_expires_at: int = None,
+                        refresh_token_expires_at: int = None):
+        """
+        helper function to save a new access and refresh token pair in a
+        single transaction. When previous token ids are given the old pair
+        is deleted in the same transaction, and the old refresh token must
+        still exist so a refresh token can only be rotated once. Either
+        every write succeeds or none of them do. Stateless access tokens
+        are not saved when persist_access_token is False. The expiries are
+        stored so the table's TTL can delete the entries
         """
         try:
-            self._tokens_table.put_item(Item={
-                'userId': userId,
-                'tokenId': tokenId,
-                'ipAddr': ipAddr,
-                'userAgent': userAgent,
-                'type': 'access',
-                'hasBeenRevoked': False,
-            })
+            items = [
+                {'Put': {
+                    'TableName': self._table_name,
+                    'Item': TokenStorage._refresh_token_item(
+                        refresh_token_id, userId, access_token_id, ipAddr, userAgent,
+                        refresh_token_expires_at, access_token_expires_at),
+                }},
+            ]
+
+            if persist_access_token:
+                items.append({'Put': {
+                    'TableName': self._table_name,
+                    'Item': TokenStorage._access_token_item(
+                        access_token_id, userId, ipAddr, userAgent,
+                        access_token_expires_at),
+                }})
+
+            if previous_access_token_id:
+                items.append({'Delete': {
+                    'TableName': self._table_name,
+                    'Key': {
+                        'userId': userId,
+                        'tokenId': previous_access_token_id,
+                    },
+                }})
+
+            if previous_refresh_token_id:
+                items.append({'Delete': {
+                    'TableName': self._table_name,
+                    'Key': {
+                        'userId': userId,
+                        'tokenId': previous_refresh_token_id,
+                    },
+                    'ConditionExpression': 'attribute_exists(tokenId)',
+                }})
+
+            self._client.transact_write_items(TransactItems=items)
             return True
 
         except Exception:
             return False
 
-    def save_refresh_token(self, tokenId: str, userId: str, access_token_id: str, ipAddr: str, userAgent: str):
+    def query_by_user(self, userId: str):
+        """
+        helper function to retrieve every token saved for the user with the
+        given id using a paginated query on the userId partition
+        """
+        tokens = []
+        kwargs = {'KeyConditionExpression': Key('userId').eq(userId)}
+
+        while True:
+            query = self._tokens_table.query(**kwargs)
+            tokens.extend(query.get('Items', []))
+
+            if 'LastEvaluatedKey' not in query:
+                return tokens
+            kwargs['ExclusiveStartKey'] = query['LastEvaluatedKey']
+
+    def delete_many(self, tokenIds, userId: str):
         """
-        helper function to create a new entry in the tokens dynamoDB table
+        helper function to delete several tokens of one user. The batch
+        writer sends chunked BatchWriteItem calls of up to 25 deletes and
+        retries any unprocessed items
         """
         try:
-            token = {
-                'userId': userId,
-                'tokenId': tokenId,
-                'accessTokenId': access_token_id,
-                'ipAddr': ipAddr,
-                'userAgent': userAgent,
-                'type': 'refresh',
-                'hasBeenRevoked': False,
-            }
-
-            self._tokens_table.put_item(Item=token)
+            with self._tokens_table.batch_writer(
+                    overwrite_by_pkeys=['userId', 'tokenId']) as batch:
+                for tokenId in set(tokenIds):
+                    if tokenId:
+                        batch.delete_item(Key={
+                            'userId': userId,
+                            'tokenId': tokenId,
+                        })
             return True
-
         except Exception:
             return False
 
@@ -107,3 +246,146 @@ class TokenStorage:
             return True
         except Exception:
             return False
+
+    def revocation_partition_for(self, tokenId: str) -> str:
+        """
+        helper function to get the partition the revocation of a token is
+        saved in. The same id always maps to the same partition
+        """
+        shard = zlib.crc32(tokenId.encode()) % self._revocation_shards
+        return f'{TokenStorage.REVOCATIONS_PARTITION}#{shard}'
+
+    def save_revocations(self, revocations):
+        """
+        helper function to record revoked token ids so every instance can
+        add them to its in-memory revocation list. revocations is a list
+        of (tokenId, expiresAt, revokedAt) tuples written with chunked
+        BatchWriteItem calls
+        """
+        try:
+            with self._tokens_table.batch_writer(
+                    overwrite_by_pkeys=['userId', 'tokenId']) as batch:
+                for tokenId, expiresAt, revokedAt in revocations:
+                    batch.put_item(Item={
+                        'userId': self.revocation_partition_for(tokenId),
+                        'tokenId': tokenId,
+                        'type': 'revocation',
+                        'expiresAt': int(expiresAt),
+                        'revokedAt': int(revokedAt),
+                    })
+            return True
+
+        except Exception:
+            return False
+
+    def _sweep_segment(self, segment: int, total_segments: int, now: int):
+        """
+        helper function to delete the expired entries of one scan segment.
+        boto3 resources are not thread safe so every segment creates its own
+        """
+        session = boto3.session.Session()
+        table = session.resource(
+            'dynamodb', region_name=self._aws_region).Table(self._table_name)
+
+        deleted = 0
+        kwargs = {
+            'Segment': segment,
+            'TotalSegments': total_segments,
+            'FilterExpression': Attr('expiresAt').lte(now),
+            'ProjectionExpression': 'userId, tokenId',
+        }
+
+        with table.batch_writer(overwrite_by_pkeys=['userId', 'tokenId']) as batch:
+            while True:
+                scan = table.scan(**kwargs)
+                for item in scan.get('Items', []):
+                    batch.delete_item(Key={
+                        'userId': item['userId'],
+                        'tokenId': item['tokenId'],
+                    })
+                    deleted += 1
+
+                if 'LastEvaluatedKey' not in scan:
+                    return deleted
+                kwargs['ExclusiveStartKey'] = scan['LastEvaluatedKey']
+
+    def sweep_expired(self, segments: int = 4):
+        """
+        helper function to delete every entry whose expiresAt has passed,
+        for tables without a native TTL. The table is scanned in parallel
+        segments and the entries deleted in batches. Returns the number of
+        deleted entries
+        """
+        now = int(time.time())
+        with ThreadPoolExecutor(max_workers=segments) as executor:
+            counts = executor.map(
+                lambda segment: self._sweep_segment(segment, segments, now),
+                range(segments))
+            return sum(counts)
+
+    def start_sweeper(self, interval: float, segments: int = 4):
+        """
+        helper function to start a background thread that sweeps expired
+        entries every interval seconds. Errors are ignored so a failed
+        sweep is retried on the next interval
+        """
+        def sweep():
+            while True:
+                time.sleep(interval)
+                try:
+                    self.sweep_expired(segments)
+                except Exception:
+                    pass
+
+        threading.Thread(target=sweep, name='token-sweeper', daemon=True).start()
+
+    def _query_revocation_partition(self, partition: str, since: float,
+                                    now: int):
+        """
+        helper function to retrieve the unexpired revocations of one
+        revocation partition. Uses the client since the table resource is
+        not thread safe
+        """
+        revocations = []
+        kwargs = {
+            'TableName': self._table_name,
+            'KeyConditionExpression': 'userId = :partition',
+            'FilterExpression': 'expiresAt > :now',
+            'ProjectionExpression': 'tokenId, expiresAt, revokedAt',
+            'ExpressionAttributeValues': {
+                ':partition': partition,
+                ':now': now,
+            },
+        }
+        if since is not None:
+            kwargs['IndexName'] = TokenStorage.REVOCATIONS_INDEX
+            kwargs['KeyConditionExpression'] += ' AND revokedAt > :since'
+            kwargs['ExpressionAttributeValues'][':since'] = int(since)
+
+        while True:
+            query = self._client.query(**kwargs)
+            revocations.extend(
+                (item['tokenId'], int(item['expiresAt']),
+                 int(item['revokedAt']) if 'revokedAt' in item else None)
+                for item in query.get('Items', []))
+
+            if 'LastEvaluatedKey' not in query:
+                return revocations
+            kwargs['ExclusiveStartKey'] = query['LastEvaluatedKey']
+
+    def query_revocations(self, since: float = None):
+        """
+        helper function to retrieve every revocation whose token has not
+        expired yet as a list of (tokenId, expiresAt, revokedAt) tuples.
+        Every revocation partition is queried in parallel. When since is
+        given only the revocations made after it are read, using the
+        revokedAt index, which only holds revocations. The index is
+        eventually consistent, so callers should reach back further than
+        the last time they fetched
+        """
+        now = int(time.time())
+        pages = self._revocation_executor.map(
+            lambda partition: self._query_revocation_partition(
+                partition, since, now),
+            self._revocation_partitions)
+        return [revocation for page in pages for revocation in page]
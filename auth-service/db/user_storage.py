@@ -1,5 +1,20 @@
 import boto3
+from db.batch import batchGetItems
+from botocore.exceptions import ClientError
 from uuid import uuid4
+from utils.cache import TTLCache
+import threading
+import time
+
+
+# cached in place of users that do not exist
+_USER_NOT_FOUND = object()
+
+
+class UserAlreadyExistsError(Exception):
+    """
+    Raised when creating a user with an email that is already in use
+    """
 
 
 class UserStorage:
@@ -21,7 +36,9 @@ class UserStorage:
             raise Exception(msg)
         return UserStorage.__instance
 
-    def __init__(self, table_name, aws_region):
+    def __init__(self, table_name, aws_region, profiles_table_name=None,
+                 cache_size: int = 10000, cache_ttl: float = 60,
+                 negative_cache_ttl: float = 10):
         if UserStorage.__instance is not None:
             msg = 'UserStorage has already been \
                     instantiated and is a singleton'
@@ -32,6 +49,22 @@ class UserStorage:
             dynamodb = boto3.resource(
                 'dynamodb', region_name=self._aws_region)
             self._users_table = dynamodb.Table(self._table_name)
+            # public user fields keyed by userId so users can be looked
+            # up by id, and many at once with BatchGetItem
+            self._profiles_table_name = profiles_table_name
+            self._profiles_table = dynamodb.Table(profiles_table_name) \
+                if profiles_table_name else None
+            self._client = dynamodb.meta.client
+
+            # users are cached by email, including emails with no user.
+            # Entries are dropped when this instance changes the user, so
+            # only changes made by other instances can be up to cache_ttl
+            # seconds stale
+            self._cache = TTLCache(cache_size)
+            self._cache_ttl = cache_ttl
+            self._negative_cache_ttl = negative_cache_ttl
+            self._cache_lock = threading.Lock()
+            self._cache_generation = 0
 
             UserStorage.__instance = self
 
@@ -39,33 +72,84 @@ class UserStorage:
         """
         Method to retrieve the user with the given email
         """
+        cached = self._cache.get(email)
+        if cached is _USER_NOT_FOUND:
+            return None
+        if cached is not None:
+            # callers modify the user they get back
+            return dict(cached)
+
+        generation = self._cache_generation
         try:
             query = self._users_table.get_item(
                 Key={
                     'email': email
                 })
+        except Exception:
+            return None
 
-            if not query['Item']:
-                return None
+        user = query.get('Item')
+        with self._cache_lock:
+            # skip caching a result read before the user was changed
+            if generation == self._cache_generation:
+                if user:
+                    self._cache.set(email, dict(user),
+                                    time.time() + self._cache_ttl)
+                else:
+                    self._cache.set(email, _USER_NOT_FOUND,
+                                    time.time() + self._negative_cache_ttl)
 
-            return query['Item']
+        return user or None
 
-        except Exception:
-            return None
+    def _invalidate(self, email: str):
+        """
+        helper function to drop the cached user with the given email after
+        it was changed
+        """
+        with self._cache_lock:
+            self._cache_generation += 1
+            self._cache.delete(email)
+
+    def get_cache_stats(self) -> dict:
+        """Method to get the counters of the user cache"""
+        return self._cache.stats()
 
     def create(self, username: str, email: str, password: str):
         """
         helper function to create a new user in the dynamoDB users
-        table
+        table. Raises UserAlreadyExistsError if the email is already used
         """
         try:
+            # the condition makes the email check and the write atomic so
+            # concurrent sign ups with the same email cannot both succeed
             newUserId = uuid4().hex
-            self._users_table.put_item(Item={
+            user = {
                 'userId': newUserId,
                 'email': email,
                 'username': username,
                 'password': password,
-            })
+            }
+
+            if self._profiles_table is None:
+                self._users_table.put_item(
+                    Item=user,
+                    ConditionExpression='attribute_not_exists(email)',
+                )
+            else:
+                # the user and its profile are written in one transaction
+                self._client.transact_write_items(TransactItems=[
+                    {'Put': {
+                        'TableName': self._table_name,
+                        'Item': user,
+                        'ConditionExpression': 'attribute_not_exists(email)',
+                    }},
+                    {'Put': {
+                        'TableName': self._profiles_table_name,
+                        'Item': UserStorage._profile_item(newUserId, username),
+                        'ConditionExpression': 'attribute_not_exists(userId)',
+                    }},
+                ])
+            self._invalidate(email)
 
             newUser = {
                 "userId": newUserId,
@@ -74,5 +158,87 @@ class UserStorage:
             }
 
             return newUser
+        except ClientError as e:
+            if UserStorage._is_email_taken(e):
+                # a cached miss for this email is wrong
+                self._invalidate(email)
+                raise UserAlreadyExistsError(email)
+            return None
         except Exception:
             return None
+
+    @staticmethod
+    def _is_email_taken(error: ClientError) -> bool:
+        """
+        helper function to check if a failed write was rejected because a
+        user with the email already exists
+        """
+        code = error.response['Error']['Code']
+        if code == 'ConditionalCheckFailedException':
+            return True
+
+        # the user put is the first item of the create transaction
+        reasons = error.response.get('CancellationReasons', [])
+        return code == 'TransactionCanceledException' and bool(reasons) \
+            and reasons[0].get('Code') == 'ConditionalCheckFailed'
+
+    @staticmethod
+    def _profile_item(userId: str, username: str):
+        """
+        helper function to build the profiles table entry of a user. Only
+        fields that may be shown to other users belong in it
+        """
+        return {
+            'userId': userId,
+            'username': username,
+        }
+
+    def batch_query_by_user_ids(self, userIds):
+        """
+        helper function to retrieve the public profiles of several users
+        with BatchGetItem. The profiles are returned in a dict keyed by
+        userId; users that do not exist are missing from it
+        """
+        items = batchGetItems(
+            self._client, self._profiles_table_name,
+            [{'userId': userId} for userId in dict.fromkeys(userIds)])
+        return {item['userId']: item for item in items}
+
+    def backfill_profiles(self):
+        """
+        helper function to create the profiles of users that were created
+        before profiles were saved. Returns the number of profiles written
+        """
+        written = 0
+        kwargs = {
+            'ProjectionExpression': 'userId, username',
+        }
+
+        with self._profiles_table.batch_writer() as batch:
+            while True:
+                scan = self._users_table.scan(**kwargs)
+                for user in scan.get('Items', []):
+                    batch.put_item(Item=UserStorage._profile_item(
+                        user['userId'], user['username']))
+                    written += 1
+
+                if 'LastEvaluatedKey' not in scan:
+                    return written
+                kwargs['ExclusiveStartKey'] = scan['LastEvaluatedKey']
+
+    def update_password(self, email: str, password: str):
+        """
+        helper function to replace the stored password hash of the user
+        with the given email
+        """
+        try:
+            self._users_table.update_item(
+                Key={'email': email},
+                UpdateExpression='SET password = :password',
+                ConditionExpression='attribute_exists(email)',
+                ExpressionAttributeValues={':password': password},
+            )
+            self._invalidate(email)
+            return True
+        except Exception:
+            return False
@@ -1,5 +1,8 @@
 from flask import request
+from utils.rate_limit import RateLimiter
 import functools
+import hmac
+import math
 
 
 def addRequestSenderDataToContext(handler):
@@ -13,3 +16,50 @@ def addRequestSenderDataToContext(handler):
 
         return handler(context=context, *args, **kwargs)
     return wrappedHandler
+
+
+def rateLimited(scope: str, getAccountKey):
+    """
+    Middleware function to reject requests once the sender's IP address or
+    the account given by getAccountKey(context) has used up its rate limit.
+    Must run before any password hashing or database access
+    """
+    def decorator(handler):
+        @functools.wraps(handler)
+        def wrappedHandler(context={}, *args, **kwargs):
+            limiter = RateLimiter.get_instance()
+            keys = [('ip', context.get('ipAddr') or request.remote_addr)]
+
+            accountKey = getAccountKey(context)
+            if accountKey:
+                keys.append(('account', accountKey))
+
+            for limit, key in keys:
+                wait = limiter.acquire(limit, f'{scope}:{key}')
+                if wait:
+                    return {'error': 'too many requests, try again later'}, \
+                        429, {'Retry-After': str(math.ceil(wait))}
+
+            return handler(context=context, *args, **kwargs)
+        return wrappedHandler
+    return decorator
+
+
+def serviceSecretRequired(secret: str):
+    """
+    Middleware function to only accept requests from other services, which
+    must send the shared secret as a bearer token in the Authorization
+    header. Every request is rejected when no secret is configured
+    """
+    def decorator(handler):
+        @functools.wraps(handler)
+        def wrappedHandler(context={}, *args, **kwargs):
+            scheme, _, provided = request.headers.get(
+                'Authorization', '').partition(' ')
+            if not secret or scheme.lower() != 'bearer' or \
+                    not hmac.compare_digest(provided.encode(), secret.encode()):
+                return {'error': 'invalid service credentials'}, 401
+
+            return handler(context=context, *args, **kwargs)
+        return wrappedHandler
+    return decorator
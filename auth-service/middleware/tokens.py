@@ -1,15 +1,36 @@
 from flask import request, make_response
 from utils.tokens import JsonWebToken
 from utils.requests import getAuthTokenFromRequestBody
+from utils.revocation import RevocationList
 from db.token_storage import TokenStorage
 import functools
+import time
+
+
+def revokeAccessTokens(accessTokens):
+    """
+    Function to revoke access tokens given as (tokenId, expiresAt) pairs,
+    where expiresAt is the token's exp claim or None if it is not known.
+    The ids are added to the in-memory revocation list right away and saved
+    so other instances pick them up
+    """
+    revocation_list = RevocationList.get_instance()
+    revokedAt = time.time()
+    revocations = []
+    for tokenId, expiresAt in accessTokens:
+        expiresAt = revocation_list.revoke(tokenId, expiresAt, revokedAt)
+        if expiresAt is not None:
+            revocations.append((tokenId, expiresAt, revokedAt))
+
+    if revocations:
+        TokenStorage.get_instance().save_revocations(revocations)
 
 
 def authTokenRequired(handler):
     """
     Middleware function to ensure the incoming request has an auth_token
     cookie associated with it and that the cookie can successfully decoded
-    to yield a userId
+    to yield a userId. Only access tokens are accepted
     """
     @functools.wraps(handler)
     def wrappedHandler(context={}, *args, **kwargs):
@@ -25,11 +46,17 @@ def authTokenRequired(handler):
 
         # decode the token to get the user id
         jwt = JsonWebToken.get_instance()
-        payload = jwt.decode(token)
-        if not payload:
+        payload, expiresAt = jwt.decode_with_expiry(token)
+        if not payload or payload.get('tokenType') != 'access':
             return {'error': 'invalid auth token provided'}, 400
 
+        # check the token has not been revoked without a database call
+        revocation_list = RevocationList.get_instance()
+        if revocation_list.is_revoked(payload.get('tokenId')):
+            return {'error': 'auth token has been revoked'}, 400
+
         context['accessToken'] = payload
+        context['accessTokenExpiresAt'] = expiresAt
         context['userId'] = payload.get('userId')
 
         return handler(context=context, *args, **kwargs)
@@ -40,7 +67,7 @@ def allowExpiredAccessToken(handler):
     """
     Middleware function to ensure the incoming request has an auth_token
     cookie associated with it and that the cookie can successfully decoded
-    to yield a userId
+    to yield a userId. Only access tokens are accepted
     """
     @functools.wraps(handler)
     def wrappedHandler(context={}, *args, **kwargs):
@@ -56,11 +83,13 @@ def allowExpiredAccessToken(handler):
 
         # decode the token to get the user id
         jwt = JsonWebToken.get_instance()
-        payload = jwt.decode_without_verification(token)
-        if not payload:
+        payload, expiresAt = jwt.decode_without_verification_with_expiry(
+            token)
+        if not payload or payload.get('tokenType') != 'access':
             return {'error': 'invalid auth token provided'}, 400
 
         context['accessToken'] = payload
+        context['accessTokenExpiresAt'] = expiresAt
         context['userId'] = payload.get('userId')
 
         return handler(context=context, *args, **kwargs)
@@ -134,8 +163,11 @@ def validateRefreshToken(handler):
 
         if not hasSameIpAddr or not hasSameUserAgent or not hasSameTokenId or not isValidTokenPair:
             # delete the users access and refresh tokens
-            token_database.delete(tokenId, userId)
-            token_database.delete(refresh_token.get('accessTokenId'), userId)
+            token_database.delete_many(
+                [tokenId, refresh_token.get('accessTokenId')], userId)
+            revokeAccessTokens([(
+                refresh_token.get('accessTokenId'),
+                saved_refresh_token.get('accessTokenExpiresAt'))])
             errMessage = {
                 'error': 'could not validate token sender. token revoked'
             }
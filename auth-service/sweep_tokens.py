@@ -0,0 +1,26 @@
+from db.token_storage import TokenStorage
+import argparse
+import os
+
+
+def main():
+    """
+    Deletes every token whose expiry has passed from the tokens table.
+    Only needed for stores without a native TTL, such as DynamoDB Local
+    """
+    parser = argparse.ArgumentParser(
+        description='delete expired tokens from the tokens table')
+    parser.add_argument('--segments', type=int, default=4,
+                        help='number of scan segments swept in parallel')
+    args = parser.parse_args()
+
+    token_database = TokenStorage(
+        os.environ.get('TOKEN_DYNAMODB_TABLE_NAME'),
+        os.environ.get('AWS_REGION'))
+
+    deleted = token_database.sweep_expired(args.segments)
+    print(f'deleted {deleted} expired tokens')
+
+
+if __name__ == '__main__':
+    main()
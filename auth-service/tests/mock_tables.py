@@ -0,0 +1,78 @@
+import os
+
+# the storage classes make their boto3 resources when they are created, so
+# a fake region and credentials are set up first. moto must also be
+# imported before any boto3 client is made so it can intercept it
+os.environ.setdefault('AWS_REGION', 'us-east-1')
+os.environ['AWS_ACCESS_KEY_ID'] = 'testing'
+os.environ['AWS_SECRET_ACCESS_KEY'] = 'testing'
+os.environ.setdefault('TOKEN_DYNAMODB_TABLE_NAME', 'tokens')
+os.environ.setdefault('USER_DYNAMODB_TABLE_NAME', 'users')
+os.environ.setdefault('USER_PROFILES_DYNAMODB_TABLE_NAME', 'user-profiles')
+os.environ.setdefault('RATE_LIMIT_DYNAMODB_TABLE_NAME', 'rate-limits')
+
+from moto.dynamodb import mock_dynamodb  # noqa: E402
+import boto3  # noqa: E402
+
+
+def attribute(name, attribute_type='S'):
+    """helper function to define a key attribute of a table"""
+    return {'AttributeName': name, 'AttributeType': attribute_type}
+
+
+def key_schema(hash_key, range_key=None):
+    """helper function to define the key of a table or an index"""
+    schema = [{'AttributeName': hash_key, 'KeyType': 'HASH'}]
+    if range_key:
+        schema.append({'AttributeName': range_key, 'KeyType': 'RANGE'})
+    return schema
+
+
+class MockTables:
+    """
+    Helper class that starts a moto mock of DynamoDB and creates the
+    tokens, users, user profiles and rate limit tables the way terraform
+    defines them
+    """
+
+    def start(self):
+        self._mock = mock_dynamodb()
+        self._mock.start()
+
+        dynamodb = boto3.resource(
+            'dynamodb', region_name=os.environ['AWS_REGION'])
+        self.tokens_table = dynamodb.create_table(
+            TableName=os.environ['TOKEN_DYNAMODB_TABLE_NAME'],
+            KeySchema=key_schema('userId', 'tokenId'),
+            AttributeDefinitions=[
+                attribute('userId'),
+                attribute('tokenId'),
+                attribute('revokedAt', 'N'),
+            ],
+            GlobalSecondaryIndexes=[
+                {'IndexName': 'revokedAtIndex',
+                 'KeySchema': key_schema('userId', 'revokedAt'),
+                 'Projection': {'ProjectionType': 'INCLUDE',
+                                'NonKeyAttributes': ['expiresAt']}},
+            ],
+            BillingMode='PAY_PER_REQUEST')
+        self.users_table = dynamodb.create_table(
+            TableName=os.environ['USER_DYNAMODB_TABLE_NAME'],
+            KeySchema=key_schema('email'),
+            AttributeDefinitions=[attribute('email')],
+            BillingMode='PAY_PER_REQUEST')
+        self.profiles_table = dynamodb.create_table(
+            TableName=os.environ['USER_PROFILES_DYNAMODB_TABLE_NAME'],
+            KeySchema=key_schema('userId'),
+            AttributeDefinitions=[attribute('userId')],
+            BillingMode='PAY_PER_REQUEST')
+        self.rate_limits_table = dynamodb.create_table(
+            TableName=os.environ['RATE_LIMIT_DYNAMODB_TABLE_NAME'],
+            KeySchema=key_schema('bucketKey'),
+            AttributeDefinitions=[attribute('bucketKey')],
+            BillingMode='PAY_PER_REQUEST')
+
+        return self
+
+    def stop(self):
+        self._mock.stop()
@@ -0,0 +1,248 @@
+import json
+import os
+import tempfile
+import time
+import unittest
+from mock_tables import MockTables
+from test_tokens import MockRSAKeys
+
+# app creates its singletons and calibrates bcrypt when it is imported, so
+# keys and a cheap fixed work factor are configured first
+public_key, private_key = MockRSAKeys.get_key_pair()
+os.environ['TOKEN_PUBLIC_KEY'] = public_key
+os.environ['TOKEN_PRIVATE_KEY'] = private_key
+os.environ['BCRYPT_TARGET_MS'] = '0'
+os.environ['BCRYPT_MIN_ROUNDS'] = '4'
+os.environ['BCRYPT_MAX_ROUNDS'] = '4'
+os.environ['BCRYPT_CALIBRATION_FILE'] = os.path.join(
+    tempfile.mkdtemp(), 'bcrypt_calibration.json')
+os.environ['REVOCATION_SYNC_INTERVAL'] = '3600'
+os.environ['INTROSPECTION_SECRET'] = 'introspection-secret'
+
+tables = MockTables().start()
+try:
+    import app  # noqa: E402
+finally:
+    tables.stop()
+
+from utils.tokens import JsonWebToken  # noqa: E402
+from utils.revocation import RevocationList  # noqa: E402
+from utils.rate_limit import RateLimiter  # noqa: E402
+from db.token_storage import TokenStorage  # noqa: E402
+from db.user_storage import UserStorage  # noqa: E402
+
+# the singletons app made are set aside so the other test modules can make
+# their own, and are put back for every test of the app
+SINGLETONS = [
+    (JsonWebToken, '_JsonWebToken__instance'),
+    (RevocationList, '_RevocationList__instance'),
+    (RateLimiter, '_RateLimiter__instance'),
+    (TokenStorage, '_TokenStorage__instance'),
+    (UserStorage, '_UserStorage__instance'),
+]
+APP_INSTANCES = [getattr(cls, name) for cls, name in SINGLETONS]
+for cls, name in SINGLETONS:
+    setattr(cls, name, None)
+
+
+class AppTestCase(unittest.TestCase):
+    """
+    Base class for tests of the app's endpoints against mocked tables.
+    Every test starts with empty tables
+    """
+
+    def setUp(self):
+        self.tables = MockTables().start()
+        self.addCleanup(self.tables.stop)
+
+        for (cls, name), instance in zip(SINGLETONS, APP_INSTANCES):
+            self.addCleanup(setattr, cls, name, getattr(cls, name))
+            setattr(cls, name, instance)
+
+        self.client = app.app.test_client()
+
+    def register(self, email='user@example.com'):
+        """helper function to register a user and return its response"""
+        res = self.client.post('/api/v1/auth/register', json={'user': {
+            'username': 'user', 'email': email, 'password': 'password'}})
+        self.assertEqual(res.status_code, 200)
+        return json.loads(res.get_data())
+
+    def login(self, email='user@example.com'):
+        """helper function to sign in as a user and return its response"""
+        res = self.client.post('/api/v1/auth/login', json={'user': {
+            'email': email, 'password': 'password'}})
+        self.assertEqual(res.status_code, 200)
+        return json.loads(res.get_data())
+
+    def getSessions(self, accessToken):
+        """helper function to list the sessions of the token's user"""
+        return self.client.get('/api/v1/auth/sessions',
+                               query_string={'accessToken': accessToken})
+
+
+class TestRegister(AppTestCase):
+    """Test creating user accounts"""
+
+    def test_used_email_is_rejected(self):
+        """Test that registering with a used email is a conflict"""
+        self.register()
+
+        res = self.client.post('/api/v1/auth/register', json={'user': {
+            'username': 'other', 'email': 'user@example.com',
+            'password': 'password'}})
+        self.assertEqual(res.status_code, 409)
+        self.assertEqual(res.get_json()['error'], 'email already in use')
+
+
+class TestSessions(AppTestCase):
+    """Test listing the signed in devices of a user"""
+
+    def test_every_signed_in_device_is_listed(self):
+        """Test that every login has its own session"""
+        self.register()
+        accessToken = self.login()['token']
+
+        res = self.getSessions(accessToken)
+        self.assertEqual(res.status_code, 200)
+
+        sessions = res.get_json()['sessions']
+        self.assertEqual(len(sessions), 2)
+        self.assertEqual(
+            sorted(session['current'] for session in sessions),
+            [False, True])
+
+    def test_expired_sessions_are_not_listed(self):
+        """Test that refresh tokens the TTL has not deleted are skipped"""
+        user = self.register()
+        self.tables.tokens_table.put_item(Item={
+            'userId': user['user']['userId'],
+            'tokenId': 'expired-refresh-token',
+            'type': 'refresh',
+            'expiresAt': int(time.time()) - 60,
+        })
+
+        res = self.getSessions(user['token'])
+        self.assertEqual(res.status_code, 200)
+
+        sessionIds = [session['sessionId']
+                      for session in res.get_json()['sessions']]
+        self.assertEqual(len(sessionIds), 1)
+        self.assertNotIn('expired-refresh-token', sessionIds)
+
+
+class TestLogoutAll(AppTestCase):
+    """Test signing a user out of every device"""
+
+    def test_every_session_is_revoked(self):
+        """Test that every token is deleted and access tokens are revoked"""
+        user = self.register()
+        otherAccessToken = self.login()['token']
+
+        res = self.client.post('/api/v1/auth/logout-all',
+                               json={'accessToken': user['token']})
+        self.assertEqual(res.status_code, 200)
+
+        tokens = self.tables.tokens_table.query(
+            KeyConditionExpression='userId = :userId',
+            ExpressionAttributeValues={':userId': user['user']['userId']})
+        self.assertEqual(tokens['Items'], [])
+
+        for accessToken in (user['token'], otherAccessToken):
+            res = self.getSessions(accessToken)
+            self.assertEqual(res.status_code, 400)
+            self.assertEqual(res.get_json()['error'],
+                             'auth token has been revoked')
+
+
+class TestIntrospection(AppTestCase):
+    """Test the token introspection used by other services"""
+
+    def introspect(self, tokens, secret='introspection-secret'):
+        """helper function to introspect tokens as another service"""
+        return self.client.post(
+            '/api/v1/auth/introspect', json={'tokens': tokens},
+            headers={'Authorization': f'Bearer {secret}'})
+
+    def test_service_credentials_are_required(self):
+        """Test that requests without the shared secret are rejected"""
+        user = self.register()
+
+        res = self.client.post('/api/v1/auth/introspect',
+                               json={'tokens': [user['token']]})
+        self.assertEqual(res.status_code, 401)
+
+        res = self.introspect([user['token']], secret='wrong-secret')
+        self.assertEqual(res.status_code, 401)
+
+    def test_active_token(self):
+        """Test that a saved token that is not revoked is active"""
+        user = self.register()
+
+        res = self.introspect([user['token']])
+        self.assertEqual(res.status_code, 200)
+
+        result, = res.get_json()['results']
+        self.assertTrue(result['active'])
+        self.assertFalse(result['revoked'])
+        self.assertEqual(result['userId'], user['user']['userId'])
+        self.assertEqual(result['tokenType'], 'access')
+
+    def test_revoked_token(self):
+        """Test that a token revoked by signing out is not active"""
+        user = self.register()
+        self.client.post('/api/v1/auth/logout-all',
+                         json={'accessToken': user['token']})
+
+        res = self.introspect([user['token']])
+        self.assertEqual(res.status_code, 200)
+
+        result, = res.get_json()['results']
+        self.assertFalse(result['active'])
+        self.assertTrue(result['revoked'])
+        self.assertGreater(result['cacheTtl'], 0)
+
+    def test_expired_token(self):
+        """Test that an expired token is not active"""
+        user = self.register()
+        _, token = app.jwt.create(
+            {'userId': user['user']['userId'], 'tokenType': 'access'}, -60)
+
+        res = self.introspect([token])
+        self.assertEqual(res.status_code, 200)
+        self.assertEqual(res.get_json()['results'],
+                         [{'active': False,
+                           'cacheTtl': app.introspection_cache_seconds}])
+
+
+class TestBatchUsers(AppTestCase):
+    """Test looking up the public profiles of several users at once"""
+
+    def test_profiles_are_returned_by_user_id(self):
+        """Test that the profiles of existing users are returned"""
+        user = self.register()
+        other = self.register('other@example.com')
+        userIds = [user['user']['userId'], other['user']['userId']]
+
+        res = self.client.post('/api/v1/auth/users/batch', json={
+            'accessToken': user['token'],
+            'userIds': userIds + ['missing-user', userIds[0]]})
+        self.assertEqual(res.status_code, 200)
+        self.assertEqual(res.get_json()['users'], {
+            userId: {'userId': userId, 'username': 'user'}
+            for userId in userIds})
+
+    def test_invalid_user_ids_are_rejected(self):
+        """Test that anything but a short list of user ids is rejected"""
+        user = self.register()
+        for userIds in (None, 'user', [''], [1],
+                        ['user'] * (app.user_batch_max_ids + 1)):
+            res = self.client.post('/api/v1/auth/users/batch', json={
+                'accessToken': user['token'], 'userIds': userIds})
+            self.assertEqual(res.status_code, 400)
+
+    def test_access_token_is_required(self):
+        """Test that users cannot be looked up without signing in"""
+        res = self.client.post('/api/v1/auth/users/batch',
+                               json={'userIds': ['user']})
+        self.assertEqual(res.status_code, 400)
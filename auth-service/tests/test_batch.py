@@ -0,0 +1,67 @@
+import unittest
+from unittest import mock
+from db.batch import batchGetItems, UnprocessedKeysError
+
+
+class MockClient:
+    """
+    Helper class standing in for a DynamoDB client. Every request returns
+    the requested items, except that the first unprocessed responses
+    return some keys as unprocessed
+    """
+
+    def __init__(self, unprocessed=0):
+        self.unprocessed = unprocessed
+        self.requests = []
+
+    def batch_get_item(self, RequestItems):
+        self.requests.append(RequestItems)
+        (table_name, request), = RequestItems.items()
+        keys = request['Keys']
+
+        if self.unprocessed:
+            self.unprocessed -= 1
+            return {'Responses': {table_name: keys[:1]},
+                    'UnprocessedKeys': {table_name: {'Keys': keys[1:]}}}
+        return {'Responses': {table_name: keys}, 'UnprocessedKeys': {}}
+
+
+@mock.patch('db.batch.time.sleep')
+class TestBatchGetItems(unittest.TestCase):
+    """Test batchGetItems"""
+
+    def test_keys_are_sent_in_chunks_of_100(self, sleep):
+        """Test that more than 100 keys are split into several requests"""
+        client = MockClient()
+        keys = [{'id': str(i)} for i in range(250)]
+
+        self.assertEqual(batchGetItems(client, 'table', keys), keys)
+        self.assertEqual([len(request['table']['Keys'])
+                          for request in client.requests], [100, 100, 50])
+        sleep.assert_not_called()
+
+    def test_unprocessed_keys_are_retried(self, sleep):
+        """Test that unprocessed keys are requested again after a backoff"""
+        client = MockClient(unprocessed=2)
+        keys = [{'id': str(i)} for i in range(5)]
+
+        items = batchGetItems(client, 'table', keys)
+        self.assertEqual(sorted(item['id'] for item in items),
+                         [str(i) for i in range(5)])
+        self.assertEqual(len(client.requests), 3)
+        self.assertEqual(sleep.call_count, 2)
+        for call in sleep.call_args_list:
+            self.assertLessEqual(call.args[0], 1)
+
+    def test_gives_up_after_max_attempts(self, sleep):
+        """Test that keys that are never processed fail the read"""
+        client = MockClient(unprocessed=100)
+        keys = [{'id': str(i)} for i in range(5)]
+
+        with self.assertRaises(UnprocessedKeysError):
+            batchGetItems(client, 'table', keys, max_attempts=3)
+        self.assertEqual(len(client.requests), 3)
+
+
+if __name__ == '__main__':
+    unittest.main(verbosity=2)
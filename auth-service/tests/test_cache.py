@@ -0,0 +1,80 @@
+import unittest
+from utils.cache import TTLCache
+
+
+class MockClock:
+    """
+    Helper class for controlling the time seen by the TTLCache
+    """
+
+    def __init__(self, now=1000.0):
+        self.now = now
+
+    def __call__(self):
+        return self.now
+
+
+class TestTTLCache(unittest.TestCase):
+    """Test TTLCache Class"""
+
+    def setUp(self):
+        self.clock = MockClock()
+        self.cache = TTLCache(max_size=2, clock=self.clock)
+
+    def test_can_get_value_after_set(self):
+        """Test that a stored value can be retrieved before it expires"""
+        self.cache.set('key', 'value', self.clock.now + 10)
+        self.assertEqual(self.cache.get('key'), 'value')
+
+        stats = self.cache.stats()
+        self.assertEqual(stats['hits'], 1)
+        self.assertEqual(stats['misses'], 0)
+
+    def test_missing_key_returns_default(self):
+        """Test that a missing key counts as a miss"""
+        self.assertIsNone(self.cache.get('missing'))
+        self.assertEqual(self.cache.get('missing', 'default'), 'default')
+        self.assertEqual(self.cache.stats()['misses'], 2)
+
+    def test_entry_expires(self):
+        """Test that entries are dropped once their expiry has passed"""
+        self.cache.set('key', 'value', self.clock.now + 10)
+        self.clock.now += 10
+
+        self.assertIsNone(self.cache.get('key'))
+        stats = self.cache.stats()
+        self.assertEqual(stats['expirations'], 1)
+        self.assertEqual(stats['size'], 0)
+
+    def test_already_expired_entry_is_not_stored(self):
+        """Test that entries with an expiry in the past are ignored"""
+        self.cache.set('key', 'value', self.clock.now - 1)
+        self.assertEqual(self.cache.stats()['size'], 0)
+
+    def test_least_recently_used_entry_is_evicted(self):
+        """Test that the cache never grows past its max size"""
+        expiresAt = self.clock.now + 10
+        self.cache.set('first', 1, expiresAt)
+        self.cache.set('second', 2, expiresAt)
+
+        # touch the first entry so the second one is the oldest
+        self.cache.get('first')
+        self.cache.set('third', 3, expiresAt)
+
+        self.assertEqual(self.cache.get('first'), 1)
+        self.assertIsNone(self.cache.get('second'))
+        self.assertEqual(self.cache.get('third'), 3)
+
+        stats = self.cache.stats()
+        self.assertEqual(stats['size'], 2)
+        self.assertEqual(stats['evictions'], 1)
+
+    def test_can_delete_entry(self):
+        """Test that a deleted entry can no longer be retrieved"""
+        self.cache.set('key', 'value', self.clock.now + 10)
+        self.cache.delete('key')
+        self.assertIsNone(self.cache.get('key'))
+
+
+if __name__ == '__main__':
+    unittest.main(verbosity=2)
@@ -0,0 +1,75 @@
+import os
+import tempfile
+import unittest
+from utils import hash as hashing
+
+
+class TestHash(unittest.TestCase):
+    """Test password hashing helpers"""
+
+    def setUp(self):
+        self.original_work_factor = hashing.getWorkFactor()
+
+    def tearDown(self):
+        hashing._work_factor = self.original_work_factor
+
+    def test_can_check_password_after_hashing(self):
+        """Test that a password matches its own hash"""
+        hashing._work_factor = 4
+        hashed = hashing.hash('password')
+
+        self.assertTrue(hashing.checkPasswordMatchesHash('password', hashed))
+        self.assertFalse(hashing.checkPasswordMatchesHash('other', hashed))
+
+    def test_can_get_work_factor_of_hash(self):
+        """Test that the cost can be read back from a hash"""
+        hashing._work_factor = 5
+        self.assertEqual(hashing.getHashWorkFactor(hashing.hash('password')), 5)
+        self.assertIsNone(hashing.getHashWorkFactor('not a hash'))
+
+    def test_needs_rehash_when_cost_differs(self):
+        """Test that hashes with a different cost need to be rehashed"""
+        hashing._work_factor = 4
+        hashed = hashing.hash('password')
+        self.assertFalse(hashing.needsRehash(hashed))
+
+        hashing._work_factor = 5
+        self.assertTrue(hashing.needsRehash(hashed))
+
+    def test_calibration_stays_within_bounds(self):
+        """Test that calibration never leaves the configured range"""
+        self.assertEqual(hashing.calibrateWorkFactor(0, 4, 6), 4)
+        self.assertEqual(hashing.calibrateWorkFactor(10 ** 9, 4, 6), 6)
+
+    def test_calibration_result_is_cached(self):
+        """Test that a cached calibration is reused on the same CPU"""
+        with tempfile.TemporaryDirectory() as directory:
+            cachePath = os.path.join(directory, 'calibration.json')
+            rounds = hashing.configureWorkFactor(10 ** 9, 4, 6, cachePath)
+            self.assertEqual(rounds, 6)
+            self.assertTrue(os.path.exists(cachePath))
+
+            # a cache hit must not run the calibration again
+            original = hashing.calibrateWorkFactor
+            hashing.calibrateWorkFactor = None
+            try:
+                rounds = hashing.configureWorkFactor(
+                    10 ** 9, 4, 6, cachePath)
+            finally:
+                hashing.calibrateWorkFactor = original
+            self.assertEqual(rounds, 6)
+            self.assertEqual(hashing.getWorkFactor(), 6)
+
+    def test_calibration_cache_directory_is_created(self):
+        """Test that the calibration is cached on a not yet created volume"""
+        with tempfile.TemporaryDirectory() as directory:
+            cachePath = os.path.join(directory, 'volume', 'calibration.json')
+            hashing.configureWorkFactor(10 ** 9, 4, 6, cachePath)
+
+            self.assertTrue(os.path.exists(cachePath))
+            self.assertEqual(os.listdir(os.path.dirname(cachePath)),
+                             ['calibration.json'])
+
+
+if __name__ == '__main__':
+    unittest.main(verbosity=2)
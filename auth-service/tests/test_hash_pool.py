@@ -0,0 +1,65 @@
+import threading
+import unittest
+from utils.hash_pool import HashWorkerPool, HashPoolFullError
+
+
+class TestHashWorkerPool(unittest.TestCase):
+    """Test HashWorkerPool Class"""
+
+    def test_can_run_job(self):
+        """Test that a job runs on the pool and returns its result"""
+        pool = HashWorkerPool(max_workers=1, max_queue=1)
+        self.assertEqual(pool.run(lambda a, b: a + b, 1, 2), 3)
+
+        stats = pool.stats()
+        self.assertEqual(stats['completed'], 1)
+        self.assertEqual(stats['active'], 0)
+        self.assertEqual(stats['queued'], 0)
+
+    def test_job_exception_is_raised_to_caller(self):
+        """Test that an exception raised by a job reaches the caller"""
+        pool = HashWorkerPool(max_workers=1, max_queue=0)
+
+        def fail():
+            raise ValueError('failed')
+
+        with self.assertRaises(ValueError):
+            pool.run(fail)
+
+        # the failed job must have released its slot
+        self.assertEqual(pool.run(lambda: 'ok'), 'ok')
+
+    def test_rejects_jobs_when_queue_is_full(self):
+        """Test that jobs are rejected once every slot is taken"""
+        pool = HashWorkerPool(max_workers=1, max_queue=1)
+        started = threading.Event()
+        release = threading.Event()
+
+        def block():
+            started.set()
+            release.wait(5)
+
+        callers = [threading.Thread(target=pool.run, args=(block,))
+                   for _ in range(2)]
+        for caller in callers:
+            caller.start()
+            started.wait(5)
+
+        # wait until the second job is waiting in the queue
+        while pool.stats()['queued'] < 1:
+            release.wait(0.01)
+
+        with self.assertRaises(HashPoolFullError):
+            pool.run(lambda: None)
+
+        release.set()
+        for caller in callers:
+            caller.join(5)
+
+        stats = pool.stats()
+        self.assertEqual(stats['rejected'], 1)
+        self.assertEqual(stats['completed'], 2)
+
+
+if __name__ == '__main__':
+    unittest.main(verbosity=2)
@@ -0,0 +1,79 @@
+import unittest
+from flask import Flask
+from utils.tokens import JsonWebToken
+from utils.revocation import RevocationList
+from middleware.tokens import authTokenRequired, allowExpiredAccessToken
+from test_tokens import MockRSAKeys
+
+
+class TestAccessTokenMiddleware(unittest.TestCase):
+    """Test the middleware that authenticates requests with access tokens"""
+
+    @classmethod
+    def setUpClass(cls):
+        cls.public_key, cls.private_key = MockRSAKeys.get_key_pair()
+
+        app = Flask(__name__)
+
+        @app.route('/required', methods=['POST'])
+        @authTokenRequired
+        def required(context={}):
+            return {'userId': context['userId']}, 200
+
+        @app.route('/expired', methods=['POST'])
+        @allowExpiredAccessToken
+        def expired(context={}):
+            return {'userId': context['userId']}, 200
+
+        cls.client = app.test_client()
+
+    def setUp(self):
+        """set the singletons aside so the test can make its own"""
+        self.instances = (JsonWebToken._JsonWebToken__instance,
+                          RevocationList._RevocationList__instance)
+        JsonWebToken._JsonWebToken__instance = None
+        RevocationList._RevocationList__instance = None
+
+        self.jwt = JsonWebToken(self.public_key, self.private_key)
+        self.revocations = RevocationList(60)
+
+    def tearDown(self):
+        (JsonWebToken._JsonWebToken__instance,
+         RevocationList._RevocationList__instance) = self.instances
+
+    def createToken(self, tokenType):
+        """helper function to create a token of the given type"""
+        _, token = self.jwt.create(
+            {'userId': 'user', 'tokenType': tokenType}, 600)
+        return token
+
+    def test_access_token_is_accepted(self):
+        """Test that a valid access token authenticates the request"""
+        for path in ('/required', '/expired'):
+            res = self.client.post(path, json={
+                'accessToken': self.createToken('access')})
+            self.assertEqual(res.status_code, 200)
+            self.assertEqual(res.get_json()['userId'], 'user')
+
+    def test_refresh_token_is_rejected(self):
+        """Test that a refresh token cannot be used as an access token"""
+        for path in ('/required', '/expired'):
+            res = self.client.post(path, json={
+                'accessToken': self.createToken('refresh')})
+            self.assertEqual(res.status_code, 400)
+            self.assertEqual(res.get_json()['error'],
+                             'invalid auth token provided')
+
+    def test_revoked_access_token_is_rejected(self):
+        """Test that a revoked access token is rejected"""
+        token = self.createToken('access')
+        self.revocations.revoke(self.jwt.decode(token)['tokenId'])
+
+        res = self.client.post('/required', json={'accessToken': token})
+        self.assertEqual(res.status_code, 400)
+        self.assertEqual(res.get_json()['error'],
+                         'auth token has been revoked')
+
+
+if __name__ == '__main__':
+    unittest.main(verbosity=2)
@@ -0,0 +1,227 @@
+import os
+import unittest
+from unittest.mock import patch
+from flask import Flask
+from werkzeug.middleware.proxy_fix import ProxyFix
+from mock_tables import MockTables
+from middleware.requests import addRequestSenderDataToContext, rateLimited
+from utils.rate_limit import (
+    InMemoryBucketStore,
+    DynamoDBBucketStore,
+    RateLimiter
+)
+
+
+class MockClock:
+    """
+    Helper class for controlling the time seen by the RateLimiter
+    """
+
+    def __init__(self, now=1000.0):
+        self.now = now
+
+    def __call__(self):
+        return self.now
+
+
+class TestInMemoryBucketStore(unittest.TestCase):
+    """Test InMemoryBucketStore Class"""
+
+    def test_bucket_allows_up_to_capacity(self):
+        """Test that a full bucket allows capacity requests at once"""
+        store = InMemoryBucketStore()
+        for _ in range(3):
+            self.assertEqual(store.take('key', 3, 1, 1000.0), 0)
+
+        wait = store.take('key', 3, 1, 1000.0)
+        self.assertAlmostEqual(wait, 1.0)
+
+    def test_bucket_refills_over_time(self):
+        """Test that an empty bucket is refilled at the refill rate"""
+        store = InMemoryBucketStore()
+        store.take('key', 1, 0.5, 1000.0)
+        self.assertAlmostEqual(store.take('key', 1, 0.5, 1001.0), 1.0)
+        self.assertEqual(store.take('key', 1, 0.5, 1002.0), 0)
+
+    def test_buckets_are_independent(self):
+        """Test that every key has its own bucket"""
+        store = InMemoryBucketStore()
+        store.take('first', 1, 1, 1000.0)
+        self.assertEqual(store.take('second', 1, 1, 1000.0), 0)
+
+    def test_least_recently_used_bucket_is_dropped(self):
+        """Test that only max_keys buckets are tracked"""
+        store = InMemoryBucketStore(max_keys=2)
+        for key in ('first', 'second', 'third'):
+            store.take(key, 1, 1, 1000.0)
+
+        self.assertEqual(store.stats()['trackedKeys'], 2)
+        # the dropped bucket starts full again
+        self.assertEqual(store.take('first', 1, 1, 1000.0), 0)
+
+
+class TestDynamoDBBucketStore(unittest.TestCase):
+    """Test DynamoDBBucketStore Class against a mocked table"""
+
+    def setUp(self):
+        self.tables = MockTables().start()
+        self.addCleanup(self.tables.stop)
+
+    def createStore(self, table_name=None):
+        """helper function to create a store on the rate limits table"""
+        return DynamoDBBucketStore(
+            table_name or os.environ['RATE_LIMIT_DYNAMODB_TABLE_NAME'],
+            os.environ['AWS_REGION'])
+
+    def tokens(self, key):
+        """helper function to read the tokens left in a bucket"""
+        return float(self.tables.rate_limits_table.get_item(
+            Key={'bucketKey': key})['Item']['tokens'])
+
+    def interleave(self, store, other, times):
+        """
+        helper function to make other take a token from the same bucket
+        right after store reads it, the first times reads. The bucket
+        refills too slowly for the time between takes to add tokens
+        """
+        getItem = store._table.get_item
+        calls = []
+
+        def readThenInterleave(**kwargs):
+            item = getItem(**kwargs)
+            calls.append(kwargs['Key']['bucketKey'])
+            if len(calls) <= times:
+                self.assertEqual(
+                    other.take(calls[-1], 10, 0.001, 1000.0 + len(calls)), 0)
+            return item
+
+        return patch.object(store._table, 'get_item',
+                            side_effect=readThenInterleave), calls
+
+    def test_bucket_allows_up_to_capacity(self):
+        """Test that a full bucket allows capacity requests at once"""
+        store = self.createStore()
+        for _ in range(3):
+            self.assertEqual(store.take('key', 3, 1, 1000.0), 0)
+
+        self.assertAlmostEqual(store.take('key', 3, 1, 1000.0), 1.0)
+
+    def test_concurrent_take_is_retried(self):
+        """Test that a take is retried after another instance's take"""
+        store, other = self.createStore(), self.createStore()
+        patcher, calls = self.interleave(store, other, 1)
+
+        with patcher:
+            self.assertEqual(store.take('key', 10, 0.001, 1000.0), 0)
+
+        # the first write was rejected and the bucket read again
+        self.assertEqual(len(calls), 2)
+        self.assertAlmostEqual(self.tokens('key'), 8, places=2)
+
+    def test_contended_bucket_is_treated_as_empty(self):
+        """Test that a bucket changed on every attempt rejects the take"""
+        store, other = self.createStore(), self.createStore()
+        patcher, calls = self.interleave(store, other, 3)
+
+        with patcher:
+            self.assertAlmostEqual(store.take('key', 10, 0.001, 1000.0),
+                                   1000.0)
+
+        self.assertEqual(len(calls), 3)
+        self.assertAlmostEqual(self.tokens('key'), 7, places=2)
+
+    def test_store_errors_fail_open(self):
+        """Test that requests are allowed when the table cannot be used"""
+        instance = RateLimiter._RateLimiter__instance
+        RateLimiter._RateLimiter__instance = None
+        self.addCleanup(setattr, RateLimiter, '_RateLimiter__instance',
+                        instance)
+        limiter = RateLimiter({'ip': (1, 1)}, self.createStore('missing'),
+                              clock=MockClock())
+
+        self.assertEqual(limiter.acquire('ip', 'key'), 0)
+        self.assertEqual(limiter.acquire('ip', 'key'), 0)
+
+        stats = limiter.stats()
+        self.assertEqual(stats['storeErrors'], 2)
+        self.assertEqual(stats['limits']['ip']['allowed'], 0)
+        self.assertEqual(stats['limits']['ip']['rejected'], 0)
+
+
+class TestRateLimiter(unittest.TestCase):
+    """Test RateLimiter Class"""
+
+    @classmethod
+    def setUpClass(cls):
+        """instantiate RateLimiter singleton before running tests"""
+        cls.clock = MockClock()
+        RateLimiter({'ip': (2, 1)}, clock=cls.clock)
+
+    def test_instance_is_singleton_instance(self):
+        """Test that the singleton instances are the same"""
+        first_instance = RateLimiter.get_instance()
+        second_instance = RateLimiter.get_instance()
+
+        self.assertIs(first_instance, second_instance)
+
+    def test_excess_requests_are_rejected_and_counted(self):
+        """Test that requests beyond the limit are rejected"""
+        limiter = RateLimiter.get_instance()
+        self.assertEqual(limiter.acquire('ip', 'counted'), 0)
+        self.assertEqual(limiter.acquire('ip', 'counted'), 0)
+        self.assertGreater(limiter.acquire('ip', 'counted'), 0)
+
+        stats = limiter.stats()['limits']['ip']
+        self.assertGreaterEqual(stats['allowed'], 2)
+        self.assertGreaterEqual(stats['rejected'], 1)
+
+
+class TestRequestSenderAddress(unittest.TestCase):
+    """Test that the per-IP limit uses the client address behind a proxy"""
+
+    @classmethod
+    def setUpClass(cls):
+        """get the RateLimiter singleton, instantiating it if needed"""
+        try:
+            RateLimiter.get_instance()
+        except Exception:
+            RateLimiter({'ip': (2, 1)}, clock=MockClock())
+
+        app = Flask(__name__)
+        app.wsgi_app = ProxyFix(app.wsgi_app, x_for=1)
+
+        @app.route('/limited')
+        @addRequestSenderDataToContext
+        @rateLimited('forwarded', lambda context: None)
+        def limited(context):
+            return {'ipAddr': context['ipAddr']}, 200
+
+        cls.client = app.test_client()
+
+    def get(self, clientAddress: str):
+        """helper function to send a request forwarded by the proxy"""
+        return self.client.get(
+            '/limited', environ_base={'REMOTE_ADDR': '10.0.0.1'},
+            headers={'X-Forwarded-For': clientAddress})
+
+    def test_forwarded_clients_have_separate_buckets(self):
+        """Test that two clients behind the same proxy are limited apart"""
+        for _ in range(2):
+            res = self.get('203.0.113.1')
+            self.assertEqual(res.status_code, 200)
+            self.assertEqual(res.get_json()['ipAddr'], '203.0.113.1')
+
+        self.assertEqual(self.get('203.0.113.1').status_code, 429)
+
+        res = self.get('203.0.113.2')
+        self.assertEqual(res.status_code, 200)
+        self.assertEqual(res.get_json()['ipAddr'], '203.0.113.2')
+
+    def test_only_the_trusted_hop_is_used(self):
+        """Test that addresses added in front of the proxy are ignored"""
+        res = self.get('198.51.100.7, 203.0.113.3')
+        self.assertEqual(res.get_json()['ipAddr'], '203.0.113.3')
+
+
+if __name__ == '__main__':
+    unittest.main(verbosity=2)
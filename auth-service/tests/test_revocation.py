@@ -0,0 +1,117 @@
+import threading
+import unittest
+from utils.revocation import RevocationList
+
+
+class MockClock:
+    """
+    Helper class for controlling the time seen by the RevocationList
+    """
+
+    def __init__(self, now=1000.0):
+        self.now = now
+
+    def __call__(self):
+        return self.now
+
+
+class TestRevocationList(unittest.TestCase):
+    """Test RevocationList Class"""
+
+    @classmethod
+    def setUpClass(cls):
+        """instantiate RevocationList singleton before running tests"""
+        cls.clock = MockClock()
+        RevocationList(60, clock=cls.clock)
+
+    def test_instance_is_singleton_instance(self):
+        """Test that the singleton instances are the same"""
+        first_instance = RevocationList.get_instance()
+        second_instance = RevocationList.get_instance()
+
+        self.assertIs(first_instance, second_instance)
+
+    def test_revoked_token_is_revoked(self):
+        """Test that a revoked token id is reported as revoked"""
+        revocations = RevocationList.get_instance()
+        self.assertFalse(revocations.is_revoked('revoked-token'))
+
+        expiresAt = revocations.revoke('revoked-token')
+        self.assertEqual(expiresAt, self.clock.now + 60)
+        self.assertTrue(revocations.is_revoked('revoked-token'))
+        self.assertFalse(revocations.is_revoked('other-token'))
+
+    def test_revocation_expires_with_token(self):
+        """Test that revocations are dropped once the token has expired"""
+        revocations = RevocationList.get_instance()
+        revocations.revoke('expiring-token', self.clock.now + 10)
+
+        self.clock.now += 10
+        self.assertFalse(revocations.is_revoked('expiring-token'))
+        self.assertNotIn('expiring-token', [
+            tokenId for tokenId, _, _ in revocations.get_revocations()])
+
+    def test_expired_token_is_not_stored(self):
+        """Test that revoking an already expired token is a no-op"""
+        revocations = RevocationList.get_instance()
+        self.assertIsNone(
+            revocations.revoke('expired-token', self.clock.now - 1))
+        self.assertFalse(revocations.is_revoked('expired-token'))
+
+    def test_can_merge_revocations(self):
+        """Test that revocations from other instances can be merged"""
+        revocations = RevocationList.get_instance()
+        revocations.merge([('merged-token', self.clock.now + 30, 900)])
+
+        self.assertTrue(revocations.is_revoked('merged-token'))
+        self.assertIn(('merged-token', self.clock.now + 30, 900),
+                      revocations.get_revocations())
+
+    def test_revocation_lasts_until_token_expiry(self):
+        """Test that a known token expiry is used over the default ttl"""
+        revocations = RevocationList.get_instance()
+        expiresAt = revocations.revoke('long-token', self.clock.now + 600)
+        self.assertEqual(expiresAt, self.clock.now + 600)
+
+        self.clock.now += 60
+        self.assertTrue(revocations.is_revoked('long-token'))
+
+    def test_can_get_revocations_since(self):
+        """Test that only revocations made after since are returned"""
+        revocations = RevocationList.get_instance()
+        revokedAt = self.clock.now
+        revocations.revoke('old-token', self.clock.now + 30, revokedAt - 5)
+        revocations.revoke('new-token', self.clock.now + 30, revokedAt + 5)
+
+        tokenIds = [tokenId for tokenId, _, _
+                    in revocations.get_revocations(revokedAt)]
+        self.assertIn('new-token', tokenIds)
+        self.assertNotIn('old-token', tokenIds)
+
+    def test_sync_fetches_revocations_since_last_sync(self):
+        """
+        Test that the first sync fetches every revocation and later ones
+        only fetch revocations made since the previous sync started
+        """
+        revocations = RevocationList.get_instance()
+        calls = []
+        synced = threading.Event()
+
+        def fetch(since):
+            calls.append(since)
+            if len(calls) == 2:
+                synced.set()
+            return [('synced-token', self.clock.now + 30, self.clock.now)] \
+                if since is None else []
+
+        startedAt = self.clock.now
+        revocations.start_sync(fetch, 0.01, overlap=30)
+        self.assertTrue(synced.wait(5))
+
+        self.assertIsNone(calls[0])
+        self.assertEqual(calls[1], startedAt - 30)
+        self.assertTrue(revocations.is_revoked('synced-token'))
+
+
+if __name__ == '__main__':
+    unittest.main(verbosity=2)
@@ -0,0 +1,162 @@
+import os
+import time
+import unittest
+from unittest.mock import patch
+from mock_tables import MockTables
+from db.token_storage import TokenStorage
+
+
+class TokenStorageTestCase(unittest.TestCase):
+    """
+    Base class for tests of TokenStorage against mocked tables. Every test
+    starts with empty tables and its own TokenStorage
+    """
+
+    def setUp(self):
+        self.tables = MockTables().start()
+        self.addCleanup(self.tables.stop)
+
+        instance = TokenStorage._TokenStorage__instance
+        TokenStorage._TokenStorage__instance = None
+        self.addCleanup(setattr, TokenStorage, '_TokenStorage__instance',
+                        instance)
+        self.storage = TokenStorage(
+            os.environ['TOKEN_DYNAMODB_TABLE_NAME'], os.environ['AWS_REGION'],
+            revocation_shards=4)
+
+
+class TestRevocations(TokenStorageTestCase):
+    """Test saving and reading revoked token ids"""
+
+    def test_revocations_are_spread_over_shards(self):
+        """Test that revocations are saved in more than one partition"""
+        now = time.time()
+        self.storage.save_revocations(
+            [(f'token-{i}', now + 600, now) for i in range(20)])
+
+        partitions = {item['userId']
+                      for item in self.tables.tokens_table.scan()['Items']}
+        self.assertGreater(len(partitions), 1)
+        self.assertTrue(all(partition.startswith('#revoked#')
+                            for partition in partitions))
+
+    def test_every_shard_is_read(self):
+        """Test that revocations from every shard are read back"""
+        now = time.time()
+        revocations = [(f'token-{i}', int(now) + 600, int(now))
+                       for i in range(20)]
+        self.storage.save_revocations(revocations)
+
+        self.assertEqual(sorted(self.storage.query_revocations()),
+                         sorted(revocations))
+
+    def test_only_newer_revocations_are_read_since(self):
+        """Test that since only reads revocations made after it"""
+        now = int(time.time())
+        self.storage.save_revocations([('old-token', now + 600, now - 60),
+                                       ('new-token', now + 600, now)])
+
+        self.assertEqual(self.storage.query_revocations(now - 30),
+                         [('new-token', now + 600, now)])
+
+    def test_expired_revocations_are_skipped(self):
+        """Test that revocations of expired tokens are not read"""
+        now = int(time.time())
+        self.storage.save_revocations([('expired-token', now - 1, now - 60)])
+
+        self.assertEqual(self.storage.query_revocations(), [])
+
+    def test_unsharded_revocations_are_still_read(self):
+        """Test that revocations saved before sharding are read"""
+        now = int(time.time())
+        self.tables.tokens_table.put_item(Item={
+            'userId': '#revoked', 'tokenId': 'legacy-token',
+            'type': 'revocation', 'expiresAt': now + 600})
+
+        self.assertEqual(self.storage.query_revocations(),
+                         [('legacy-token', now + 600, None)])
+
+
+class TestSaveTokenPair(TokenStorageTestCase):
+    """Test saving and rotating access and refresh token pairs"""
+
+    def savePair(self, accessTokenId, refreshTokenId, previous=(None, None)):
+        """helper function to save a token pair, replacing a previous one"""
+        return self.storage.save_token_pair(
+            accessTokenId, refreshTokenId, 'user', '127.0.0.1', 'agent',
+            previous_access_token_id=previous[0],
+            previous_refresh_token_id=previous[1])
+
+    def tokenIds(self):
+        """helper function to get the ids of every token saved for user"""
+        return sorted(token['tokenId']
+                      for token in self.storage.query_by_user('user'))
+
+    def test_rotation_replaces_previous_pair(self):
+        """Test that rotating a pair saves the new one and deletes the old"""
+        self.assertTrue(self.savePair('access-1', 'refresh-1'))
+        self.assertTrue(self.savePair('access-2', 'refresh-2',
+                                      ('access-1', 'refresh-1')))
+
+        self.assertEqual(self.tokenIds(), ['access-2', 'refresh-2'])
+
+    def test_refresh_token_can_only_be_rotated_once(self):
+        """Test that a second rotation of the same refresh token fails"""
+        self.assertTrue(self.savePair('access-1', 'refresh-1'))
+        self.assertTrue(self.savePair('access-2', 'refresh-2',
+                                      ('access-1', 'refresh-1')))
+
+        # record the error the transaction fails with
+        client = self.storage._client
+        transactWriteItems = client.transact_write_items
+        errors = []
+
+        def recordErrors(**kwargs):
+            try:
+                return transactWriteItems(**kwargs)
+            except Exception as e:
+                errors.append(e)
+                raise
+
+        with patch.object(client, 'transact_write_items',
+                          side_effect=recordErrors):
+            self.assertFalse(self.savePair('access-3', 'refresh-3',
+                                           ('access-1', 'refresh-1')))
+
+        self.assertEqual(len(errors), 1)
+        self.assertIsInstance(
+            errors[0], client.exceptions.TransactionCanceledException)
+
+        # none of the writes of the failed rotation were made
+        self.assertEqual(self.tokenIds(), ['access-2', 'refresh-2'])
+
+
+class TestSweepExpired(TokenStorageTestCase):
+    """Test deleting expired entries from tables without a native TTL"""
+
+    def test_only_expired_entries_are_deleted(self):
+        """Test that expired entries are deleted and live ones are kept"""
+        now = int(time.time())
+        for i in range(10):
+            self.tables.tokens_table.put_item(Item={
+                'userId': 'user', 'tokenId': f'expired-{i}',
+                'expiresAt': now - 60})
+            self.tables.tokens_table.put_item(Item={
+                'userId': 'user', 'tokenId': f'live-{i}',
+                'expiresAt': now + 600})
+        self.tables.tokens_table.put_item(Item={
+            'userId': 'user', 'tokenId': 'no-expiry'})
+
+        # moto ignores scan segments, so every segment would scan the
+        # whole table
+        self.assertEqual(self.storage.sweep_expired(segments=1), 10)
+
+        tokenIds = sorted(token['tokenId']
+                          for token in self.storage.query_by_user('user'))
+        self.assertEqual(tokenIds,
+                         sorted([f'live-{i}' for i in range(10)] +
+                                ['no-expiry']))
+
+
+if __name__ == '__main__':
+    unittest.main(verbosity=2)
@@ -1,8 +1,12 @@
 import unittest
+import json
+from hashlib import sha256
 import os
+import time
+import jwt
 from utils.tokens import JsonWebToken
 from cryptography.hazmat.primitives import serialization
-from cryptography.hazmat.primitives.asymmetric import rsa
+from cryptography.hazmat.primitives.asymmetric import ec, ed25519, rsa
 from cryptography.hazmat.backends import default_backend
 
 
@@ -34,6 +38,29 @@ class MockRSAKeys:
         return public_key_str, private_key_str
 
 
+class MockKeys:
+    """
+    Helper class for generating key pairs for the other supported
+    algorithms to be used when testing the JsonWebToken class
+    """
+
+    @staticmethod
+    def get_key_pair(algorithm):
+        if algorithm == 'ES256':
+            key = ec.generate_private_key(ec.SECP256R1(), default_backend())
+        else:
+            key = ed25519.Ed25519PrivateKey.generate()
+
+        pem = key.private_bytes(encoding=serialization.Encoding.PEM,
+                                format=serialization.PrivateFormat.PKCS8,
+                                encryption_algorithm=serialization.NoEncryption())
+
+        public_key = key.public_key().public_bytes(encoding=serialization.Encoding.PEM,
+                                                   format=serialization.PublicFormat.SubjectPublicKeyInfo)
+
+        return public_key.decode('utf-8'), pem.decode('utf-8')
+
+
 class TestMockRSAKeys(unittest.TestCase):
     """Test MockRSAKeys Class"""
 
@@ -96,6 +123,74 @@ class TestTokenManager(unittest.TestCase):
         msg = 'Decoded payload tokenId does not match original payload'
         self.assertEqual(tokenId, decoded_payload['tokenId'], msg)
 
+    def test_verified_token_is_cached(self):
+        """Test that decoding the same token twice hits the token cache"""
+        tokenManager = JsonWebToken.get_instance()
+        payload = {'data': 'test token data'}
+        timeToLiveInSeconds = 1500
+
+        tokenId, token = tokenManager.create(payload, timeToLiveInSeconds)
+        first_payload = tokenManager.decode(token)
+        hits = tokenManager.get_cache_stats()['hits']
+
+        second_payload = tokenManager.decode(token)
+        msg = 'Second decode was not served from the cache'
+        self.assertEqual(tokenManager.get_cache_stats()['hits'], hits + 1, msg)
+        self.assertEqual(first_payload, second_payload)
+
+        # callers must not be able to modify the cached payload
+        second_payload['data'] = 'modified'
+        third_payload = tokenManager.decode(token)
+        self.assertEqual(payload['data'], third_payload['data'])
+
+    def test_token_is_stamped_with_key_id(self):
+        """Test that new tokens carry the id of the signing key"""
+        tokenManager = JsonWebToken.get_instance()
+        tokenId, token = tokenManager.create({'data': 'test token data'}, 1500)
+
+        header = jwt.get_unverified_header(token)
+        self.assertEqual(header['kid'], tokenManager.get_key_id())
+
+    def test_jwks_contains_signing_key(self):
+        """Test that the key set publishes the signing key by its id"""
+        tokenManager = JsonWebToken.get_instance()
+        jwks = tokenManager.get_jwks()
+
+        key_ids = [key['kid'] for key in jwks['keys']]
+        self.assertIn(tokenManager.get_key_id(), key_ids)
+        for key in jwks['keys']:
+            self.assertEqual(key['alg'], 'RS256')
+            self.assertEqual(key['use'], 'sig')
+
+    def test_token_claims_are_flat(self):
+        """Test that payload keys are stored under short claim names"""
+        tokenManager = JsonWebToken.get_instance()
+        payload = {'userId': 'user id', 'tokenType': 'access'}
+        tokenId, token = tokenManager.create(payload, 1500)
+
+        claims = jwt.decode(token, options={'verify_signature': False})
+        self.assertEqual(claims['sub'], 'user id')
+        self.assertEqual(claims['typ'], 'access')
+        self.assertEqual(claims['jti'], tokenId)
+        self.assertNotIn('payload', claims)
+
+        decoded_payload = tokenManager.decode(token)
+        self.assertEqual(decoded_payload['userId'], 'user id')
+        self.assertEqual(decoded_payload['tokenType'], 'access')
+        self.assertEqual(decoded_payload['tokenId'], tokenId)
+
+    def test_can_decode_legacy_token(self):
+        """Test that tokens with a JSON encoded payload claim still decode"""
+        tokenManager = JsonWebToken.get_instance()
+        payload = {'userId': 'user id', 'tokenId': 'token id'}
+        token = jwt.encode(
+            {'payload': json.dumps(payload), 'exp': int(time.time()) + 1500},
+            tokenManager._signing_key,
+            algorithm='RS256',
+            headers={'kid': tokenManager.get_key_id()})
+
+        self.assertEqual(tokenManager.decode(token), payload)
+
     def test_can_deconde_without_verification(self):
         """
         Test that JWT can be decoded without verification
@@ -121,5 +216,118 @@ class TestTokenManager(unittest.TestCase):
         self.assertEqual(tokenId, valid_payload['tokenId'], msg)
 
 
+class TestTokenAlgorithms(unittest.TestCase):
+    """Test key checks for the supported signing algorithms"""
+
+    def test_rsa_keys_accepted_for_rs256(self):
+        """Test that RSA keys can be used with RS256"""
+        public_key, private_key = MockRSAKeys.get_key_pair()
+        JsonWebToken._check_key_types(
+            'RS256',
+            JsonWebToken._load_private_key(private_key),
+            JsonWebToken._load_public_key(public_key))
+
+    def test_rsa_keys_rejected_for_other_algorithms(self):
+        """Test that RSA keys cannot be used with ES256 or EdDSA"""
+        public_key, private_key = MockRSAKeys.get_key_pair()
+        signing_key = JsonWebToken._load_private_key(private_key)
+        verifying_key = JsonWebToken._load_public_key(public_key)
+
+        for algorithm in ('ES256', 'EdDSA'):
+            with self.assertRaises(Exception):
+                JsonWebToken._check_key_types(
+                    algorithm, signing_key, verifying_key)
+
+    def test_keys_accepted_for_their_algorithm(self):
+        """Test that EC and Ed25519 keys can be used with ES256 and EdDSA"""
+        for algorithm in ('ES256', 'EdDSA'):
+            public_key, private_key = MockKeys.get_key_pair(algorithm)
+            JsonWebToken._check_key_types(
+                algorithm,
+                JsonWebToken._load_private_key(private_key),
+                JsonWebToken._load_public_key(public_key))
+
+    def test_keys_rejected_for_other_algorithms(self):
+        """Test that EC and Ed25519 keys cannot be swapped"""
+        for algorithm, other in (('ES256', 'EdDSA'), ('EdDSA', 'ES256')):
+            public_key, private_key = MockKeys.get_key_pair(algorithm)
+            with self.assertRaises(Exception):
+                JsonWebToken._check_key_types(
+                    other,
+                    JsonWebToken._load_private_key(private_key),
+                    JsonWebToken._load_public_key(public_key))
+
+
+class TestTokenAlgorithmRoundTrip(unittest.TestCase):
+    """Test signing, verifying and publishing keys with every algorithm"""
+
+    def setUp(self):
+        """set the singleton aside so an instance can be made per algorithm"""
+        self.instance = JsonWebToken._JsonWebToken__instance
+        JsonWebToken._JsonWebToken__instance = None
+
+    def tearDown(self):
+        JsonWebToken._JsonWebToken__instance = self.instance
+
+    def check_round_trip(self, algorithm, public_key, private_key):
+        """helper function to sign and verify a token and export the key"""
+        tokenManager = JsonWebToken(public_key, private_key, algorithm=algorithm)
+
+        tokenId, token = tokenManager.create({'userId': 'user id'}, 1500)
+        self.assertIsNotNone(token, 'Could not create token')
+        header = jwt.get_unverified_header(token)
+        self.assertEqual(header['alg'], algorithm)
+        self.assertEqual(header['kid'], tokenManager.get_key_id())
+
+        payload = tokenManager.decode(token)
+        self.assertEqual(payload['userId'], 'user id')
+        self.assertEqual(payload['tokenId'], tokenId)
+
+        # the published key must verify the token on its own
+        jwks = tokenManager.get_jwks()
+        self.assertEqual(len(jwks['keys']), 1)
+        jwk = jwks['keys'][0]
+        self.assertEqual(jwk['kid'], tokenManager.get_key_id())
+        self.assertEqual(jwk['alg'], algorithm)
+        key = jwt.algorithms.get_default_algorithms()[algorithm].from_jwk(
+            json.dumps(jwk))
+        claims = jwt.decode(token, key, algorithms=[algorithm])
+        self.assertEqual(claims['jti'], tokenId)
+
+        return jwk
+
+    def test_es256_round_trip(self):
+        """Test that ES256 tokens can be signed, verified and published"""
+        public_key, private_key = MockKeys.get_key_pair('ES256')
+        jwk = self.check_round_trip('ES256', public_key, private_key)
+
+        self.assertEqual(jwk['kty'], 'EC')
+        self.assertEqual(jwk['crv'], 'P-256')
+        # coordinates are always padded to the 32 byte curve size
+        self.assertEqual(len(jwk['x']), 43)
+        self.assertEqual(len(jwk['y']), 43)
+
+    def test_eddsa_round_trip(self):
+        """Test that EdDSA tokens can be signed, verified and published"""
+        public_key, private_key = MockKeys.get_key_pair('EdDSA')
+        jwk = self.check_round_trip('EdDSA', public_key, private_key)
+
+        self.assertEqual(jwk['kty'], 'OKP')
+        self.assertEqual(jwk['crv'], 'Ed25519')
+
+    def test_key_id_is_rfc7638_thumbprint(self):
+        """Test the key id against the RFC 7638 thumbprint of the JWK"""
+        public_key, private_key = MockKeys.get_key_pair('ES256')
+        tokenManager = JsonWebToken(public_key, private_key, algorithm='ES256')
+        jwk = tokenManager.get_jwks()['keys'][0]
+
+        canonical = json.dumps(
+            {name: jwk[name] for name in ('crv', 'kty', 'x', 'y')},
+            sort_keys=True, separators=(',', ':'))
+        thumbprint = jwt.utils.base64url_encode(
+            sha256(canonical.encode()).digest()).decode()
+        self.assertEqual(tokenManager.get_key_id(), thumbprint)
+
+
 if __name__ == '__main__':
     unittest.main(verbosity=2)
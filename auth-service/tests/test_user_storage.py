@@ -0,0 +1,124 @@
+import os
+import unittest
+from unittest.mock import patch
+from mock_tables import MockTables
+from db.user_storage import UserStorage, UserAlreadyExistsError
+
+
+class UserStorageTestCase(unittest.TestCase):
+    """
+    Base class for tests of UserStorage against mocked tables. Every test
+    starts with empty tables and its own UserStorage
+    """
+
+    def setUp(self):
+        self.tables = MockTables().start()
+        self.addCleanup(self.tables.stop)
+
+        instance = UserStorage._UserStorage__instance
+        self.addCleanup(setattr, UserStorage, '_UserStorage__instance',
+                        instance)
+        self.storage = self.createStorage(
+            os.environ['USER_PROFILES_DYNAMODB_TABLE_NAME'])
+
+    def createStorage(self, profiles_table_name):
+        """helper function to create a UserStorage in place of the last"""
+        UserStorage._UserStorage__instance = None
+        return UserStorage(
+            os.environ['USER_DYNAMODB_TABLE_NAME'], os.environ['AWS_REGION'],
+            profiles_table_name)
+
+
+class TestCreate(UserStorageTestCase):
+    """Test creating users"""
+
+    def test_user_and_profile_are_saved(self):
+        """Test that a new user and its public profile are both saved"""
+        user = self.storage.create('user', 'user@example.com', 'hash')
+
+        self.assertEqual(self.storage.query_by_email('user@example.com'),
+                         dict(user, password='hash'))
+        self.assertEqual(self.tables.profiles_table.scan()['Items'],
+                         [{'userId': user['userId'], 'username': 'user'}])
+
+    def test_user_is_not_saved_without_its_profile(self):
+        """Test that the user is not saved when its profile cannot be"""
+        self.tables.profiles_table.put_item(Item={
+            'userId': 'taken-id', 'username': 'other'})
+
+        with patch('db.user_storage.uuid4') as uuid4:
+            uuid4.return_value.hex = 'taken-id'
+            self.assertIsNone(
+                self.storage.create('user', 'user@example.com', 'hash'))
+
+        self.assertEqual(self.tables.users_table.scan()['Items'], [])
+
+    def test_email_can_only_be_used_once(self):
+        """Test that creating a user with a used email is rejected"""
+        user = self.storage.create('user', 'user@example.com', 'hash')
+        self.assertIsNotNone(user)
+
+        with self.assertRaises(UserAlreadyExistsError):
+            self.storage.create('other', 'user@example.com', 'other-hash')
+
+        # the first user and its profile are kept
+        self.assertEqual(self.storage.query_by_email(
+            'user@example.com')['password'], 'hash')
+        self.assertEqual(len(self.tables.profiles_table.scan()['Items']), 1)
+
+    def test_email_can_only_be_used_once_without_profiles(self):
+        """Test that a used email is rejected when no profiles are saved"""
+        storage = self.createStorage(None)
+        storage.create('user', 'user@example.com', 'hash')
+
+        with self.assertRaises(UserAlreadyExistsError):
+            storage.create('other', 'user@example.com', 'other-hash')
+
+
+class TestEmailCache(UserStorageTestCase):
+    """Test caching users by email"""
+
+    def test_hit_does_not_query_table(self):
+        """Test that a cached user is returned without reading the table"""
+        self.storage.create('user', 'user@example.com', 'hash')
+        self.storage.query_by_email('user@example.com')
+
+        with patch.object(self.storage._users_table, 'get_item') as getItem:
+            user = self.storage.query_by_email('user@example.com')
+
+        getItem.assert_not_called()
+        self.assertEqual(user['username'], 'user')
+        self.assertEqual(self.storage.get_cache_stats()['hits'], 1)
+
+    def test_cached_miss_is_dropped_on_register(self):
+        """Test that a user created after a miss is not reported missing"""
+        self.assertIsNone(self.storage.query_by_email('user@example.com'))
+
+        self.storage.create('user', 'user@example.com', 'hash')
+
+        user = self.storage.query_by_email('user@example.com')
+        self.assertIsNotNone(user)
+        self.assertEqual(user['username'], 'user')
+
+    def test_update_password_evicts_user(self):
+        """Test that the new password is read after it is updated"""
+        self.storage.create('user', 'user@example.com', 'hash')
+        self.storage.query_by_email('user@example.com')
+
+        self.assertTrue(
+            self.storage.update_password('user@example.com', 'new-hash'))
+
+        self.assertEqual(self.storage.query_by_email(
+            'user@example.com')['password'], 'new-hash')
+
+    def test_returned_user_is_a_copy(self):
+        """Test that changing a returned user does not change the cache"""
+        self.storage.create('user', 'user@example.com', 'hash')
+        del self.storage.query_by_email('user@example.com')['password']
+
+        self.assertEqual(self.storage.query_by_email(
+            'user@example.com')['password'], 'hash')
+
+
+if __name__ == '__main__':
+    unittest.main(verbosity=2)
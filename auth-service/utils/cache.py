@@ -0,0 +1,82 @@
+from collections import OrderedDict
+import threading
+import time
+
+
+class TTLCache:
+    """
+    Bounded, thread-safe LRU cache where every entry carries its own
+    expiry time. Entries are dropped once they expire or once the cache
+    grows past max_size, evicting the least recently used entry first.
+    """
+
+    def __init__(self, max_size: int = 10000, clock=time.time):
+        self._max_size = max(int(max_size), 1)
+        self._clock = clock
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self._hits = 0
+        self._misses = 0
+        self._evictions = 0
+        self._expirations = 0
+
+    def get(self, key, default=None):
+        """
+        Method to retrieve the value stored for the given key. Returns the
+        default value if the key is missing or its entry has expired
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self._misses += 1
+                return default
+
+            value, expiresAt = entry
+            if expiresAt <= self._clock():
+                del self._entries[key]
+                self._expirations += 1
+                self._misses += 1
+                return default
+
+            self._entries.move_to_end(key)
+            self._hits += 1
+            return value
+
+    def set(self, key, value, expiresAt: float):
+        """
+        Method to store a value until the given epoch time, evicting the
+        least recently used entries if the cache is full
+        """
+        if expiresAt <= self._clock():
+            return
+
+        with self._lock:
+            self._entries[key] = (value, expiresAt)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self._max_size:
+                self._entries.popitem(last=False)
+                self._evictions += 1
+
+    def delete(self, key):
+        """Method to remove the entry for the given key if it exists"""
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def clear(self):
+        """Method to remove every entry from the cache"""
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> dict:
+        """Method to get the cache counters"""
+        with self._lock:
+            lookups = self._hits + self._misses
+            return {
+                'size': len(self._entries),
+                'maxSize': self._max_size,
+                'hits': self._hits,
+                'misses': self._misses,
+                'evictions': self._evictions,
+                'expirations': self._expirations,
+                'hitRatio': self._hits / lookups if lookups else 0.0,
+            }
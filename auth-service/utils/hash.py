@@ -1,11 +1,131 @@
 import bcrypt
+import json
+import os
+import platform
+import time
+
+
+# bcrypt cost used for new hashes, set at startup by configureWorkFactor
+_work_factor = 12
 
 
 def hash(string: str) -> str:
     """Helper function to hash a string and return the hash as a string"""
-    return bcrypt.hashpw(string.encode(), bcrypt.gensalt()).decode()
+    salt = bcrypt.gensalt(rounds=_work_factor)
+    return bcrypt.hashpw(string.encode(), salt).decode()
 
 
 def checkPasswordMatchesHash(password: str, hash: str) -> bool:
     """Helper function to check if a string matched a given hash"""
     return bcrypt.checkpw(password.encode(), hash.encode())
+
+
+def getWorkFactor() -> int:
+    """Helper function to get the bcrypt cost used for new hashes"""
+    return _work_factor
+
+
+def getHashWorkFactor(hash: str) -> int:
+    """
+    Helper function to get the bcrypt cost a hash was created with.
+    Hashes have the form $2b$<cost>$<salt and digest>
+    """
+    try:
+        return int(hash.split('$')[2])
+    except (IndexError, ValueError):
+        return None
+
+
+def needsRehash(hash: str) -> bool:
+    """
+    Helper function to check if a hash was created with a different
+    cost than the one currently used for new hashes
+    """
+    return getHashWorkFactor(hash) != _work_factor
+
+
+def _cpuFingerprint() -> str:
+    """
+    Helper function to identify the CPU the service is running on so a
+    calibration result is only reused on the same hardware
+    """
+    model = platform.processor()
+    try:
+        with open('/proc/cpuinfo') as cpuinfo:
+            for line in cpuinfo:
+                if line.startswith('model name'):
+                    model = line.split(':', 1)[1].strip()
+                    break
+    except OSError:
+        pass
+
+    return f'{platform.machine()}|{model}|{os.cpu_count()}'
+
+
+def calibrateWorkFactor(targetMs: float, minRounds: int = 10,
+                        maxRounds: int = 16) -> int:
+    """
+    Helper function to find the highest bcrypt cost whose hash time stays
+    within targetMs on the current CPU. Each extra round doubles the hash
+    time, so only the cheapest cost is measured and the rest extrapolated.
+    Never returns less than minRounds
+    """
+    salt = bcrypt.gensalt(rounds=minRounds)
+    samples = []
+    for _ in range(3):
+        start = time.perf_counter()
+        bcrypt.hashpw(b'calibration password', salt)
+        samples.append((time.perf_counter() - start) * 1000)
+    baseMs = min(samples)
+
+    rounds = minRounds
+    while rounds < maxRounds and baseMs * 2 ** (rounds + 1 - minRounds) \
+            <= targetMs:
+        rounds += 1
+
+    return rounds
+
+
+def configureWorkFactor(targetMs: float, minRounds: int = 10,
+                        maxRounds: int = 16, cachePath: str = None) -> int:
+    """
+    Helper function to set the bcrypt cost used for new hashes from a
+    per hash latency target. The calibration result is cached in
+    cachePath so later starts on the same hardware skip the measurement,
+    which only helps if cachePath outlives the container
+    """
+    global _work_factor
+
+    settings = {
+        'cpu': _cpuFingerprint(),
+        'targetMs': targetMs,
+        'minRounds': minRounds,
+        'maxRounds': maxRounds,
+    }
+
+    if cachePath:
+        try:
+            with open(cachePath) as cacheFile:
+                cached = json.load(cacheFile)
+            if all(cached.get(key) == value
+                   for key, value in settings.items()):
+                _work_factor = int(cached['rounds'])
+                return _work_factor
+        except (OSError, ValueError, KeyError):
+            pass
+
+    _work_factor = calibrateWorkFactor(targetMs, minRounds, maxRounds)
+
+    if cachePath:
+        # write to a temporary file first so instances sharing the cache
+        # never read a partially written result
+        tempPath = f'{cachePath}.{os.getpid()}.tmp'
+        try:
+            os.makedirs(os.path.dirname(cachePath) or '.', exist_ok=True)
+            with open(tempPath, 'w') as cacheFile:
+                json.dump({**settings, 'rounds': _work_factor}, cacheFile)
+            os.replace(tempPath, cachePath)
+        except OSError:
+            pass
+
+    return _work_factor
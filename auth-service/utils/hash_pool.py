@@ -0,0 +1,117 @@
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+import os
+import threading
+import time
+
+
+class HashPoolFullError(Exception):
+    """
+    Raised when the password hashing pool already has as many pending
+    jobs as its queue allows
+    """
+
+
+class HashWorkerPool:
+    """
+    Bounded worker pool used to run bcrypt hashing off the request
+    threads. At most max_workers hashes run at once and at most max_queue
+    more may wait for a worker; anything beyond that is rejected
+    immediately instead of piling up threads.
+    """
+
+    def __init__(self, max_workers: int = None, max_queue: int = None,
+                 latency_samples: int = 1000):
+        self._max_workers = max_workers or os.cpu_count() or 1
+        self._max_queue = self._max_workers * 4 \
+            if max_queue is None else max_queue
+        self._slots = threading.BoundedSemaphore(
+            self._max_workers + self._max_queue)
+        self._executor = ThreadPoolExecutor(
+            max_workers=self._max_workers,
+            thread_name_prefix='password-hash')
+
+        self._lock = threading.Lock()
+        self._pending = 0
+        self._active = 0
+        self._completed = 0
+        self._rejected = 0
+        self._wait_times = deque(maxlen=latency_samples)
+        self._run_times = deque(maxlen=latency_samples)
+
+    def run(self, func, *args):
+        """
+        Method to run func on the worker pool and wait for its result.
+        Raises HashPoolFullError if the queue is already full
+        """
+        if not self._slots.acquire(blocking=False):
+            with self._lock:
+                self._rejected += 1
+            raise HashPoolFullError('password hashing queue is full')
+
+        with self._lock:
+            self._pending += 1
+
+        try:
+            future = self._executor.submit(
+                self._execute, time.perf_counter(), func, *args)
+        except Exception:
+            self._finish()
+            raise
+
+        return future.result()
+
+    def _execute(self, enqueuedAt: float, func, *args):
+        """Method run on a worker thread to time and execute a job"""
+        startedAt = time.perf_counter()
+        with self._lock:
+            self._active += 1
+            self._wait_times.append(startedAt - enqueuedAt)
+
+        try:
+            return func(*args)
+        finally:
+            finishedAt = time.perf_counter()
+            with self._lock:
+                self._active -= 1
+                self._completed += 1
+                self._run_times.append(finishedAt - startedAt)
+            self._finish()
+
+    def _finish(self):
+        """Method to free the queue slot held by a job"""
+        with self._lock:
+            self._pending -= 1
+        self._slots.release()
+
+    @staticmethod
+    def _percentile_ms(samples, percentile: float) -> float:
+        """helper function to get a percentile of samples in milliseconds"""
+        if not samples:
+            return 0.0
+
+        ordered = sorted(samples)
+        index = min(int(len(ordered) * percentile), len(ordered) - 1)
+        return ordered[index] * 1000
+
+    def stats(self) -> dict:
+        """Method to get the queue and latency metrics of the pool"""
+        with self._lock:
+            wait_times = list(self._wait_times)
+            run_times = list(self._run_times)
+            return {
+                'workers': self._max_workers,
+                'maxQueue': self._max_queue,
+                'active': self._active,
+                'queued': self._pending - self._active,
+                'completed': self._completed,
+                'rejected': self._rejected,
+                'waitMs': {
+                    'p50': self._percentile_ms(wait_times, 0.5),
+                    'p99': self._percentile_ms(wait_times, 0.99),
+                },
+                'runMs': {
+                    'p50': self._percentile_ms(run_times, 0.5),
+                    'p99': self._percentile_ms(run_times, 0.99),
+                },
+            }
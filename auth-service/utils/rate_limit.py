@@ -0,0 +1,183 @@
+import boto3
+from boto3.dynamodb.conditions import Attr
+from botocore.exceptions import ClientError
+from collections import OrderedDict
+from decimal import Decimal
+import threading
+import time
+
+
+class InMemoryBucketStore:
+    """
+    Keeps token buckets in the memory of a single instance. Only the most
+    recently used max_keys buckets are kept; dropping an idle bucket only
+    means it starts full again the next time it is used
+    """
+
+    def __init__(self, max_keys: int = 100000):
+        self._max_keys = max_keys
+        self._lock = threading.Lock()
+        self._buckets = OrderedDict()
+
+    def take(self, key: str, capacity: float, refill_rate: float, now: float) -> float:
+        """
+        Method to take a token from the bucket with the given key. Returns
+        0 if a token was taken, otherwise the seconds until one is available
+        """
+        with self._lock:
+            tokens, updatedAt = self._buckets.pop(key, (capacity, now))
+            tokens = min(capacity, tokens + (now - updatedAt) * refill_rate)
+
+            if tokens >= 1:
+                tokens -= 1
+                wait = 0.0
+            else:
+                wait = (1 - tokens) / refill_rate
+
+            self._buckets[key] = (tokens, now)
+            if len(self._buckets) > self._max_keys:
+                self._buckets.popitem(last=False)
+            return wait
+
+    def stats(self) -> dict:
+        """Method to get the number of buckets being tracked"""
+        with self._lock:
+            return {'backend': 'memory', 'trackedKeys': len(self._buckets)}
+
+
+class DynamoDBBucketStore:
+    """
+    Keeps token buckets in a DynamoDB table keyed by bucketKey so every
+    instance of the service shares the same limits. Buckets are updated
+    with conditional writes and retried when another instance changed the
+    bucket first. Entries carry an expiresAt attribute for the table's TTL
+    """
+
+    def __init__(self, table_name: str, aws_region: str, max_attempts: int = 3):
+        dynamodb = boto3.resource('dynamodb', region_name=aws_region)
+        self._table = dynamodb.Table(table_name)
+        self._max_attempts = max_attempts
+
+    def take(self, key: str, capacity: float, refill_rate: float, now: float) -> float:
+        """
+        Method to take a token from the bucket with the given key. Returns
+        0 if a token was taken, otherwise the seconds until one is available
+        """
+        for _ in range(self._max_attempts):
+            item = self._table.get_item(
+                Key={'bucketKey': key}, ConsistentRead=True).get('Item')
+
+            if item is None:
+                tokens = capacity
+                condition = Attr('bucketKey').not_exists()
+            else:
+                elapsed = max(now - float(item['updatedAt']), 0)
+                tokens = min(capacity, float(item['tokens']) + elapsed * refill_rate)
+                condition = Attr('updatedAt').eq(item['updatedAt'])
+
+            # an empty bucket is left as it is so rejections cost no write
+            if tokens < 1:
+                return (1 - tokens) / refill_rate
+
+            try:
+                self._table.put_item(
+                    Item={
+                        'bucketKey': key,
+                        'tokens': Decimal(str(tokens - 1)),
+                        'updatedAt': Decimal(str(now)),
+                        'expiresAt': int(now + capacity / refill_rate) + 1,
+                    },
+                    ConditionExpression=condition)
+                return 0.0
+            except ClientError as e:
+                if e.response['Error']['Code'] != 'ConditionalCheckFailedException':
+                    raise
+
+        # the bucket is too contended to update, so treat it as empty
+        return 1 / refill_rate
+
+    def stats(self) -> dict:
+        """Method to get the name of the backend"""
+        return {'backend': 'dynamodb'}
+
+
+class RateLimiter:
+    """
+    Token bucket rate limiter. Every named limit has a bucket per key that
+    holds up to capacity tokens and is refilled with refill_rate tokens per
+    second; a request is allowed when it can take a token from the bucket.
+    Buckets live in the given store, which defaults to the memory of this
+    instance
+    """
+    __instance = None
+
+    @staticmethod
+    def get_instance():
+        """
+        Method to get the singleton instance of the RateLimiter
+        class
+        """
+        if RateLimiter.__instance is None:
+            msg = 'RateLimiter must be instantiated \
+                    before using this method'
+            raise Exception(msg)
+        return RateLimiter.__instance
+
+    def __init__(self, limits: dict, store=None, clock=time.time):
+        if RateLimiter.__instance is not None:
+            msg = 'RateLimiter has already been \
+                    instantiated and is a singleton'
+            raise Exception(msg)
+        else:
+            # limits maps a limit name to (capacity, refill_rate)
+            self._limits = limits
+            self._store = store or InMemoryBucketStore()
+            self._clock = clock
+            self._lock = threading.Lock()
+            self._allowed = {name: 0 for name in limits}
+            self._rejected = {name: 0 for name in limits}
+            self._store_errors = 0
+
+            RateLimiter.__instance = self
+
+    def acquire(self, limit: str, key: str) -> float:
+        """
+        Method to take a token for key from the named limit. Returns 0 if
+        the request is allowed, otherwise the seconds to wait before
+        retrying. If the store cannot be reached the request is allowed
+        """
+        capacity, refill_rate = self._limits[limit]
+        try:
+            wait = self._store.take(
+                f'{limit}:{key}', capacity, refill_rate, self._clock())
+        except Exception:
+            with self._lock:
+                self._store_errors += 1
+            return 0.0
+
+        with self._lock:
+            if wait:
+                self._rejected[limit] += 1
+            else:
+                self._allowed[limit] += 1
+        return wait
+
+    def stats(self) -> dict:
+        """Method to get the configuration and counters of every limit"""
+        with self._lock:
+            limits = {
+                name: {
+                    'capacity': capacity,
+                    'refillPerSecond': refill_rate,
+                    'allowed': self._allowed[name],
+                    'rejected': self._rejected[name],
+                }
+                for name, (capacity, refill_rate) in self._limits.items()
+            }
+            store_errors = self._store_errors
+
+        return {
+            **self._store.stats(),
+            'storeErrors': store_errors,
+            'limits': limits,
+        }
@@ -64,6 +64,44 @@ def getAuthTokenFromRequestBody(request):
     return body['accessToken']
 
 
+def getTokensFromRequestBody(request, maxTokens: int):
+    """
+    helper function to retrieve a list of at most maxTokens tokens from
+    the flask request object
+    """
+    body = request.get_json(force=True)
+    if not body or 'tokens' not in body:
+        return None
+
+    tokens = body['tokens']
+    if not isinstance(tokens, list) or len(tokens) > maxTokens:
+        return None
+
+    if not all(isinstance(token, str) for token in tokens):
+        return None
+
+    return tokens
+
+
+def getUserIdsFromRequestBody(request, maxUserIds: int):
+    """
+    helper function to retrieve a list of at most maxUserIds user ids from
+    the flask request object
+    """
+    body = request.get_json(force=True)
+    if not body or 'userIds' not in body:
+        return None
+
+    userIds = body['userIds']
+    if not isinstance(userIds, list) or len(userIds) > maxUserIds:
+        return None
+
+    if not all(isinstance(userId, str) and userId for userId in userIds):
+        return None
+
+    return userIds
+
+
 def isRequestFromSavedTokenHolder(request, token):
     """
     Function takes a flask request object and a token database entry
@@ -0,0 +1,144 @@
+import heapq
+import threading
+import time
+
+
+class RevocationList:
+    """
+    In-memory set of revoked token ids. Every id is kept only until the
+    token it belongs to expires, after which it can no longer be used
+    anyway, so the set only ever holds tokens revoked within the last
+    token lifetime
+    """
+    __instance = None
+
+    @staticmethod
+    def get_instance():
+        """
+        Method to get the singleton instance of the RevocationList
+        class
+        """
+        if RevocationList.__instance is None:
+            msg = 'RevocationList must be instantiated \
+                    before using this method'
+            raise Exception(msg)
+        return RevocationList.__instance
+
+    def __init__(self, default_ttl: int, clock=time.time):
+        if RevocationList.__instance is not None:
+            msg = 'RevocationList has already been \
+                    instantiated and is a singleton'
+            raise Exception(msg)
+        else:
+            self._default_ttl = default_ttl
+            self._clock = clock
+            self._lock = threading.Lock()
+            self._expiries = {}
+            # when every token was revoked, so other instances can fetch
+            # only the revocations made since they last synced
+            self._revoked_at = {}
+            self._heap = []
+            self._sync_thread = None
+
+            RevocationList.__instance = self
+
+    def _purge(self, now: float):
+        """
+        Method to drop every id whose token has expired. Must be called
+        while holding the lock
+        """
+        while self._heap and self._heap[0][0] <= now:
+            expiresAt, tokenId = heapq.heappop(self._heap)
+            if self._expiries.get(tokenId) == expiresAt:
+                del self._expiries[tokenId]
+                del self._revoked_at[tokenId]
+
+    def revoke(self, tokenId: str, expiresAt: float = None,
+               revokedAt: float = None):
+        """
+        Method to revoke the token with the given id until expiresAt, which
+        should be the token's exp claim. If no expiry is known the token
+        lifetime is used as an upper bound. revokedAt defaults to now.
+        Returns the time the revocation expires at
+        """
+        if not tokenId:
+            return None
+
+        now = self._clock()
+        if expiresAt is None:
+            expiresAt = now + self._default_ttl
+        if expiresAt <= now:
+            return None
+
+        with self._lock:
+            self._purge(now)
+            if self._expiries.get(tokenId, 0) >= expiresAt:
+                return self._expiries[tokenId]
+            self._expiries[tokenId] = expiresAt
+            self._revoked_at[tokenId] = now if revokedAt is None else revokedAt
+            heapq.heappush(self._heap, (expiresAt, tokenId))
+            return expiresAt
+
+    def merge(self, revocations):
+        """
+        Method to add a list of (tokenId, expiresAt, revokedAt) tuples, used
+        to pick up revocations made by other instances
+        """
+        for tokenId, expiresAt, revokedAt in revocations:
+            self.revoke(tokenId, float(expiresAt),
+                        None if revokedAt is None else float(revokedAt))
+
+    def is_revoked(self, tokenId: str) -> bool:
+        """Method to check if the token with the given id was revoked"""
+        if not tokenId:
+            return False
+
+        with self._lock:
+            expiresAt = self._expiries.get(tokenId)
+            return expiresAt is not None and expiresAt > self._clock()
+
+    def get_revocations(self, since: float = None):
+        """
+        Method to get every active revocation as (tokenId, expiresAt,
+        revokedAt) tuples, or only those revoked after since
+        """
+        with self._lock:
+            self._purge(self._clock())
+            return [(tokenId, expiresAt, self._revoked_at[tokenId])
+                    for tokenId, expiresAt in self._expiries.items()
+                    if since is None or self._revoked_at[tokenId] > since]
+
+    def start_sync(self, fetch, interval: float, overlap: float = 30):
+        """
+        Method to start a background thread that calls fetch every
+        interval seconds and merges the (tokenId, expiresAt, revokedAt)
+        tuples it returns. fetch is passed the time to fetch revocations
+        made after, which is None the first time so every revocation is
+        fetched. Later fetches reach overlap seconds further back than the
+        previous one started, which must cover clock skew between instances
+        and how long a revocation takes to reach the source being fetched.
+        Errors are ignored so a failed fetch is retried on the next interval
+        """
+        if self._sync_thread is not None:
+            return
+
+        def sync():
+            since = None
+            while True:
+                startedAt = self._clock()
+                try:
+                    self.merge(fetch(since))
+                    since = startedAt - overlap
+                except Exception:
+                    pass
+                time.sleep(interval)
+
+        self._sync_thread = threading.Thread(
+            target=sync, name='revocation-sync', daemon=True)
+        self._sync_thread.start()
+
+    def stats(self) -> dict:
+        """Method to get the number of active revocations"""
+        with self._lock:
+            self._purge(self._clock())
+            return {'revokedTokens': len(self._expiries)}
@@ -1,8 +1,40 @@
 import jwt
-from datetime import datetime, timedelta
+from cryptography.hazmat.backends import default_backend
+from cryptography.hazmat.primitives import serialization
+from cryptography.hazmat.primitives.asymmetric import ec, ed25519, rsa
+from hashlib import sha256
+from jwt.algorithms import get_default_algorithms
+from jwt.utils import base64url_encode
 import json
+import time
 from typing import Dict
 from uuid import uuid4
+from utils.cache import TTLCache
+
+
+# key types accepted for each supported signing algorithm
+SUPPORTED_ALGORITHMS = {
+    'RS256': (rsa.RSAPrivateKey, rsa.RSAPublicKey),
+    'ES256': (ec.EllipticCurvePrivateKey, ec.EllipticCurvePublicKey),
+    'EdDSA': (ed25519.Ed25519PrivateKey, ed25519.Ed25519PublicKey),
+}
+
+# JWK curve names of the elliptic curves keys can be exported for
+EC_CURVE_NAMES = {
+    'secp256r1': 'P-256',
+    'secp384r1': 'P-384',
+    'secp521r1': 'P-521',
+}
+
+# payload keys are stored under short, mostly registered, claim names so
+# tokens stay small. Keys not listed here are stored as they are
+CLAIM_NAMES = {
+    'userId': 'sub',
+    'tokenId': 'jti',
+    'tokenType': 'typ',
+    'accessTokenId': 'ati',
+}
+PAYLOAD_KEYS = {claim: key for key, claim in CLAIM_NAMES.items()}
 
 
 class JsonWebToken:
@@ -16,16 +48,127 @@ class JsonWebToken:
             raise Exception(msg)
         return JsonWebToken.__instance
 
-    def __init__(self, public_key, private_key):
+    def __init__(self, public_key, private_key, algorithm: str = 'RS256',
+                 cache_size: int = 10000, additional_public_keys=()):
         if JsonWebToken.__instance is not None:
             msg = 'JsonWebToken has already been \
                     instantiated and is a singleton'
             raise Exception(msg)
+        elif algorithm not in SUPPORTED_ALGORITHMS:
+            raise Exception(f'unsupported token algorithm {algorithm}')
         else:
+            self._algorithm = algorithm
             self._private_key = private_key
             self._public_key = public_key
+            self._signing_key = JsonWebToken._load_private_key(private_key)
+            self._verifying_key = JsonWebToken._load_public_key(public_key)
+            JsonWebToken._check_key_types(
+                algorithm, self._signing_key, self._verifying_key)
+
+            # keys that can verify tokens by key id. Retired keys are kept
+            # here until every token they signed has expired
+            self._verifying_keys = {}
+            for additional_public_key in additional_public_keys:
+                key = JsonWebToken._load_public_key(additional_public_key)
+                JsonWebToken._check_key_types(algorithm, None, key)
+                self._verifying_keys[self._get_key_id(key)] = key
+
+            self._key_id = None
+            if self._verifying_key is not None:
+                self._key_id = self._get_key_id(self._verifying_key)
+                self._verifying_keys[self._key_id] = self._verifying_key
+            self._verified_tokens = TTLCache(cache_size)
             JsonWebToken.__instance = self
 
+    @staticmethod
+    def _load_private_key(private_key: str):
+        """
+        Method to parse a PEM encoded private key into a key object once
+        so it does not have to be parsed again for every signature
+        """
+        if private_key is None:
+            return None
+
+        return serialization.load_pem_private_key(
+            private_key.encode(), password=None, backend=default_backend())
+
+    @staticmethod
+    def _load_public_key(public_key: str):
+        """
+        Method to parse a PEM encoded public key into a key object once
+        so it does not have to be parsed again for every verification
+        """
+        if public_key is None:
+            return None
+
+        return serialization.load_pem_public_key(
+            public_key.encode(), backend=default_backend())
+
+    @staticmethod
+    def _check_key_types(algorithm: str, signing_key, verifying_key):
+        """
+        Method to ensure the configured keys can be used with the
+        configured algorithm so a mismatch fails at startup instead of
+        on every request
+        """
+        private_key_type, public_key_type = SUPPORTED_ALGORITHMS[algorithm]
+        if signing_key is not None \
+                and not isinstance(signing_key, private_key_type):
+            raise Exception(f'private key cannot be used with {algorithm}')
+        if verifying_key is not None \
+                and not isinstance(verifying_key, public_key_type):
+            raise Exception(f'public key cannot be used with {algorithm}')
+
+    def _to_jwk(self, public_key) -> Dict:
+        """Method to convert a public key to a JSON Web Key"""
+        if isinstance(public_key, ec.EllipticCurvePublicKey):
+            # the pinned PyJWT cannot export EC keys, so build the JWK from
+            # the curve point with coordinates padded to the curve size
+            numbers = public_key.public_numbers()
+            size = (public_key.curve.key_size + 7) // 8
+            return {
+                'kty': 'EC',
+                'crv': EC_CURVE_NAMES[public_key.curve.name],
+                'x': base64url_encode(numbers.x.to_bytes(size, 'big')).decode(),
+                'y': base64url_encode(numbers.y.to_bytes(size, 'big')).decode(),
+            }
+
+        algorithm = get_default_algorithms()[self._algorithm]
+        return json.loads(algorithm.to_jwk(public_key))
+
+    def _get_key_id(self, public_key) -> str:
+        """
+        Method to get the id of a public key as its RFC 7638 thumbprint, so
+        every instance derives the same id from the same key
+        """
+        jwk = self._to_jwk(public_key)
+        required = {name: value for name, value in jwk.items()
+                    if name in ('crv', 'e', 'kty', 'n', 'x', 'y')}
+        canonical = json.dumps(required, sort_keys=True,
+                               separators=(',', ':'))
+        return base64url_encode(sha256(canonical.encode()).digest()).decode()
+
+    def get_key_id(self):
+        """Method to get the id of the key used to sign new tokens"""
+        return self._key_id
+
+    def get_jwks(self) -> Dict:
+        """
+        Method to get every key that can verify tokens as a JSON Web Key Set
+        """
+        keys = []
+        for key_id, public_key in self._verifying_keys.items():
+            jwk = self._to_jwk(public_key)
+            jwk.pop('key_ops', None)
+            jwk.update({'kid': key_id, 'use': 'sig', 'alg': self._algorithm})
+            keys.append(jwk)
+
+        return {'keys': keys}
+
+    def get_algorithm(self):
+        """Method to get the algorithm used to sign tokens"""
+        return self._algorithm
+
     def get_public_key(self):
         """Method to get the public key for the token manager"""
         return self._public_key
@@ -39,55 +182,119 @@ class JsonWebToken:
         Method to create a JSON Web Token containing the Id of
         a user
         """
+        tokenId, token, _ = self.create_with_expiry(
+            payload, timeToLiveInSeconds)
+        return tokenId, token
+
+    def create_with_expiry(self, payload: Dict, timeToLiveInSeconds: int):
+        """
+        Method to create a JSON Web Token and also return its expiry as
+        epoch seconds, so the token can be saved with the same expiry
+        """
         try:
             # create a token id and add to the payload
             tokenId = uuid4().hex
             payload['tokenId'] = tokenId
 
+            expiresAt = int(time.time()) + timeToLiveInSeconds
             token = jwt.encode(
-                {
-                    'payload': json.dumps(payload),
-                    "exp": datetime.utcnow() + timedelta(
-                        seconds=timeToLiveInSeconds)
-                },
-                self._private_key.encode(),
-                algorithm="RS256"
+                JsonWebToken._to_claims(payload, expiresAt),
+                self._signing_key,
+                algorithm=self._algorithm,
+                headers={'kid': self._key_id}
             )
-            return tokenId, token
+            return tokenId, token, expiresAt
         except Exception as e:
             print(e)
-            return None, None
+            return None, None, None
 
-    def decode(self, token: str) -> Dict:
+    @staticmethod
+    def _to_claims(payload: Dict, expiresAt: int) -> Dict:
+        """helper function to store a payload as flat token claims"""
+        claims = {CLAIM_NAMES.get(key, key): value
+                  for key, value in payload.items()}
+        claims['exp'] = expiresAt
+        return claims
+
+    @staticmethod
+    def _from_claims(claims: Dict) -> Dict:
         """
-        Function to decode and return the Id of a user contained in
-        a JSON Web Token
+        helper function to get the payload stored in token claims. Tokens
+        created before claims were flattened keep the payload as a JSON
+        string in the 'payload' claim
+        """
+        if 'payload' in claims:
+            return json.loads(claims['payload'])
+
+        return {PAYLOAD_KEYS.get(claim, claim): value
+                for claim, value in claims.items() if claim != 'exp'}
+
+    def get_cache_stats(self) -> Dict:
+        """Method to get the counters of the verified token cache"""
+        return self._verified_tokens.stats()
+
+    def decode_with_expiry(self, token: str):
+        """
+        Function to verify a JSON Web Token and return its payload along
+        with the epoch time it expires at. Tokens that have already been
+        verified are served from the cache until they expire
         """
         try:
+            key = sha256(token.encode()).digest()
+            cached = self._verified_tokens.get(key)
+            if cached is not None:
+                decoded, exp = cached
+                return dict(decoded), exp
+
+            # tokens signed before key ids were added have no kid header
+            key_id = jwt.get_unverified_header(token).get('kid')
+            verifying_key = self._verifying_keys.get(key_id) \
+                if key_id else self._verifying_key
+
             payload = jwt.decode(
-                token, self._public_key.encode(), algorithms=["RS256"])
+                token, verifying_key, algorithms=[self._algorithm])
 
-            if payload is None or 'payload' not in payload:
-                return None
+            if not payload:
+                return None, None
 
-            return json.loads(payload['payload'])
+            decoded = JsonWebToken._from_claims(payload)
+            exp = payload.get('exp')
+            if exp is not None:
+                self._verified_tokens.set(key, (decoded, exp), exp)
+            return dict(decoded), exp
         except Exception:
-            return None
+            return None, None
 
-    def decode_without_verification(self, token: str) -> Dict:
+    def decode(self, token: str) -> Dict:
         """
         Function to decode and return the Id of a user contained in
         a JSON Web Token
         """
+        payload, _ = self.decode_with_expiry(token)
+        return payload
+
+    def decode_without_verification_with_expiry(self, token: str):
+        """
+        Function to decode a JSON Web Token without verifying it and return
+        its payload along with the epoch time it expires at
+        """
         try:
             payload = jwt.decode(
                 token,
-                self._public_key.encode(),
-                algorithms=["RS256"],
+                self._verifying_key,
+                algorithms=[self._algorithm],
                 options={'verify_signature': False})
-            if not payload or 'payload' not in payload:
-                return None
+            if not payload:
+                return None, None
 
-            return json.loads(payload['payload'])
+            return JsonWebToken._from_claims(payload), payload.get('exp')
         except Exception:
-            return None
+            return None, None
+
+    def decode_without_verification(self, token: str) -> Dict:
+        """
+        Function to decode and return the Id of a user contained in
+        a JSON Web Token
+        """
+        payload, _ = self.decode_without_verification_with_expiry(token)
+        return payload
@@ -1,19 +1,76 @@
 from flask import Flask, request, make_response
 from flask_cors import CORS
 from middleware.tokens import authTokenRequired
-from utils.requests import getCreateGroupFieldsFromRequest
+from utils.revocation import RevocationList, fetchRevocations
+from utils.requests import (
+    getCreateGroupFieldsFromRequest,
+    getGroupNamesFromRequest,
+    getMembershipChangesFromRequest,
+    getLimitFromRequest
+)
+from utils.cursors import encodeCursor, decodeCursor
 from db.queries import (
     queryCreateNewGroup,
     queryGetGroupByName,
     queryGetGroupsPaginated,
+    queryGetGroupsOrderedPaginated,
     queryDeleteGroupWithName,
     queryUpdateGroup,
     queryCreateNewGroupMembership,
     queryLookupMembership,
     queryDeleteMembership,
     queryGetGroupMembersPaginated,
-    queryGetUsersGroups
+    queryGetUsersGroups,
+    queryGetGroupsByNames,
+    queryLookupMemberships,
+    queryChangeMemberships,
+    queryGetAllGroupNames,
+    group_name_index,
+    GroupAlreadyExistsError,
+    GroupNotFoundError,
+    NotGroupCreatorError,
+    MembershipAlreadyExistsError,
+    MembershipNotFoundError,
+    LISTING_INDEXES
 )
+import os
+
+# load environment variables
+auth_service_url = os.environ.get('AUTH_SERVICE_URL')
+revocation_sync_interval = float(
+    os.environ.get('REVOCATION_SYNC_INTERVAL', 5))
+group_batch_max_names = int(os.environ.get('GROUP_BATCH_MAX_NAMES', 100))
+membership_batch_max_changes = int(
+    os.environ.get('MEMBERSHIP_BATCH_MAX_CHANGES', 25))
+group_search_max_limit = int(os.environ.get('GROUP_SEARCH_MAX_LIMIT', 50))
+group_page_max_limit = int(os.environ.get('GROUP_PAGE_MAX_LIMIT', 100))
+
+# groups with these names could not be read since the static routes under
+# /api/v1/groups/ take precedence over /api/v1/groups/<groupName>
+RESERVED_GROUP_NAMES = {'search', 'batch', 'user', 'health-check'}
+
+# keep a copy of the auth service's revoked token ids in memory
+access_token_lifetime = 60 * 20
+revocation_list = RevocationList(access_token_lifetime)
+if auth_service_url:
+    revocation_list.start_sync(
+        lambda since: fetchRevocations(auth_service_url, since),
+        revocation_sync_interval)
+
+# fill the group name search index in the background with one scan of the
+# groups table. After that it is kept up to date as groups are created and
+# deleted. Groups created or deleted by other instances are only picked up
+# if GROUP_SEARCH_REFRESH_INTERVAL is set, which rescans the whole table
+group_search_scan_segments = int(
+    os.environ.get('GROUP_SEARCH_SCAN_SEGMENTS', 4))
+
+
+def loadGroupNames():
+    return queryGetAllGroupNames(group_search_scan_segments)
+
+
+group_name_index.start_build(
+    loadGroupNames, float(os.environ.get('GROUP_SEARCH_REFRESH_INTERVAL', 0)))
 
 
 # Create a new Flask app
@@ -27,21 +84,75 @@ CORS(app, resources={r"/*": {"origins": "*"}})
 # ENDPOINT: /api/v1/groups?lastReceivedName=<lastReceivedName>&limit=<limit>
 # EXCEPTED METHODS: GET
 #
-#
+# orderBy=<members|activity>&cursor=<cursor> lists the groups with the
+# most members or the most recent activity first
 ##########################################################
 @app.route('/api/v1/groups', methods=['GET'])
 @authTokenRequired
 def handleGetGroupsRequest(context={}):
     # Get query parameters used for paginated requests
     lastReceivedName = request.args.get('lastReceivedName') or None
-    limit = request.args.get('limit') or 20
-
-    # query db for list of groups
-    groups = queryGetGroupsPaginated(lastReceivedName, limit)
+    limit = getLimitFromRequest(request, 20, group_page_max_limit)
+    orderBy = request.args.get('orderBy') or None
+
+    if limit is None:
+        return {'error': 'limit must be a number between 1 and '
+                         f'{group_page_max_limit}'}, 400
+
+    if orderBy is None:
+        # query db for list of groups
+        groups = queryGetGroupsPaginated(lastReceivedName, limit)
+        if groups is None:
+            return {'error': 'Unable to query groups in database'}, 500
+
+        return {'groups': groups}, 200
+
+    if orderBy not in LISTING_INDEXES:
+        return {'error': 'orderBy must be one of members or activity'}, 400
+
+    # the cursor is only valid for the order it was created for
+    position = None
+    cursor = request.args.get('cursor') or None
+    if cursor:
+        data = decodeCursor(cursor)
+        if not data or data.get('orderBy') != orderBy \
+                or not isinstance(data.get('position'), dict):
+            return {'error': 'invalid cursor'}, 400
+        position = data['position']
+
+    groups, nextPosition = queryGetGroupsOrderedPaginated(
+        orderBy, position, limit)
     if groups is None:
         return {'error': 'Unable to query groups in database'}, 500
 
-    return {'groups': groups}, 200
+    nextCursor = None
+    if nextPosition:
+        nextCursor = encodeCursor(
+            {'orderBy': orderBy, 'position': nextPosition})
+
+    return {'groups': groups, 'nextCursor': nextCursor}, 200
+
+
+##########################################################
+# ENDPOINT: /api/v1/groups/search?prefix=<prefix>&limit=<limit>
+# EXCEPTED METHODS: GET
+#
+# served from memory without querying the database
+##########################################################
+@app.route('/api/v1/groups/search', methods=['GET'])
+@authTokenRequired
+def handleSearchGroupsRequest(context={}):
+    prefix = request.args.get('prefix') or ''
+    limit = getLimitFromRequest(request, 10, group_search_max_limit)
+
+    if not prefix:
+        return {'error': 'a prefix must be provided'}, 400
+
+    if limit is None:
+        return {'error': 'limit must be a number between 1 and '
+                         f'{group_search_max_limit}'}, 400
+
+    return {'groupNames': group_name_index.search(prefix, limit)}, 200
 
 
 ##########################################################
@@ -76,18 +187,49 @@ def handleCreateGroupRequest(context={}):
     if group is None:
         return {'error': 'request body does not contain a valid group'}, 400
 
-    existingGroup = queryGetGroupByName(group['name'])
-    if existingGroup:
-        return {'error': 'group with given name already exists'}, 400
+    if group['name'] in RESERVED_GROUP_NAMES:
+        return {'error': 'group name is reserved'}, 400
 
-    groupName = queryCreateNewGroup(
-        userId, group['name'], group['description'])
+    try:
+        groupName = queryCreateNewGroup(
+            userId, group['name'], group['description'])
+    except GroupAlreadyExistsError:
+        return {'error': 'group with given name already exists'}, 400
     if groupName is None:
         return {'error': 'unable to create new group'}, 500
 
     return {'groupName': groupName}, 200
 
 
+##########################################################
+# ENDPOINT: /api/v1/groups/batch
+# EXCEPTED METHODS: POST
+#
+# returns every requested group along with whether the caller is a member
+##########################################################
+@app.route('/api/v1/groups/batch', methods=['POST'])
+@authTokenRequired
+def handleGetGroupsBatchRequest(context={}):
+    userId = context.get('userId')
+
+    groupNames = getGroupNamesFromRequest(request, group_batch_max_names)
+    if groupNames is None:
+        return {'error': f'a list of at most {group_batch_max_names} '
+                         'group names must be provided'}, 400
+
+    groups = queryGetGroupsByNames(groupNames)
+    memberships = queryLookupMemberships(groupNames, userId)
+    if groups is None or memberships is None:
+        return {'error': 'unable to retrieve groups'}, 500
+
+    return {'groups': {
+        groupName: {
+            'group': group,
+            'isMember': groupName in memberships,
+        } for groupName, group in groups.items()
+    }}, 200
+
+
 ##########################################################
 # ENDPOINT: /api/v1/groups/<group_id>
 # EXCEPTED METHODS: PUT
@@ -104,19 +246,14 @@ def handleUpdateGroupRequest(groupName, context={}):
     if updatedGroup is None:
         return {'error': 'request body does not contain a valid group'}, 400
 
-    # Retrieve the existing group
-    group = queryGetGroupByName(groupName)
-    if not group:
+    # Update the group only if the user is the one who created it
+    try:
+        wasUpdated = queryUpdateGroup(
+            groupName, updatedGroup['description'], userId)
+    except GroupNotFoundError:
         return {'error': 'no group found with matching id'}, 400
-
-    # check that the user is the one who created the group
-    createdBy = group['created_by']
-    if createdBy != userId:
+    except NotGroupCreatorError:
         return {'error': 'cannot update a group you did not create'}, 403
-
-    # Update the group in the database
-    wasUpdated = queryUpdateGroup(
-        groupName, updatedGroup['description'])
     if not wasUpdated:
         return {'error': 'unable to update group'}, 500
 
@@ -127,22 +264,21 @@ def handleUpdateGroupRequest(groupName, context={}):
 # ENDPOINT: /api/v1/groups/<groupName>
 # EXCEPTED METHODS: DELETE
 #
-#
+# the memberships of the group are deleted with it. A delete that fails
+# part way can be retried, and the name cannot be reused until it succeeds
 ##########################################################
 @app.route('/api/v1/groups/<groupName>', methods=['DELETE'])
 @authTokenRequired
 def handleDeleteGroupsRequest(groupName, context={}):
     userId = context.get('userId')
 
-    group = queryGetGroupByName(groupName)
-    if not group:
+    # delete the group only if the user is the one who created it
+    try:
+        wasDeleted = queryDeleteGroupWithName(groupName, userId)
+    except GroupNotFoundError:
         return {'error': 'no group found with matching id'}, 400
-
-    createdBy = group['created_by']
-    if createdBy != userId:
+    except NotGroupCreatorError:
         return {'error': 'cannot delete a group you did not create'}, 403
-
-    wasDeleted = queryDeleteGroupWithName(groupName)
     if not wasDeleted:
         return {'error': 'could not delete group'}, 500
 
@@ -150,27 +286,43 @@ def handleDeleteGroupsRequest(groupName, context={}):
 
 
 ##########################################################
-# ENDPOINT: /api/v1/groups/<groupName>/members?limit=<limit>&lastReceivedId=<lastReceivedId>
+# ENDPOINT: /api/v1/groups/<groupName>/members?limit=<limit>&cursor=<cursor>
 # EXCEPTED METHODS: GET
 #
-#
+# lastReceivedId=<lastReceivedId> is still accepted in place of a cursor
 ##########################################################
 @app.route('/api/v1/groups/<groupName>/members', methods=['GET'])
 @authTokenRequired
 def handleGetGroupMembersRequest(groupName, context={}):
     # Get query parameters used for paginated requests
+    cursor = request.args.get('cursor') or None
     lastReceivedId = request.args.get('lastReceivedId') or None
-    limit = request.args.get('limit') or 20
+    limit = getLimitFromRequest(request, 20, group_page_max_limit)
+
+    if limit is None:
+        return {'error': 'limit must be a number between 1 and '
+                         f'{group_page_max_limit}'}, 400
+
+    # the cursor is only valid for the group it was created for
+    startKey = None
+    if cursor:
+        startKey = decodeCursor(cursor)
+        if not startKey or startKey.get('groupName') != groupName:
+            return {'error': 'invalid cursor'}, 400
+    elif lastReceivedId:
+        startKey = {'groupName': groupName, 'userId': lastReceivedId}
 
     group = queryGetGroupByName(groupName)
     if not group:
         return {'error': 'invalid group id'}, 400
 
-    members = queryGetGroupMembersPaginated(groupName, lastReceivedId, limit)
+    members, lastEvaluatedKey = queryGetGroupMembersPaginated(
+        groupName, startKey, limit)
     if members is None:
         return {'error': 'unable to retrieve group members'}, 500
 
-    return {'members': members}, 200
+    return {'members': members,
+            'nextCursor': encodeCursor(lastEvaluatedKey)}, 200
 
 
 ##########################################################
@@ -200,11 +352,12 @@ def handleGetGroupMemberRequest(groupName, user_id, context={}):
 def handleAddGroupMemberRequest(groupName, context={}):
     userId = context.get('userId')
 
-    membership = queryLookupMembership(groupName, userId)
-    if membership:
+    try:
+        wasCreated = queryCreateNewGroupMembership(groupName, userId)
+    except MembershipAlreadyExistsError:
         return {'error': 'membership already exists'}, 400
-
-    wasCreated = queryCreateNewGroupMembership(groupName, userId)
+    except GroupNotFoundError:
+        return {'error': 'could not find group with given name'}, 400
     if not wasCreated:
         return {'error': 'unable to create new group membership'}, 500
 
@@ -222,11 +375,10 @@ def handleAddGroupMemberRequest(groupName, context={}):
 def handleDeleteGroupMemberRequest(groupName, context={}):
     userId = context.get('userId')
 
-    membership = queryLookupMembership(groupName, userId)
-    if not membership:
+    try:
+        wasDeleted = queryDeleteMembership(groupName, userId)
+    except MembershipNotFoundError:
         return {'error': 'membership does not exist'}, 400
-
-    wasDeleted = queryDeleteMembership(groupName, userId)
     if not wasDeleted:
         return {'error': 'unable to delete the membership'}, 500
 
@@ -234,7 +386,7 @@ def handleDeleteGroupMemberRequest(groupName, context={}):
 
 
 ##########################################################
-# ENDPOINT: /api/v1/groups/user
+# ENDPOINT: /api/v1/groups/user?limit=<limit>&lastReceivedName=<lastReceivedName>
 # EXCEPTED METHODS: GET
 #
 #
@@ -244,11 +396,46 @@ def handleDeleteGroupMemberRequest(groupName, context={}):
 def handleGetUsersGroupsRequest(context={}):
     userId = context.get('userId')
 
-    groups = queryGetUsersGroups(userId)
+    # without a limit every group the user is a member of is returned
+    lastReceivedName = request.args.get('lastReceivedName') or None
+    limit = None
+    if request.args.get('limit'):
+        limit = getLimitFromRequest(request, None, group_page_max_limit)
+        if limit is None:
+            return {'error': 'limit must be a number between 1 and '
+                             f'{group_page_max_limit}'}, 400
+
+    groups, lastEvaluatedName = queryGetUsersGroups(
+        userId, lastReceivedName, limit)
     if groups is None:
         return {'error': 'could not retrieved user\'s groups'}, 500
 
-    return {'groups': groups}, 200
+    return {'groups': groups, 'lastEvaluatedName': lastEvaluatedName}, 200
+
+
+##########################################################
+# ENDPOINT: /api/v1/groups/user/memberships
+# EXCEPTED METHODS: POST
+#
+# joins the groups listed in join and leaves the groups listed in leave,
+# returning the outcome for every group
+##########################################################
+@app.route('/api/v1/groups/user/memberships', methods=['POST'])
+@authTokenRequired
+def handleChangeMembershipsRequest(context={}):
+    userId = context.get('userId')
+
+    changes = getMembershipChangesFromRequest(
+        request, membership_batch_max_changes)
+    if changes is None:
+        return {'error': 'request body must contain join and leave lists '
+                         f'of at most {membership_batch_max_changes} '
+                         'distinct group names'}, 400
+
+    results = queryChangeMemberships(
+        userId, changes['join'], changes['leave'])
+
+    return {'results': results}, 200
 
 
 ##########################################################
@@ -0,0 +1,129 @@
+from concurrent.futures import ThreadPoolExecutor
+from boto3.dynamodb.conditions import Key
+from db.queries import listingPartitionFor
+import argparse
+import boto3
+import os
+import time
+
+
+groups_table_name = os.environ.get('GROUPS_DYNAMODB_TABLE_NAME')
+members_table_name = os.environ.get('MEMBERS_DYNAMODB_TABLE_NAME')
+user_groups_table_name = os.environ.get('USER_GROUPS_DYNAMODB_TABLE_NAME')
+aws_region = os.environ.get('AWS_REGION')
+
+
+def scanSegment(table_name, segment, total_segments, **kwargs):
+    """
+    helper function to yield every item in one segment of a parallel scan.
+    boto3 resources are not thread safe so every segment creates its own
+    """
+    session = boto3.session.Session()
+    table = session.resource('dynamodb', region_name=aws_region).Table(table_name)
+
+    kwargs.update(Segment=segment, TotalSegments=total_segments)
+    while True:
+        scan = table.scan(**kwargs)
+        yield from scan.get('Items', [])
+
+        if 'LastEvaluatedKey' not in scan:
+            return
+        kwargs['ExclusiveStartKey'] = scan['LastEvaluatedKey']
+
+
+def backfillUserGroupsSegment(segment, total_segments):
+    """
+    helper function to copy the memberships in one scan segment of the
+    members table to the user groups table
+    """
+    session = boto3.session.Session()
+    user_groups_table = session.resource(
+        'dynamodb', region_name=aws_region).Table(user_groups_table_name)
+
+    written = 0
+    with user_groups_table.batch_writer(
+            overwrite_by_pkeys=['userId', 'groupName']) as batch:
+        for membership in scanSegment(
+                members_table_name, segment, total_segments,
+                ProjectionExpression='groupName, userId'):
+            batch.put_item(Item={
+                'groupName': membership['groupName'],
+                'userId': membership['userId'],
+            })
+            written += 1
+
+    return written
+
+
+def backfillGroupListingSegment(segment, total_segments):
+    """
+    helper function to set the member count and listing attributes of the
+    groups in one scan segment of the groups table. Memberships changed
+    while a group is being counted can make its count drift, so this should
+    run before the service starts maintaining the counts
+    """
+    session = boto3.session.Session()
+    dynamodb = session.resource('dynamodb', region_name=aws_region)
+    groups_table = dynamodb.Table(groups_table_name)
+    members_table = dynamodb.Table(members_table_name)
+
+    updated = 0
+    for group in scanSegment(groups_table_name, segment, total_segments,
+                             ProjectionExpression='groupName'):
+        memberCount = 0
+        kwargs = {
+            'KeyConditionExpression': Key('groupName').eq(group['groupName']),
+            'Select': 'COUNT',
+        }
+        while True:
+            query = members_table.query(**kwargs)
+            memberCount += query['Count']
+            if 'LastEvaluatedKey' not in query:
+                break
+            kwargs['ExclusiveStartKey'] = query['LastEvaluatedKey']
+
+        groups_table.update_item(
+            Key={'groupName': group['groupName']},
+            UpdateExpression='SET memberCount = :memberCount, '
+                             'listingPartition = :listingPartition, '
+                             'lastActivityAt = if_not_exists(lastActivityAt, :now)',
+            ExpressionAttributeValues={
+                ':memberCount': memberCount,
+                ':listingPartition': listingPartitionFor(group['groupName']),
+                ':now': int(time.time()),
+            })
+        updated += 1
+
+    return updated
+
+
+def runInParallel(func, segments):
+    """
+    helper function to run func for every scan segment in parallel and
+    return the sum of the results
+    """
+    with ThreadPoolExecutor(max_workers=segments) as executor:
+        return sum(executor.map(
+            lambda segment: func(segment, segments), range(segments)))
+
+
+def main():
+    """
+    Builds the indexes derived from the groups and members tables from the
+    data already in them. Safe to run again since every write is idempotent
+    """
+    parser = argparse.ArgumentParser(
+        description='backfill the groups service indexes')
+    parser.add_argument('--segments', type=int, default=4,
+                        help='number of scan segments processed in parallel')
+    args = parser.parse_args()
+
+    written = runInParallel(backfillUserGroupsSegment, args.segments)
+    print(f'wrote {written} user groups entries')
+
+    updated = runInParallel(backfillGroupListingSegment, args.segments)
+    print(f'updated the member count of {updated} groups')
+
+
+if __name__ == '__main__':
+    main()
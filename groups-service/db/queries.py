@@ -1,52 +1,308 @@
 from uuid import uuid4
 import boto3
-from boto3.dynamodb.conditions import Key, Attr
+from botocore.exceptions import ClientError
+from concurrent.futures import ThreadPoolExecutor
+from boto3.dynamodb.conditions import Key
+from decimal import Decimal
+from utils.cache import ReadThroughCache
+from utils.prefix_index import PrefixIndex
+import heapq
 import os
+import random
+import time
+import zlib
 
 
 groups_table_name = os.environ.get('GROUPS_DYNAMODB_TABLE_NAME')
 members_table_name = os.environ.get('MEMBERS_DYNAMODB_TABLE_NAME')
+# inverted copy of the members table keyed by userId then groupName
+user_groups_table_name = os.environ.get('USER_GROUPS_DYNAMODB_TABLE_NAME')
 
 dynamodb = boto3.resource('dynamodb', region_name=os.environ.get('AWS_REGION'))
 groups_table = dynamodb.Table(groups_table_name)
 members_table = dynamodb.Table(members_table_name)
+user_groups_table = dynamodb.Table(user_groups_table_name)
+# the resource's client converts python types just like the tables do
+dynamodb_client = dynamodb.meta.client
+
+# groups are spread over several listing partitions so member count
+# updates and listing reads do not all land on one index partition. Every
+# instance and backfill.py must use the same number of shards, and
+# backfill.py must run again after it changes
+LISTING_SHARDS = int(os.environ.get('GROUP_LISTING_SHARDS', 8))
+LISTING_PARTITIONS = [f'all#{shard}' for shard in range(LISTING_SHARDS)]
+# index and sort key used to order the groups for each orderBy value
+LISTING_INDEXES = {
+    'members': ('memberCountIndex', 'memberCount'),
+    'activity': ('lastActivityIndex', 'lastActivityAt'),
+}
+# attributes only used to maintain the table, which are not sent to users.
+# The listing sort keys are sent since groups are ordered by them
+INTERNAL_GROUP_ATTRIBUTES = {'listingPartition', 'deletedAt'}
+
+
+class GroupAlreadyExistsError(Exception):
+    """
+    Raised when creating a group with a name that is already in use
+    """
+
+
+class GroupNotFoundError(Exception):
+    """
+    Raised when changing a group that does not exist
+    """
+
+
+class NotGroupCreatorError(Exception):
+    """
+    Raised when a user changes a group they did not create
+    """
+
+
+class MembershipAlreadyExistsError(Exception):
+    """
+    Raised when adding a user to a group they are already a member of
+    """
+
+
+class MembershipNotFoundError(Exception):
+    """
+    Raised when removing a user from a group they are not a member of
+    """
+
+
+class UnprocessedKeysError(Exception):
+    """
+    Raised when DynamoDB still has not processed some keys of a batch read
+    after every retry
+    """
+
+
+def formatGroup(group):
+    """
+    helper function to turn the numbers DynamoDB returns as Decimals into
+    ints and drop the internal attributes so the group can be sent as JSON
+    """
+    return {key: int(value) if isinstance(value, Decimal) else value
+            for key, value in group.items()
+            if key not in INTERNAL_GROUP_ATTRIBUTES}
+
+
+def listingPartitionFor(groupName):
+    """
+    helper function to get the listing partition of a group. The same name
+    always maps to the same partition
+    """
+    return LISTING_PARTITIONS[zlib.crc32(groupName.encode()) % LISTING_SHARDS]
+
+
+def isConditionFailure(error: ClientError, index: int = 0) -> bool:
+    """
+    helper function to check if a write failed because of its condition.
+    For transactions index is the position of the conditional item
+    """
+    code = error.response['Error']['Code']
+    if code == 'ConditionalCheckFailedException':
+        return True
+
+    reasons = error.response.get('CancellationReasons', [])
+    return code == 'TransactionCanceledException' and len(reasons) > index \
+        and reasons[index].get('Code') == 'ConditionalCheckFailed'
+
+
+# names of every group for prefix searches. It is filled from the groups
+# table when the service starts and kept up to date as groups change
+group_name_index = PrefixIndex()
+
+
+def scanGroupNamesSegment(segment, total_segments):
+    """
+    helper function to get the names of the groups in one segment of a
+    parallel scan. boto3 resources are not thread safe so every segment
+    creates its own
+    """
+    session = boto3.session.Session()
+    table = session.resource(
+        'dynamodb', region_name=os.environ.get('AWS_REGION')).Table(groups_table_name)
+
+    names = []
+    kwargs = {
+        'Segment': segment,
+        'TotalSegments': total_segments,
+        'ProjectionExpression': 'groupName',
+    }
+    while True:
+        scan = table.scan(**kwargs)
+        names.extend(group['groupName'] for group in scan.get('Items', []))
+
+        if 'LastEvaluatedKey' not in scan:
+            return names
+        kwargs['ExclusiveStartKey'] = scan['LastEvaluatedKey']
+
+
+def queryGetAllGroupNames(segments=4):
+    """
+    helper function to get the name of every group with a parallel scan of
+    the dynamoDB groups table
+    """
+    with ThreadPoolExecutor(max_workers=segments) as executor:
+        pages = executor.map(
+            lambda segment: scanGroupNamesSegment(segment, segments),
+            range(segments))
+        return [name for page in pages for name in page]
 
 
 def queryCreateNewGroup(userId, group_name, group_description):
     """
-    Helper function to create a new group
+    Helper function to create a new group with its creator as the first
+    member. The group, the membership and its user groups index entry are
+    written in one transaction that fails if the name is already in use,
+    in which case GroupAlreadyExistsError is raised
     """
     try:
         newGroupId = uuid4().hex
-        groups_table.put_item(Item={
-            'groupId': newGroupId,
-            'groupName': group_name,
-            'description': group_description,
-            'created_by': userId,
-        })
+        dynamodb_client.transact_write_items(TransactItems=[
+            {'Put': {
+                'TableName': groups_table_name,
+                'Item': {
+                    'groupId': newGroupId,
+                    'groupName': group_name,
+                    'description': group_description,
+                    'created_by': userId,
+                    'memberCount': 1,
+                    'listingPartition': listingPartitionFor(group_name),
+                    'lastActivityAt': int(time.time()),
+                },
+                'ConditionExpression': 'attribute_not_exists(groupName)',
+            }},
+            {'Put': {'TableName': members_table_name, 'Item': {
+                'groupName': group_name, 'userId': userId}}},
+            {'Put': {'TableName': user_groups_table_name, 'Item': {
+                'groupName': group_name, 'userId': userId}}},
+        ])
+        group_cache.invalidate(group_name)
+        group_name_index.add(group_name)
 
         return group_name
+    except ClientError as e:
+        if isConditionFailure(e):
+            raise GroupAlreadyExistsError(group_name)
+        return None
     except Exception:
         return None
 
 
-def queryGetGroupByName(groupName):
+def _queryGetGroupByName(groupName):
     """
     Helper function to retrieve a group from the dynamoDB groups table
-    based on its Id
+    based on its Id. Errors are raised rather than returned as None so
+    the group cache never stores a failed read as a missing group
+    """
+    query = groups_table.get_item(
+        Key={
+            "groupName": groupName
+        }
+    )
+
+    if not query.get('Item'):
+        return None
+
+    return formatGroup(query['Item'])
+
+
+# groups are read far more often than they change, so they are cached.
+# Changes made through this instance invalidate the cached group; changes
+# made by other instances are seen once the entry expires
+group_cache = ReadThroughCache(
+    _queryGetGroupByName,
+    ttl=float(os.environ.get('GROUP_CACHE_TTL', 60)),
+    stale_ttl=float(os.environ.get('GROUP_CACHE_STALE_TTL', 0)),
+    negative_ttl=float(os.environ.get('GROUP_CACHE_NEGATIVE_TTL', 5)),
+    max_size=int(os.environ.get('GROUP_CACHE_MAX_SIZE', 10000)))
+
+
+def queryGetGroupByName(groupName):
+    """
+    Helper function to retrieve a group by its name from the group cache,
+    loading it from the dynamoDB groups table if it is not cached
     """
     try:
-        query = groups_table.get_item(
-            Key={
-                "groupName": groupName
-            }
-        )
+        group = group_cache.get(groupName)
+    except Exception:
+        return None
 
-        if not query['Item']:
-            return None
+    # callers must not be able to modify the cached group
+    return dict(group) if group is not None else None
+
+
+def batchGetItems(table_name, keys, max_attempts=5, base_delay=0.05,
+                  max_delay=1):
+    """
+    helper function to retrieve the items with the given keys from a table
+    with BatchGetItem. Requests are split into chunks of 100 keys and keys
+    DynamoDB could not process are retried after a jittered exponential
+    backoff. Raises UnprocessedKeysError if keys are left after
+    max_attempts requests, so a throttled table fails the request instead
+    of holding its thread
+    """
+    items = []
+    for start in range(0, len(keys), 100):
+        request = {table_name: {'Keys': keys[start:start + 100]}}
+
+        for attempt in range(max_attempts):
+            if attempt:
+                time.sleep(random.uniform(
+                    0, min(base_delay * 2 ** attempt, max_delay)))
+
+            response = dynamodb_client.batch_get_item(RequestItems=request)
+            items.extend(response['Responses'].get(table_name, []))
+
+            request = response.get('UnprocessedKeys')
+            if not request:
+                break
+        else:
+            raise UnprocessedKeysError(table_name)
+
+    return items
+
+
+def _queryGetGroupsByNames(groupNames):
+    """
+    helper function to retrieve several groups from the dynamoDB groups
+    table as a dict keyed by groupName
+    """
+    groups = batchGetItems(
+        groups_table_name,
+        [{'groupName': groupName} for groupName in groupNames])
+    return {group['groupName']: formatGroup(group) for group in groups}
 
-        return query['Item']
 
+def queryGetGroupsByNames(groupNames):
+    """
+    helper function to retrieve several groups by name, reading the groups
+    that are not cached with BatchGetItem. Returns a dict with the group for
+    every name, which is None if the group does not exist
+    """
+    try:
+        groups = group_cache.get_many(groupNames, _queryGetGroupsByNames)
+        return {groupName: dict(group) if group is not None else None
+                for groupName, group in groups.items()}
+    except Exception:
+        return None
+
+
+def queryLookupMemberships(groupNames, userId):
+    """
+    helper function to query the dynamoDB members table with BatchGetItem
+    to find which of the given groups the user with the given userId is a
+    member of. Returns the set of those group names
+    """
+    try:
+        memberships = batchGetItems(
+            members_table_name,
+            [{'groupName': groupName, 'userId': userId}
+             for groupName in dict.fromkeys(groupNames)])
+        return {membership['groupName'] for membership in memberships}
     except Exception:
         return None
 
@@ -73,66 +329,328 @@ def queryGetGroupsPaginated(lastReceivedGroupName, limit):
         if not query or 'Items' not in query:
             return None
 
-        return query['Items']
+        return [formatGroup(group) for group in query['Items']]
 
     except Exception:
         return None
 
 
-def queryUpdateGroup(name, description):
+# reads the listing partitions of ordered group listings in parallel
+listing_executor = ThreadPoolExecutor(
+    max_workers=LISTING_SHARDS, thread_name_prefix='listing')
+
+
+def queryListingPartition(indexName, partition, exclusiveStartKey, limit):
     """
-    helper function to query the dynamoDB groups table to update a
-    groups name and description
+    helper function to query a page of one listing partition of a listing
+    index, highest first. Uses the client since the table resources are
+    not thread safe
+    """
+    kwargs = {
+        'TableName': groups_table_name,
+        'IndexName': indexName,
+        'KeyConditionExpression': 'listingPartition = :partition',
+        'ExpressionAttributeValues': {':partition': partition},
+        'ScanIndexForward': False,
+        'Limit': limit,
+    }
+    if exclusiveStartKey:
+        kwargs['ExclusiveStartKey'] = exclusiveStartKey
+
+    query = dynamodb_client.query(**kwargs)
+    return query.get('Items', []), query.get('LastEvaluatedKey')
+
+
+def queryGetGroupsOrderedPaginated(orderBy, position, limit):
+    """
+    helper function to query a page of groups ordered by member count or
+    by last activity, highest first, from the listing indexes of the
+    groups table. Every listing partition is queried in parallel and the
+    results are merged. position maps every partition that has more groups
+    to the key to continue after, or None to start from its beginning.
+    Without a position every partition is read from its beginning. Returns
+    the groups along with the position of the next page, which is None on
+    the last page
     """
     try:
-        group = queryGetGroupByName(name)
-        if group is None:
-            return False
+        limit = int(limit)
+        indexName, sortKey = LISTING_INDEXES[orderBy]
+        if position is None:
+            position = dict.fromkeys(LISTING_PARTITIONS)
+
+        partitions = list(position)
+        pages = dict(zip(partitions, listing_executor.map(
+            lambda partition: queryListingPartition(
+                indexName, partition, position[partition], limit),
+            partitions)))
+
+        # every partition's page is already ordered so they are merged
+        merged = heapq.merge(
+            *([(partition, item) for item in pages[partition][0]]
+              for partition in partitions),
+            key=lambda entry: -entry[1][sortKey])
+
+        groups = []
+        returned = dict.fromkeys(partitions, 0)
+        nextPosition = dict(position)
+        for partition, item in merged:
+            if len(groups) == limit:
+                break
+
+            groups.append(formatGroup(item))
+            returned[partition] += 1
+            nextPosition[partition] = {
+                'groupName': item['groupName'],
+                'listingPartition': partition,
+                sortKey: item[sortKey],
+            }
+
+        for partition in partitions:
+            items, lastEvaluatedKey = pages[partition]
+            if returned[partition] == len(items):
+                if lastEvaluatedKey is None:
+                    # every group in the partition has been returned
+                    del nextPosition[partition]
+                elif not items:
+                    nextPosition[partition] = lastEvaluatedKey
+
+        return groups, nextPosition or None
+
+    except Exception:
+        return None, None
+
 
-        groups_table.put_item(Item={
-            'groupId': group['groupId'],
-            'groupName': name,
-            'description': description,
-            'created_by': group['created_by'],
-        })
+def raiseGroupConditionError(groupName):
+    """
+    helper function to raise the error explaining why a write conditional
+    on the group's creator failed. The group is only read in this case,
+    and nothing is raised if it cannot be read
+    """
+    try:
+        group = _queryGetGroupByName(groupName)
+    except Exception:
+        return
+
+    if group is None:
+        raise GroupNotFoundError(groupName)
+    raise NotGroupCreatorError(groupName)
+
+
+def queryUpdateGroup(name, description, userId):
+    """
+    helper function to query the dynamoDB groups table to update a
+    groups description. The update only succeeds if the group exists and
+    was created by the user with the given userId, otherwise
+    GroupNotFoundError or NotGroupCreatorError is raised
+    """
+    try:
+        groups_table.update_item(
+            Key={'groupName': name},
+            UpdateExpression='SET #description = :description',
+            ConditionExpression='attribute_exists(groupName) '
+                                'AND created_by = :userId',
+            ExpressionAttributeNames={'#description': 'description'},
+            ExpressionAttributeValues={
+                ':description': description,
+                ':userId': userId,
+            },
+        )
+        group_cache.invalidate(name)
 
         return True
 
+    except ClientError as e:
+        if isConditionFailure(e):
+            raiseGroupConditionError(name)
+        return False
     except Exception:
         return False
 
 
-def queryDeleteGroupWithName(groupName):
+def queryDeleteGroupMemberships(groupName):
+    """
+    helper function to delete every membership of the group with the given
+    groupName from the members and user groups tables. The user groups
+    entries are deleted first, so an interrupted run leaves members table
+    entries behind that the next run can still find
+    """
+    kwargs = {
+        'KeyConditionExpression': Key('groupName').eq(groupName),
+        'ProjectionExpression': 'userId',
+    }
+    while True:
+        query = members_table.query(**kwargs)
+        userIds = [item['userId'] for item in query.get('Items', [])]
+
+        with user_groups_table.batch_writer() as batch:
+            for userId in userIds:
+                batch.delete_item(
+                    Key={'userId': userId, 'groupName': groupName})
+        with members_table.batch_writer() as batch:
+            for userId in userIds:
+                batch.delete_item(
+                    Key={'groupName': groupName, 'userId': userId})
+
+        if 'LastEvaluatedKey' not in query:
+            return
+        kwargs['ExclusiveStartKey'] = query['LastEvaluatedKey']
+
+
+def queryDeleteGroupWithName(groupName, userId):
     """
     helper function to query the dynamoDB groups table to delete a group
-    with the given groupName
+    with the given groupName along with its memberships. The delete only
+    succeeds if the group was created by the user with the given userId,
+    otherwise GroupNotFoundError or NotGroupCreatorError is raised.
+
+    The group is first marked with deletedAt so no one can join it, then
+    its memberships are deleted and only then the group itself. Until the
+    group is gone its name cannot be reused, so a new group with the same
+    name never inherits old memberships. If deleting the memberships fails
+    the marked group stays and the delete can be retried
     """
     try:
-        groups_table.delete_item(Key={'groupName': groupName})
+        groups_table.update_item(
+            Key={'groupName': groupName},
+            UpdateExpression='SET deletedAt = if_not_exists(deletedAt, :now)',
+            ConditionExpression='created_by = :userId',
+            ExpressionAttributeValues={
+                ':userId': userId,
+                ':now': int(time.time()),
+            },
+        )
+        group_cache.invalidate(groupName)
+
+        queryDeleteGroupMemberships(groupName)
+
+        groups_table.delete_item(
+            Key={'groupName': groupName},
+            ConditionExpression='created_by = :userId',
+            ExpressionAttributeValues={':userId': userId},
+        )
+        group_cache.invalidate(groupName)
+        group_name_index.remove(groupName)
         return True
+    except ClientError as e:
+        if isConditionFailure(e):
+            raiseGroupConditionError(groupName)
+        return False
     except Exception:
         return False
 
 
+def groupCountUpdate(groupName, change):
+    """
+    helper function to build the transaction item that changes the member
+    count of a group and records the activity. Members can only be added
+    to groups that are not being deleted
+    """
+    condition = 'attribute_exists(groupName)'
+    if change > 0:
+        condition += ' AND attribute_not_exists(deletedAt)'
+
+    return {'Update': {
+        'TableName': groups_table_name,
+        'Key': {'groupName': groupName},
+        'UpdateExpression': 'ADD memberCount :change '
+                            'SET lastActivityAt = :now',
+        'ConditionExpression': condition,
+        'ExpressionAttributeValues': {
+            ':change': change,
+            ':now': int(time.time()),
+        },
+    }}
+
+
 def queryCreateNewGroupMembership(groupName, userId):
     """
     helper function to query the dynamoDB members table to create a new
-    group membership entry
+    group membership entry. The membership, its user groups index entry and
+    the group's member count are written in one transaction. Raises
+    MembershipAlreadyExistsError or GroupNotFoundError if the membership
+    cannot be created
     """
     try:
-        members_table.put_item(
-            Item={
-                'groupName': groupName,
-                'userId': userId
-            }
-        )
+        # the client serializes items in place so each needs its own dict
+        dynamodb_client.transact_write_items(TransactItems=[
+            {'Put': {
+                'TableName': members_table_name,
+                'Item': {'groupName': groupName, 'userId': userId},
+                'ConditionExpression': 'attribute_not_exists(userId)',
+            }},
+            {'Put': {'TableName': user_groups_table_name, 'Item': {
+                'groupName': groupName, 'userId': userId}}},
+            groupCountUpdate(groupName, 1),
+        ])
+        group_cache.invalidate(groupName)
 
         return True
 
+    except ClientError as e:
+        if isConditionFailure(e, 0):
+            raise MembershipAlreadyExistsError(groupName)
+        if isConditionFailure(e, 2):
+            raise GroupNotFoundError(groupName)
+        return False
     except Exception:
         return False
 
 
+# runs the membership transactions of batch requests in parallel. The
+# boto3 client is thread safe, unlike the table resources
+membership_executor = ThreadPoolExecutor(
+    max_workers=int(os.environ.get('MEMBERSHIP_BATCH_WORKERS', 8)),
+    thread_name_prefix='membership')
+
+
+def joinGroupOutcome(groupName, userId):
+    """
+    helper function to add a user to a group and describe the outcome
+    """
+    try:
+        if queryCreateNewGroupMembership(groupName, userId):
+            return 'joined'
+        return 'error'
+    except MembershipAlreadyExistsError:
+        return 'already a member'
+    except GroupNotFoundError:
+        return 'group not found'
+
+
+def leaveGroupOutcome(groupName, userId):
+    """
+    helper function to remove a user from a group and describe the outcome
+    """
+    try:
+        if queryDeleteMembership(groupName, userId):
+            return 'left'
+        return 'error'
+    except MembershipNotFoundError:
+        return 'not a member'
+
+
+def queryChangeMemberships(userId, joinGroupNames, leaveGroupNames):
+    """
+    helper function to add the user with the given userId to several groups
+    and remove them from others. Every change is its own conditional
+    transaction and they run in parallel, so one failing change does not
+    affect the others. Returns the outcome of every change
+    """
+    joins = {groupName: membership_executor.submit(
+        joinGroupOutcome, groupName, userId)
+        for groupName in dict.fromkeys(joinGroupNames)}
+    leaves = {groupName: membership_executor.submit(
+        leaveGroupOutcome, groupName, userId)
+        for groupName in dict.fromkeys(leaveGroupNames)}
+
+    return {
+        'join': {groupName: future.result()
+                 for groupName, future in joins.items()},
+        'leave': {groupName: future.result()
+                  for groupName, future in leaves.items()},
+    }
+
+
 def queryLookupMembership(groupName, userId):
     """
     helper function to query the dynamoDB members table to lookup is
@@ -159,70 +677,108 @@ def queryLookupMembership(groupName, userId):
 def queryDeleteMembership(groupName, userId):
     """
     helper function to query the dynamoDB members table to delete the entry
-    for membership with the given groupId and userId
+    for membership with the given groupId and userId. The user groups index
+    entry and the group's member count are updated in the same
+    transaction. Raises MembershipNotFoundError if there is no membership
     """
+    def membershipDeletes():
+        # the client serializes items in place so every call needs new ones
+        return [
+            {'Delete': {
+                'TableName': members_table_name,
+                'Key': {'groupName': groupName, 'userId': userId},
+                'ConditionExpression': 'attribute_exists(userId)',
+            }},
+            {'Delete': {'TableName': user_groups_table_name, 'Key': {
+                'groupName': groupName, 'userId': userId}}},
+        ]
+
     try:
-        members_table.delete_item(
-            Key={
-                'groupName': groupName,
-                'userId': userId
-            }
-        )
+        dynamodb_client.transact_write_items(
+            TransactItems=membershipDeletes() + [groupCountUpdate(groupName, -1)])
+        group_cache.invalidate(groupName)
 
         return True
 
+    except ClientError as e:
+        if isConditionFailure(e, 0):
+            raise MembershipNotFoundError(groupName)
+        if not isConditionFailure(e, 2):
+            return False
+    except Exception:
+        return False
+
+    # the group was deleted so there is no member count to update
+    try:
+        dynamodb_client.transact_write_items(TransactItems=membershipDeletes())
+        return True
+    except ClientError as e:
+        if isConditionFailure(e, 0):
+            raise MembershipNotFoundError(groupName)
+        return False
     except Exception:
         return False
 
 
-def queryGetGroupMembersPaginated(groupName, lastReceivedMemberId, limit):
+def queryGetGroupMembersPaginated(groupName, exclusiveStartKey, limit):
     """
-    helper function to query a list of group members from the dynamoDB members
-    table. Supports pagination by providing a limit of resources to return
-    and the lastReceivedMemberId for offset parameter.
+    helper function to query a page of group members from the dynamoDB
+    members table. Supports pagination by providing a limit of resources to
+    return and the exclusiveStartKey to continue from. Returns the members
+    along with the LastEvaluatedKey of the query, which is None on the last
+    page
     """
     try:
-        query = None
-
-        if lastReceivedMemberId:
-            query = members_table.scan(
-                FilterExpression=Attr('groupName').eq(groupName),
-                Limit=int(limit),
-                ExclusiveStartKey={
-                    'groupName': groupName,
-                    'userId': lastReceivedMemberId
-                }
-            )
-        else:
-            query = members_table.query(
-                KeyConditionExpression=Key('groupName').eq(groupName),
-                Limit=int(limit),
-            )
-
+        kwargs = {
+            'KeyConditionExpression': Key('groupName').eq(groupName),
+            'Limit': int(limit),
+        }
+        if exclusiveStartKey:
+            kwargs['ExclusiveStartKey'] = exclusiveStartKey
+
+        query = members_table.query(**kwargs)
         if query is None or 'Items' not in query:
-            return None
+            return None, None
 
-        return query['Items']
+        return query['Items'], query.get('LastEvaluatedKey')
 
     except Exception:
-        return None
+        return None, None
 
 
-def queryGetUsersGroups(userId):
+def queryGetUsersGroups(userId, lastReceivedGroupName=None, limit=None):
     """
-    helper function to query the dynamoDB members table to get a list
-    of all the groups the user with the given userId is a member of
+    helper function to query the user groups table to get the groups the
+    user with the given userId is a member of. Returns a page of at most
+    limit groups starting after lastReceivedGroupName along with the name
+    to continue from, which is None on the last page. Without a limit
+    every group is returned
     """
     try:
-        query = members_table.scan(
-            ProjectionExpression='groupName',
-            FilterExpression=Attr('userId').eq(userId),
-        )
+        groups = []
+        kwargs = {
+            'KeyConditionExpression': Key('userId').eq(userId),
+            'ProjectionExpression': 'groupName',
+        }
+        if lastReceivedGroupName:
+            kwargs['ExclusiveStartKey'] = {
+                'userId': userId,
+                'groupName': lastReceivedGroupName
+            }
 
-        if query is None or 'Items' not in query:
-            return None
+        while True:
+            if limit is not None:
+                kwargs['Limit'] = int(limit) - len(groups)
 
-        return query["Items"]
+            query = user_groups_table.query(**kwargs)
+            groups.extend(query.get('Items', []))
+
+            lastEvaluatedKey = query.get('LastEvaluatedKey')
+            if lastEvaluatedKey is None:
+                return groups, None
+            if limit is not None and len(groups) >= int(limit):
+                return groups, lastEvaluatedKey['groupName']
+            kwargs['ExclusiveStartKey'] = lastEvaluatedKey
 
     except Exception:
-        return None
+        return None, None
@@ -0,0 +1,74 @@
+import os
+
+# the queries module reads its configuration when it is imported, so the
+# tables and a fake region and credentials are set up first. moto must
+# also be imported before any boto3 client is made so it can intercept it
+os.environ.setdefault('AWS_REGION', 'us-east-1')
+os.environ['AWS_ACCESS_KEY_ID'] = 'testing'
+os.environ['AWS_SECRET_ACCESS_KEY'] = 'testing'
+os.environ.setdefault('GROUPS_DYNAMODB_TABLE_NAME', 'groups')
+os.environ.setdefault('MEMBERS_DYNAMODB_TABLE_NAME', 'members')
+os.environ.setdefault('USER_GROUPS_DYNAMODB_TABLE_NAME', 'user-groups')
+
+from moto.dynamodb import mock_dynamodb  # noqa: E402
+import boto3  # noqa: E402
+
+
+def attribute(name, attribute_type='S'):
+    """helper function to define a key attribute of a table"""
+    return {'AttributeName': name, 'AttributeType': attribute_type}
+
+
+def key_schema(hash_key, range_key=None):
+    """helper function to define the key of a table or an index"""
+    schema = [{'AttributeName': hash_key, 'KeyType': 'HASH'}]
+    if range_key:
+        schema.append({'AttributeName': range_key, 'KeyType': 'RANGE'})
+    return schema
+
+
+class MockTables:
+    """
+    Helper class that starts a moto mock of DynamoDB and creates the
+    groups, members and user groups tables the way terraform defines them
+    """
+
+    def start(self):
+        self._mock = mock_dynamodb()
+        self._mock.start()
+
+        dynamodb = boto3.resource(
+            'dynamodb', region_name=os.environ['AWS_REGION'])
+        self.groups_table = dynamodb.create_table(
+            TableName=os.environ['GROUPS_DYNAMODB_TABLE_NAME'],
+            KeySchema=key_schema('groupName'),
+            AttributeDefinitions=[
+                attribute('groupName'),
+                attribute('listingPartition'),
+                attribute('memberCount', 'N'),
+                attribute('lastActivityAt', 'N'),
+            ],
+            GlobalSecondaryIndexes=[
+                {'IndexName': 'memberCountIndex',
+                 'KeySchema': key_schema('listingPartition', 'memberCount'),
+                 'Projection': {'ProjectionType': 'ALL'}},
+                {'IndexName': 'lastActivityIndex',
+                 'KeySchema': key_schema('listingPartition', 'lastActivityAt'),
+                 'Projection': {'ProjectionType': 'ALL'}},
+            ],
+            BillingMode='PAY_PER_REQUEST')
+        self.members_table = dynamodb.create_table(
+            TableName=os.environ['MEMBERS_DYNAMODB_TABLE_NAME'],
+            KeySchema=key_schema('groupName', 'userId'),
+            AttributeDefinitions=[attribute('groupName'), attribute('userId')],
+            BillingMode='PAY_PER_REQUEST')
+        self.user_groups_table = dynamodb.create_table(
+            TableName=os.environ['USER_GROUPS_DYNAMODB_TABLE_NAME'],
+            KeySchema=key_schema('userId', 'groupName'),
+            AttributeDefinitions=[attribute('userId'), attribute('groupName')],
+            BillingMode='PAY_PER_REQUEST')
+
+        return self
+
+    def stop(self):
+        self._mock.stop()
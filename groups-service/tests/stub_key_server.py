@@ -0,0 +1,85 @@
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from jwt.algorithms import get_default_algorithms
+import hashlib
+import json
+import threading
+import time
+
+
+class StubKeyServer:
+    """
+    Local stand-in for the auth service's JWKS endpoint used when testing
+    the JwksClient. Serves the given public keys with an ETag and a
+    Cache-Control lifetime and counts the requests it receives
+    """
+
+    def __init__(self, algorithm: str = 'RS256', max_age: int = 300,
+                 delay: float = 0):
+        self.algorithm = algorithm
+        self.max_age = max_age
+        self.delay = delay
+        self.requests = 0
+        self.not_modified = 0
+        self._keys = {}
+
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                server.requests += 1
+                time.sleep(server.delay)
+
+                body, etag = server._get_body()
+                if self.headers.get('If-None-Match') == etag:
+                    server.not_modified += 1
+                    self.send_response(304)
+                    self.send_header('ETag', etag)
+                    self.send_header(
+                        'Cache-Control', f'public, max-age={server.max_age}')
+                    self.end_headers()
+                    return
+
+                self.send_response(200)
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('ETag', etag)
+                self.send_header(
+                    'Cache-Control', f'public, max-age={server.max_age}')
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass
+
+        self._httpd = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+        self._thread = None
+
+    @property
+    def url(self) -> str:
+        host, port = self._httpd.server_address
+        return f'http://{host}:{port}/api/v1/auth/jwks'
+
+    def set_keys(self, keys: dict):
+        """Method to set the public keys served, as a dict of kid to key"""
+        self._keys = dict(keys)
+
+    def _get_body(self):
+        """Method to build the key set and its ETag"""
+        algorithm = get_default_algorithms()[self.algorithm]
+        jwks = {'keys': []}
+        for kid, public_key in self._keys.items():
+            jwk = json.loads(algorithm.to_jwk(public_key))
+            jwk.update({'kid': kid, 'alg': self.algorithm, 'use': 'sig'})
+            jwks['keys'].append(jwk)
+
+        body = json.dumps(jwks, sort_keys=True).encode()
+        return body, f'"{hashlib.sha256(body).hexdigest()}"'
+
+    def start(self):
+        self._thread = threading.Thread(
+            target=self._httpd.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._httpd.shutdown()
+        self._httpd.server_close()
@@ -0,0 +1,199 @@
+import os
+import time
+import unittest
+import jwt
+from cryptography.hazmat.backends import default_backend
+from cryptography.hazmat.primitives import serialization
+from cryptography.hazmat.primitives.asymmetric import rsa
+from mock_tables import MockTables
+
+# the service reads its token key when it is imported
+signing_key = rsa.generate_private_key(backend=default_backend(),
+                                       public_exponent=65537,
+                                       key_size=2048)
+os.environ['TOKEN_PUBLIC_KEY'] = signing_key.public_key().public_bytes(
+    encoding=serialization.Encoding.PEM,
+    format=serialization.PublicFormat.SubjectPublicKeyInfo).decode()
+
+# importing the app fills the group name index from the groups table in
+# the background
+_tables = MockTables().start()
+import app  # noqa: E402
+app.group_name_index.wait_until_built(5)
+_tables.stop()
+
+
+def createToken(userId, tokenType='access'):
+    """helper function to create a token of the given type for the user"""
+    return jwt.encode({'sub': userId, 'jti': f'{userId}-{tokenType}-token',
+                       'typ': tokenType, 'exp': int(time.time()) + 600},
+                      signing_key, algorithm='RS256')
+
+
+class AppTestCase(unittest.TestCase):
+    """
+    Base class for tests of the endpoints against mocked tables
+    """
+
+    def setUp(self):
+        self.tables = MockTables().start()
+        self.addCleanup(self.tables.stop)
+        self.client = app.app.test_client()
+        self.token = createToken('owner')
+
+    def createGroup(self, name):
+        """helper function to create a group as the owner"""
+        res = self.client.post('/api/v1/groups', json={
+            'token': self.token,
+            'group': {'name': name, 'description': f'about {name}'}})
+        self.assertEqual(res.status_code, 200)
+
+
+class TestAuthentication(AppTestCase):
+    """Test which tokens the endpoints accept"""
+
+    def test_refresh_token_is_rejected(self):
+        """Test that a refresh token cannot be used as an access token"""
+        res = self.client.get('/api/v1/groups', query_string={
+            'token': createToken('owner', 'refresh')})
+        self.assertEqual(res.status_code, 400)
+
+        res = self.client.get('/api/v1/groups', query_string={
+            'token': self.token})
+        self.assertEqual(res.status_code, 200)
+
+
+class TestListGroups(AppTestCase):
+    """Test listing groups ordered by member count or activity"""
+
+    def setUp(self):
+        super().setUp()
+        for name in ('first', 'second', 'third'):
+            self.createGroup(name)
+
+    def list(self, **args):
+        """helper function to request a page of the group listing"""
+        return self.client.get('/api/v1/groups', query_string=dict(
+            token=self.token, **args))
+
+    def test_cursor_pages_through_groups(self):
+        """Test that following the cursors lists every group once"""
+        names = []
+        cursor = None
+        while True:
+            args = {'orderBy': 'members', 'limit': 2}
+            if cursor:
+                args['cursor'] = cursor
+            res = self.list(**args)
+            self.assertEqual(res.status_code, 200)
+            names.extend(group['groupName'] for group in res.get_json()['groups'])
+            cursor = res.get_json()['nextCursor']
+            if not cursor:
+                break
+
+        self.assertEqual(sorted(names), ['first', 'second', 'third'])
+
+    def test_cursor_is_bound_to_its_order(self):
+        """Test that a cursor cannot be replayed against the other index"""
+        res = self.list(orderBy='activity', limit=1)
+        cursor = res.get_json()['nextCursor']
+        self.assertIsNotNone(cursor)
+
+        self.assertEqual(
+            self.list(orderBy='activity', limit=1, cursor=cursor).status_code,
+            200)
+        self.assertEqual(
+            self.list(orderBy='members', limit=1, cursor=cursor).status_code,
+            400)
+
+    def test_member_cursor_is_rejected(self):
+        """Test that a cursor from another endpoint is rejected"""
+        res = self.client.get('/api/v1/groups/first/members', query_string={
+            'token': self.token, 'limit': 1})
+        self.assertEqual(res.status_code, 200)
+
+        # the owner is the only member so add another to get a cursor
+        self.client.post('/api/v1/groups/first/members',
+                         json={'token': createToken('member')})
+        res = self.client.get('/api/v1/groups/first/members', query_string={
+            'token': self.token, 'limit': 1})
+        cursor = res.get_json()['nextCursor']
+        self.assertIsNotNone(cursor)
+
+        self.assertEqual(
+            self.list(orderBy='members', cursor=cursor).status_code, 400)
+
+
+class TestGroupSearch(AppTestCase):
+    """Test searching group names by prefix"""
+
+    def search(self, **args):
+        """helper function to search the group names"""
+        return self.client.get('/api/v1/groups/search', query_string=dict(
+            token=self.token, **args))
+
+    def test_created_groups_can_be_found(self):
+        """Test that new groups are found without querying the table"""
+        self.createGroup('Python')
+        self.createGroup('pytorch')
+
+        res = self.search(prefix='py')
+        self.assertEqual(res.status_code, 200)
+        self.assertEqual(res.get_json()['groupNames'], ['Python', 'pytorch'])
+
+    def test_invalid_search_is_rejected(self):
+        """Test that a missing prefix or a bad limit is rejected"""
+        self.assertEqual(self.search().status_code, 400)
+        self.assertEqual(self.search(prefix='py', limit='x').status_code, 400)
+        self.assertEqual(self.search(prefix='py', limit=0).status_code, 400)
+        self.assertEqual(self.search(prefix='py', limit=51).status_code, 400)
+
+    def test_route_names_are_reserved(self):
+        """Test that groups cannot be named after the static routes"""
+        for name in ('search', 'batch', 'user', 'health-check'):
+            res = self.client.post('/api/v1/groups', json={
+                'token': self.token,
+                'group': {'name': name, 'description': 'hidden'}})
+            self.assertEqual(res.status_code, 400)
+            self.assertEqual(res.get_json()['error'], 'group name is reserved')
+
+
+
+class TestPageLimits(AppTestCase):
+    """Test that paginated endpoints reject bad limits"""
+
+    def setUp(self):
+        super().setUp()
+        self.createGroup('first')
+
+    def get(self, path, **args):
+        """helper function to request a page from the given endpoint"""
+        return self.client.get(path, query_string=dict(
+            token=self.token, **args))
+
+    def test_invalid_limits_are_rejected(self):
+        """Test that zero, negative, huge and non numeric limits are 400s"""
+        endpoints = [
+            ('/api/v1/groups', {}),
+            ('/api/v1/groups', {'orderBy': 'members'}),
+            ('/api/v1/groups/first/members', {}),
+            ('/api/v1/groups/user', {}),
+        ]
+        for path, args in endpoints:
+            for limit in ('0', '-1', '101', 'x', '1.5'):
+                res = self.get(path, limit=limit, **args)
+                self.assertEqual(res.status_code, 400, (path, args, limit))
+
+    def test_valid_limits_are_accepted(self):
+        """Test that limits within bounds and missing limits are accepted"""
+        for path in ('/api/v1/groups', '/api/v1/groups/first/members',
+                     '/api/v1/groups/user'):
+            self.assertEqual(self.get(path).status_code, 200)
+            self.assertEqual(self.get(path, limit=100).status_code, 200)
+
+        res = self.get('/api/v1/groups/user', limit=1)
+        self.assertEqual(res.get_json()['groups'], [{'groupName': 'first'}])
+
+
+if __name__ == '__main__':
+    unittest.main(verbosity=2)
@@ -0,0 +1,65 @@
+import unittest
+from mock_tables import MockTables
+import backfill
+import db.queries as queries
+
+
+class TestBackfill(unittest.TestCase):
+    """Test building the derived indexes from existing groups and members"""
+
+    def setUp(self):
+        self.tables = MockTables().start()
+        self.addCleanup(self.tables.stop)
+
+        # groups and memberships saved before the indexes existed
+        for count in range(1, 6):
+            groupName = f'group-{count}'
+            self.tables.groups_table.put_item(Item={
+                'groupName': groupName, 'creator': 'owner'})
+            for member in range(count):
+                self.tables.members_table.put_item(Item={
+                    'groupName': groupName, 'userId': f'user-{member}'})
+
+    def run_backfill(self):
+        """helper function to run both backfills and return their counts"""
+        # moto ignores scan segments, so every segment would scan the
+        # whole table
+        return (backfill.runInParallel(backfill.backfillUserGroupsSegment, 1),
+                backfill.runInParallel(backfill.backfillGroupListingSegment, 1))
+
+    def snapshot(self):
+        """helper function to read the derived attributes and entries"""
+        groups = {group['groupName']: (group['memberCount'],
+                                       group['listingPartition'],
+                                       group['lastActivityAt'])
+                  for group in self.tables.groups_table.scan()['Items']}
+        userGroups = {(item['userId'], item['groupName'])
+                      for item in self.tables.user_groups_table.scan()['Items']}
+        return groups, userGroups
+
+    def test_indexes_are_built(self):
+        """Test that counts, listing partitions and user groups are set"""
+        self.assertEqual(self.run_backfill(), (15, 5))
+
+        groups, userGroups = self.snapshot()
+        for count in range(1, 6):
+            groupName = f'group-{count}'
+            memberCount, listingPartition, _ = groups[groupName]
+            self.assertEqual(memberCount, count)
+            self.assertEqual(listingPartition,
+                             queries.listingPartitionFor(groupName))
+        self.assertEqual(userGroups, {
+            (f'user-{member}', f'group-{count}')
+            for count in range(1, 6) for member in range(count)})
+
+    def test_running_again_changes_nothing(self):
+        """Test that a second run leaves the indexes as the first did"""
+        self.run_backfill()
+        first = self.snapshot()
+
+        self.assertEqual(self.run_backfill(), (15, 5))
+        self.assertEqual(self.snapshot(), first)
+
+
+if __name__ == '__main__':
+    unittest.main(verbosity=2)
@@ -0,0 +1,205 @@
+import threading
+import time
+import unittest
+from utils.cache import ReadThroughCache
+
+
+class MockClock:
+    """
+    Helper class for controlling the time seen by the ReadThroughCache
+    """
+
+    def __init__(self, now=1000.0):
+        self.now = now
+
+    def __call__(self):
+        return self.now
+
+
+class CountingLoader:
+    """
+    Helper class for a loader that counts its calls and can be made slow
+    or failing
+    """
+
+    def __init__(self, values, delay=0):
+        self.values = values
+        self.delay = delay
+        self.error = None
+        self.calls = []
+
+    def __call__(self, key):
+        self.calls.append(key)
+        time.sleep(self.delay)
+        if self.error is not None:
+            raise self.error
+        return self.values.get(key)
+
+    def load_many(self, keys):
+        self.calls.append(tuple(keys))
+        if self.error is not None:
+            raise self.error
+        return {key: self.values[key] for key in keys if key in self.values}
+
+
+class TestReadThroughCache(unittest.TestCase):
+    """Test ReadThroughCache Class"""
+
+    def setUp(self):
+        self.clock = MockClock()
+        self.loader = CountingLoader({'first': 1, 'second': 2})
+        self.cache = ReadThroughCache(
+            self.loader, ttl=10, stale_ttl=20, negative_ttl=5,
+            clock=self.clock)
+
+    def wait_for_reloads(self):
+        """helper function to wait for background reloads to finish"""
+        for load in list(self.cache._loads.values()):
+            load.done.wait(5)
+
+    def test_value_is_loaded_once(self):
+        """Test that a cached value is not loaded again"""
+        self.assertEqual(self.cache.get('first'), 1)
+        self.assertEqual(self.cache.get('first'), 1)
+
+        self.assertEqual(self.loader.calls, ['first'])
+        stats = self.cache.stats()
+        self.assertEqual(stats['hits'], 1)
+        self.assertEqual(stats['misses'], 1)
+
+    def test_concurrent_misses_are_coalesced(self):
+        """Test that concurrent misses for one key share a single load"""
+        self.loader.delay = 0.2
+        values = []
+        threads = [threading.Thread(
+            target=lambda: values.append(self.cache.get('first')))
+            for _ in range(10)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join(5)
+
+        self.assertEqual(values, [1] * 10)
+        self.assertEqual(self.loader.calls, ['first'])
+        self.assertEqual(self.cache.stats()['coalesced'], 9)
+
+    def test_expired_value_is_reloaded(self):
+        """Test that a value past its fresh and stale time is reloaded"""
+        self.cache.get('first')
+        self.loader.values['first'] = 10
+        self.clock.now += 31
+
+        self.assertEqual(self.cache.get('first'), 10)
+        self.assertEqual(self.loader.calls, ['first', 'first'])
+
+    def test_missing_value_is_cached_for_negative_ttl(self):
+        """Test that a missing value is cached only for the negative ttl"""
+        self.assertIsNone(self.cache.get('missing'))
+        self.assertIsNone(self.cache.get('missing'))
+        self.assertEqual(self.loader.calls, ['missing'])
+
+        self.clock.now += 6
+        self.cache.get('missing')
+        self.assertEqual(self.loader.calls, ['missing', 'missing'])
+
+    def test_stale_value_is_revalidated(self):
+        """Test that a stale value is served while it is reloaded"""
+        self.cache.get('first')
+        self.loader.values['first'] = 10
+        self.clock.now += 11
+
+        self.assertEqual(self.cache.get('first'), 1)
+        self.wait_for_reloads()
+        self.assertEqual(self.cache.get('first'), 10)
+        self.assertEqual(self.cache.stats()['staleHits'], 1)
+
+    def test_errors_are_not_cached(self):
+        """Test that a failed load is raised and tried again next time"""
+        self.loader.error = Exception('throttled')
+        with self.assertRaises(Exception):
+            self.cache.get('first')
+
+        self.loader.error = None
+        self.assertEqual(self.cache.get('first'), 1)
+        self.assertEqual(self.loader.calls, ['first', 'first'])
+
+    def test_invalidated_value_is_reloaded(self):
+        """Test that an invalidated value is loaded again"""
+        self.cache.get('first')
+        self.loader.values['first'] = 10
+        self.cache.invalidate('first')
+
+        self.assertEqual(self.cache.get('first'), 10)
+
+    def test_invalidation_only_discards_loads_of_its_key(self):
+        """Test that invalidating a key does not discard loads of others"""
+        release = threading.Event()
+        calls = []
+
+        def loader(key):
+            calls.append(key)
+            release.wait(5)
+            return self.loader.values.get(key)
+
+        cache = ReadThroughCache(loader, ttl=10, clock=self.clock)
+        threads = [threading.Thread(target=cache.get, args=(key,))
+                   for key in ('first', 'second')]
+        for thread in threads:
+            thread.start()
+        while len(cache._loads) < 2:
+            time.sleep(0.001)
+
+        # the value of first being loaded may be outdated
+        cache.invalidate('first')
+        release.set()
+        for thread in threads:
+            thread.join(5)
+
+        self.assertEqual(cache.get('second'), 2)
+        self.assertEqual(cache.get('first'), 1)
+        self.assertEqual(sorted(calls), ['first', 'first', 'second'])
+
+        # nothing is kept for keys that are no longer loading
+        self.assertEqual(cache._loading, {})
+
+    def test_get_many_loads_only_missing_keys(self):
+        """Test that get_many loads the keys that are not cached together"""
+        self.cache.get('first')
+        values = self.cache.get_many(
+            ['first', 'second', 'missing', 'second'], self.loader.load_many)
+
+        self.assertEqual(values, {'first': 1, 'second': 2, 'missing': None})
+        self.assertEqual(self.loader.calls, ['first', ('second', 'missing')])
+
+        # the missing key is cached as missing
+        self.cache.get_many(['missing'], self.loader.load_many)
+        self.assertEqual(len(self.loader.calls), 2)
+
+    def test_get_many_revalidates_stale_values(self):
+        """Test that get_many serves stale values and reloads them together"""
+        self.cache.get_many(['first', 'second'], self.loader.load_many)
+        self.loader.values.update(first=10, second=20)
+        self.clock.now += 11
+
+        values = self.cache.get_many(['first', 'second'], self.loader.load_many)
+        self.assertEqual(values, {'first': 1, 'second': 2})
+        self.wait_for_reloads()
+
+        values = self.cache.get_many(['first', 'second'], self.loader.load_many)
+        self.assertEqual(values, {'first': 10, 'second': 20})
+        self.assertEqual(self.loader.calls,
+                         [('first', 'second'), ('first', 'second')])
+
+    def test_get_many_does_not_cache_errors(self):
+        """Test that a failed batch load is raised and tried again"""
+        self.loader.error = Exception('throttled')
+        with self.assertRaises(Exception):
+            self.cache.get_many(['first'], self.loader.load_many)
+
+        self.loader.error = None
+        self.assertEqual(self.cache.get_many(['first'], self.loader.load_many),
+                         {'first': 1})
+
+
+if __name__ == '__main__':
+    unittest.main(verbosity=2)
@@ -0,0 +1,70 @@
+import unittest
+from unittest import mock
+from base64 import urlsafe_b64encode
+from decimal import Decimal
+import utils.cursors as cursors
+from utils.cursors import encodeCursor, decodeCursor
+
+
+class TestCursors(unittest.TestCase):
+    """Test encodeCursor and decodeCursor"""
+
+    def test_can_decode_cursor_after_encoding(self):
+        """Test that a cursor gives back the key it was created from"""
+        key = {'groupName': 'python', 'userId': 'user id'}
+        self.assertEqual(decodeCursor(encodeCursor(key)), key)
+
+    def test_no_cursor_without_key(self):
+        """Test that the last page has no cursor"""
+        self.assertIsNone(encodeCursor(None))
+        self.assertIsNone(encodeCursor({}))
+
+    def test_tampered_signature_is_rejected(self):
+        """Test that a cursor with a changed signature is rejected"""
+        data, signature = encodeCursor({'groupName': 'python'}).split('.')
+        tampered = signature[:-2] + ('AA' if signature[-2:] != 'AA' else 'BB')
+
+        self.assertIsNone(decodeCursor(f'{data}.{tampered}'))
+
+    def test_tampered_key_is_rejected(self):
+        """Test that a cursor with a changed start key is rejected"""
+        signature = encodeCursor({'groupName': 'python'}).split('.')[1]
+        data = urlsafe_b64encode(b'{"groupName":"rust"}').decode().rstrip('=')
+
+        self.assertIsNone(decodeCursor(f'{data}.{signature}'))
+
+    def test_truncated_cursor_is_rejected(self):
+        """Test that a cut off or malformed cursor is rejected"""
+        cursor = encodeCursor({'groupName': 'python'})
+
+        self.assertIsNone(decodeCursor(cursor[:-5]))
+        self.assertIsNone(decodeCursor(cursor.split('.')[0]))
+        self.assertIsNone(decodeCursor(''))
+        self.assertIsNone(decodeCursor('not a cursor'))
+
+    def test_cursor_signed_with_another_key_is_rejected(self):
+        """Test that cursors only work with the key that signed them"""
+        with mock.patch.object(cursors, 'signing_key', b'another key'):
+            cursor = encodeCursor({'groupName': 'python'})
+            self.assertIsNotNone(decodeCursor(cursor))
+
+        self.assertIsNone(decodeCursor(cursor))
+
+    def test_only_objects_are_accepted(self):
+        """Test that a correctly signed cursor must hold a key"""
+        self.assertIsNone(decodeCursor(encodeCursor(['groupName'])))
+
+    def test_decimal_keys_round_trip_exactly(self):
+        """Test that index key numbers come back as exact numbers"""
+        key = {'groupName': 'python', 'memberCount': Decimal('12'),
+               'score': Decimal('0.1'), 'large': Decimal('1.23456789012345678901')}
+        decoded = decodeCursor(encodeCursor(key))
+
+        self.assertEqual(decoded, key)
+        self.assertIsInstance(decoded['memberCount'], int)
+        self.assertIsInstance(decoded['score'], Decimal)
+        self.assertNotIsInstance(decoded['large'], float)
+
+
+if __name__ == '__main__':
+    unittest.main(verbosity=2)
@@ -0,0 +1,154 @@
+import threading
+import time
+import unittest
+import jwt
+from cryptography.hazmat.backends import default_backend
+from cryptography.hazmat.primitives.asymmetric import rsa
+from utils.jwks import JwksClient
+from stub_key_server import StubKeyServer
+
+
+def generate_private_key():
+    """helper function to generate an RSA private key for signing tokens"""
+    return rsa.generate_private_key(backend=default_backend(),
+                                    public_exponent=65537,
+                                    key_size=2048)
+
+
+class MockClock:
+    """
+    Helper class for controlling the time seen by the JwksClient
+    """
+
+    def __init__(self, now=1000.0):
+        self.now = now
+
+    def __call__(self):
+        return self.now
+
+
+class TestJwksClient(unittest.TestCase):
+    """Test JwksClient Class"""
+
+    @classmethod
+    def setUpClass(cls):
+        cls.first_key = generate_private_key()
+        cls.second_key = generate_private_key()
+
+    def setUp(self):
+        self.server = StubKeyServer().start()
+        self.server.set_keys({'first': self.first_key.public_key()})
+
+    def tearDown(self):
+        self.server.stop()
+
+    def test_can_verify_token_with_fetched_key(self):
+        """Test that a key fetched by kid verifies tokens it signed"""
+        client = JwksClient(self.server.url, 'RS256')
+        token = jwt.encode({'data': 'test'}, self.first_key,
+                           algorithm='RS256', headers={'kid': 'first'})
+
+        key = client.get_key('first')
+        self.assertIsNotNone(key)
+
+        claims = jwt.decode(token, key, algorithms=['RS256'])
+        self.assertEqual(claims['data'], 'test')
+
+    def test_warm_cache_does_not_refetch(self):
+        """Test that keys are served from the cache once fetched"""
+        client = JwksClient(self.server.url, 'RS256')
+        client.get_key('first')
+        client.get_key('first')
+        client.get_key('first')
+
+        self.assertEqual(self.server.requests, 1)
+
+    def test_concurrent_cold_lookups_collapse_into_one_fetch(self):
+        """Test that concurrent lookups on a cold cache fetch only once"""
+        self.server.delay = 0.2
+        client = JwksClient(self.server.url, 'RS256')
+
+        keys = []
+        threads = [threading.Thread(
+            target=lambda: keys.append(client.get_key('first')))
+            for _ in range(10)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join(5)
+
+        self.assertEqual(self.server.requests, 1)
+        self.assertEqual(len(keys), 10)
+        self.assertTrue(all(key is not None for key in keys))
+
+    def test_warm_cache_does_not_block_when_server_is_down(self):
+        """Test that cached keys are still served if the server goes away"""
+        client = JwksClient(self.server.url, 'RS256')
+        client.get_key('first')
+        self.server.stop()
+
+        start = time.perf_counter()
+        self.assertIsNotNone(client.get_key('first'))
+        self.assertIsNone(client.get_key('unknown'))
+        self.assertLess(time.perf_counter() - start, 0.1)
+
+        # restart a server so tearDown has something to stop
+        self.server = StubKeyServer().start()
+
+    def test_cold_cache_does_not_refetch_when_server_is_down(self):
+        """
+        Test that a cold cache whose fetch failed returns None without
+        fetching again until min_refresh_interval has passed
+        """
+        clock = MockClock()
+        client = JwksClient(self.server.url, 'RS256',
+                            min_refresh_interval=5, clock=clock)
+        self.server.stop()
+
+        self.assertIsNone(client.get_key('first'))
+        self.assertIsNone(client.get_key('first'))
+        self.assertEqual(client.stats()['fetches'], 1)
+
+        # once the interval has passed the key set is fetched again
+        self.server = StubKeyServer().start()
+        self.server.set_keys({'first': self.first_key.public_key()})
+        client._jwks_url = self.server.url
+        clock.now += 5
+        self.assertIsNotNone(client.get_key('first'))
+        self.assertEqual(client.stats()['fetches'], 2)
+
+    def test_refresh_picks_up_rotated_key(self):
+        """Test that a refresh picks up newly published keys"""
+        client = JwksClient(self.server.url, 'RS256')
+        self.assertIsNone(client.get_key('second'))
+
+        self.server.set_keys({'first': self.first_key.public_key(),
+                              'second': self.second_key.public_key()})
+        client.refresh()
+        self.assertIsNotNone(client.get_key('second'))
+
+    def test_unchanged_key_set_is_revalidated(self):
+        """Test that an unchanged key set is answered with a 304"""
+        client = JwksClient(self.server.url, 'RS256')
+        client.refresh()
+        client.refresh()
+
+        self.assertEqual(self.server.not_modified, 1)
+        self.assertIsNotNone(client.get_key('first'))
+
+    def test_background_refresh_before_expiry(self):
+        """Test that the background thread refreshes before keys expire"""
+        self.server.max_age = 1
+        client = JwksClient(self.server.url, 'RS256', refresh_ahead=0.5,
+                            min_refresh_interval=0.1)
+        client.start()
+
+        deadline = time.time() + 5
+        while self.server.requests < 2 and time.time() < deadline:
+            time.sleep(0.05)
+
+        self.assertGreaterEqual(self.server.requests, 2)
+
+
+if __name__ == '__main__':
+    unittest.main(verbosity=2)
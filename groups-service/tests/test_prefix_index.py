@@ -0,0 +1,102 @@
+import unittest
+from utils.prefix_index import PrefixIndex
+
+
+class TestPrefixIndex(unittest.TestCase):
+    """Test PrefixIndex Class"""
+
+    def setUp(self):
+        self.index = PrefixIndex()
+        for name in ('Python', 'pytorch', 'PYPY', 'pandas', 'rust', 'py'):
+            self.index.add(name)
+
+    def test_prefix_matches_ignore_case(self):
+        """Test that names match a prefix in any case, in order"""
+        self.assertEqual(self.index.search('py', 10),
+                         ['py', 'PYPY', 'Python', 'pytorch'])
+        self.assertEqual(self.index.search('PYT', 10), ['Python', 'pytorch'])
+
+    def test_no_matches(self):
+        """Test that a prefix nothing starts with finds nothing"""
+        self.assertEqual(self.index.search('go', 10), [])
+        self.assertEqual(self.index.search('rusty', 10), [])
+
+    def test_limit_cuts_off_results(self):
+        """Test that at most limit names are returned"""
+        self.assertEqual(self.index.search('p', 2), ['pandas', 'py'])
+        self.assertEqual(self.index.search('p', 0), [])
+
+    def test_add_and_remove_are_idempotent(self):
+        """Test that adding or removing a name twice has no extra effect"""
+        self.index.add('rust')
+        self.assertEqual(self.index.search('rust', 10), ['rust'])
+        self.assertEqual(self.index.size(), 6)
+
+        self.index.remove('rust')
+        self.index.remove('rust')
+        self.index.remove('missing')
+        self.assertEqual(self.index.search('rust', 10), [])
+        self.assertEqual(self.index.size(), 5)
+
+    def test_names_differing_in_case_are_kept_apart(self):
+        """Test that removing a name leaves names differing in case"""
+        self.index.add('RUST')
+        self.index.remove('rust')
+        self.assertEqual(self.index.search('rust', 10), ['RUST'])
+
+    def test_rebuild_replaces_names(self):
+        """Test that a rebuild keeps only the loaded names"""
+        self.index.rebuild(lambda: ['go', 'gleam', 'go'])
+
+        self.assertEqual(self.index.search('g', 10), ['gleam', 'go'])
+        self.assertEqual(self.index.search('py', 10), [])
+        self.assertEqual(self.index.size(), 2)
+
+    def test_changes_during_rebuild_are_replayed(self):
+        """Test that names changed while loading survive the rebuild"""
+        def loadNames():
+            # another request changes the index while the scan runs
+            self.index.add('zig')
+            self.index.remove('gone')
+            return ['go', 'gone']
+
+        self.index.rebuild(loadNames)
+        self.assertEqual(self.index.search('', 10), ['go', 'zig'])
+
+    def test_failed_rebuild_keeps_names(self):
+        """Test that the index is unchanged when loading fails"""
+        def loadNames():
+            self.index.add('zig')
+            raise Exception('scan failed')
+
+        with self.assertRaises(Exception):
+            self.index.rebuild(loadNames)
+
+        self.assertEqual(self.index.search('zig', 10), ['zig'])
+        self.assertEqual(self.index.size(), 7)
+        # later changes are no longer recorded for a rebuild
+        self.assertIsNone(self.index._changes)
+
+    def test_background_build_retries_failed_loads(self):
+        """Test that the index is built once loading names succeeds"""
+        calls = []
+
+        def loadNames():
+            calls.append(None)
+            if len(calls) == 1:
+                raise Exception('scan failed')
+            return ['go', 'gleam']
+
+        self.index.start_build(loadNames, retry_interval=0.01)
+
+        self.assertTrue(self.index.wait_until_built(5))
+        self.assertEqual(self.index.search('g', 10), ['gleam', 'go'])
+
+        # without an interval the table is not scanned again
+        self.index._builder.join(5)
+        self.assertFalse(self.index._builder.is_alive())
+        self.assertEqual(len(calls), 2)
+
+
+if __name__ == '__main__':
+    unittest.main(verbosity=2)
@@ -0,0 +1,457 @@
+import unittest
+from unittest import mock
+from concurrent.futures import ThreadPoolExecutor
+from botocore.exceptions import ClientError
+from mock_tables import MockTables
+from utils.cache import ReadThroughCache
+import db.queries as queries
+
+
+def throttled(operation):
+    """helper function to build the error DynamoDB raises when throttled"""
+    return ClientError(
+        {'Error': {'Code': 'ProvisionedThroughputExceededException'}},
+        operation)
+
+
+class QueriesTestCase(unittest.TestCase):
+    """
+    Base class for tests against mocked tables. Every test starts with
+    empty tables and an empty group cache
+    """
+
+    def setUp(self):
+        self.tables = MockTables().start()
+        self.addCleanup(self.tables.stop)
+
+        cache = ReadThroughCache(queries._queryGetGroupByName)
+        patcher = mock.patch.object(queries, 'group_cache', cache)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+
+class TestGroupCache(QueriesTestCase):
+    """Test reading groups through the group cache"""
+
+    def test_group_is_read_through_the_cache(self):
+        """Test that a group is read from the table once"""
+        queries.queryCreateNewGroup('owner', 'python', 'snakes')
+
+        with mock.patch.object(queries.groups_table, 'get_item',
+                               wraps=queries.groups_table.get_item) as get_item:
+            self.assertEqual(
+                queries.queryGetGroupByName('python')['description'], 'snakes')
+            queries.queryGetGroupByName('python')
+            self.assertEqual(get_item.call_count, 1)
+
+    def test_failed_read_is_not_cached_as_missing(self):
+        """Test that a throttled read is not remembered as a missing group"""
+        queries.queryCreateNewGroup('owner', 'python', 'snakes')
+
+        with mock.patch.object(queries.groups_table, 'get_item',
+                               side_effect=throttled('GetItem')):
+            self.assertIsNone(queries.queryGetGroupByName('python'))
+
+        self.assertEqual(
+            queries.queryGetGroupByName('python')['groupName'], 'python')
+
+    def test_internal_attributes_are_not_returned(self):
+        """Test that only the attributes meant for users are returned"""
+        queries.queryCreateNewGroup('owner', 'python', 'snakes')
+        self.tables.groups_table.update_item(
+            Key={'groupName': 'python'},
+            UpdateExpression='SET deletedAt = :now',
+            ExpressionAttributeValues={':now': 1000})
+
+        group = queries.queryGetGroupByName('python')
+        self.assertNotIn('listingPartition', group)
+        self.assertNotIn('deletedAt', group)
+        self.assertEqual(group['memberCount'], 1)
+        self.assertIsInstance(group['lastActivityAt'], int)
+
+    def test_missing_group_is_none(self):
+        """Test that a group that does not exist is None"""
+        self.assertIsNone(queries.queryGetGroupByName('missing'))
+
+
+class UnprocessedOnce:
+    """
+    Helper class wrapping batch_get_item so the first requests return every
+    key as unprocessed
+    """
+
+    def __init__(self, batch_get_item, times=1):
+        self.batch_get_item = batch_get_item
+        self.times = times
+        self.calls = 0
+
+    def __call__(self, RequestItems):
+        self.calls += 1
+        if self.calls <= self.times:
+            return {'Responses': {}, 'UnprocessedKeys': RequestItems}
+        return self.batch_get_item(RequestItems=RequestItems)
+
+
+@mock.patch('db.queries.time.sleep')
+class TestBatchLookups(QueriesTestCase):
+    """Test looking up several groups and memberships at once"""
+
+    def setUp(self):
+        super().setUp()
+        with self.tables.groups_table.batch_writer() as batch:
+            for number in range(150):
+                batch.put_item(Item={'groupName': f'group-{number}',
+                                     'memberCount': 1})
+        with self.tables.members_table.batch_writer() as batch:
+            for number in range(0, 150, 2):
+                batch.put_item(Item={'groupName': f'group-{number}',
+                                     'userId': 'member'})
+
+    def patch_batch_get_item(self, **kwargs):
+        """helper function to count or change the BatchGetItem calls"""
+        wrapper = UnprocessedOnce(
+            queries.dynamodb_client.batch_get_item, **kwargs)
+        patcher = mock.patch.object(
+            queries.dynamodb_client, 'batch_get_item', side_effect=wrapper)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        return wrapper
+
+    def test_groups_are_deduplicated_and_chunked(self, sleep):
+        """Test that 150 distinct names are read with two requests"""
+        batch_get_item = self.patch_batch_get_item(times=0)
+        names = [f'group-{number}' for number in range(150)] + \
+            ['group-0', 'group-1', 'missing']
+
+        groups = queries.queryGetGroupsByNames(names)
+        self.assertEqual(len(groups), 151)
+        self.assertEqual(groups['group-149']['memberCount'], 1)
+        self.assertIsNone(groups['missing'])
+        self.assertEqual(batch_get_item.calls, 2)
+
+        # the groups are cached now
+        queries.queryGetGroupsByNames(names)
+        self.assertEqual(batch_get_item.calls, 2)
+
+    def test_memberships_are_deduplicated_and_chunked(self, sleep):
+        """Test that memberships of 150 groups are read with two requests"""
+        batch_get_item = self.patch_batch_get_item(times=0)
+        names = [f'group-{number}' for number in range(150)] * 2
+
+        memberships = queries.queryLookupMemberships(names, 'member')
+        self.assertEqual(memberships,
+                         {f'group-{number}' for number in range(0, 150, 2)})
+        self.assertEqual(batch_get_item.calls, 2)
+
+    def test_unprocessed_keys_are_retried(self, sleep):
+        """Test that keys DynamoDB did not process are requested again"""
+        self.patch_batch_get_item(times=2)
+
+        memberships = queries.queryLookupMemberships(
+            ['group-0', 'group-1'], 'member')
+        self.assertEqual(memberships, {'group-0'})
+        self.assertEqual(sleep.call_count, 2)
+
+    def test_lookup_fails_when_retries_run_out(self, sleep):
+        """Test that keys that are never processed fail the lookup"""
+        batch_get_item = self.patch_batch_get_item(times=100)
+
+        self.assertIsNone(queries.queryGetGroupsByNames(['group-0']))
+        self.assertIsNone(queries.queryLookupMemberships(['group-0'], 'member'))
+        self.assertEqual(batch_get_item.calls, 10)
+
+        # the failed read was not cached as a missing group
+        batch_get_item.times = 0
+        groups = queries.queryGetGroupsByNames(['group-0'])
+        self.assertEqual(groups['group-0']['groupName'], 'group-0')
+
+
+class TestChangeMemberships(QueriesTestCase):
+    """Test joining and leaving several groups in one batch"""
+
+    def setUp(self):
+        super().setUp()
+        # moto undoes a cancelled transaction by restoring the tables, which
+        # can drop writes made by other threads at the same time
+        executor = ThreadPoolExecutor(max_workers=1)
+        self.addCleanup(executor.shutdown)
+        patcher = mock.patch.object(queries, 'membership_executor', executor)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+        for groupName in ('joined', 'member', 'left', 'other'):
+            queries.queryCreateNewGroup('owner', groupName, 'description')
+        queries.queryCreateNewGroupMembership('member', 'user')
+        queries.queryCreateNewGroupMembership('left', 'user')
+
+    def memberCount(self, groupName):
+        """helper function to read the member count of a group"""
+        return self.tables.groups_table.get_item(
+            Key={'groupName': groupName})['Item']['memberCount']
+
+    def isMember(self, groupName):
+        """helper function to check both membership tables agree"""
+        member = 'Item' in self.tables.members_table.get_item(
+            Key={'groupName': groupName, 'userId': 'user'})
+        indexed = 'Item' in self.tables.user_groups_table.get_item(
+            Key={'userId': 'user', 'groupName': groupName})
+        self.assertEqual(member, indexed)
+        return member
+
+    def test_mixed_batch_reports_every_outcome(self):
+        """Test the outcome of every join and leave in one batch"""
+        results = queries.queryChangeMemberships(
+            'user',
+            ['joined', 'member', 'missing', 'joined'],
+            ['left', 'other', 'missing'])
+
+        self.assertEqual(results, {
+            'join': {
+                'joined': 'joined',
+                'member': 'already a member',
+                'missing': 'group not found',
+            },
+            'leave': {
+                'left': 'left',
+                'other': 'not a member',
+                'missing': 'not a member',
+            },
+        })
+
+    def test_counts_follow_the_changes(self):
+        """Test that only successful changes update the member counts"""
+        queries.queryChangeMemberships(
+            'user', ['joined', 'member'], ['left', 'other'])
+
+        self.assertEqual(self.memberCount('joined'), 2)
+        self.assertEqual(self.memberCount('member'), 2)
+        self.assertEqual(self.memberCount('left'), 1)
+        self.assertEqual(self.memberCount('other'), 1)
+
+        self.assertTrue(self.isMember('joined'))
+        self.assertTrue(self.isMember('member'))
+        self.assertFalse(self.isMember('left'))
+        self.assertFalse(self.isMember('other'))
+
+    def test_leaving_a_deleted_group(self):
+        """Test that a membership of a deleted group can still be left"""
+        self.tables.groups_table.delete_item(Key={'groupName': 'member'})
+
+        results = queries.queryChangeMemberships('user', [], ['member'])
+        self.assertEqual(results['leave'], {'member': 'left'})
+        self.assertFalse(self.isMember('member'))
+
+
+class TestDeleteGroup(QueriesTestCase):
+    """Test deleting a group along with its memberships"""
+
+    def setUp(self):
+        super().setUp()
+        queries.queryCreateNewGroup('owner', 'python', 'snakes')
+        queries.queryCreateNewGroupMembership('python', 'user')
+
+    def memberships(self, groupName):
+        """helper function to get the members listed in both tables"""
+        return tuple(
+            {item['userId'] for item in table.scan()['Items']
+             if item['groupName'] == groupName}
+            for table in (self.tables.members_table,
+                          self.tables.user_groups_table))
+
+    def test_memberships_are_deleted_with_the_group(self):
+        """Test that no membership of a deleted group is left behind"""
+        self.assertTrue(queries.queryDeleteGroupWithName('python', 'owner'))
+
+        self.assertIsNone(queries.queryGetGroupByName('python'))
+        self.assertEqual(self.memberships('python'), (set(), set()))
+        self.assertEqual(queries.queryGetUsersGroups('user'), ([], None))
+
+    def test_recreated_group_starts_without_members(self):
+        """Test that a group with a reused name does not inherit members"""
+        queries.queryDeleteGroupWithName('python', 'owner')
+        queries.queryCreateNewGroup('other', 'python', 'the language')
+
+        self.assertEqual(queries.queryGetGroupByName('python')['memberCount'], 1)
+        self.assertEqual(self.memberships('python'), ({'other'}, {'other'}))
+
+    def test_only_the_creator_can_delete(self):
+        """Test that a delete by another user keeps the memberships"""
+        with self.assertRaises(queries.NotGroupCreatorError):
+            queries.queryDeleteGroupWithName('python', 'user')
+        with self.assertRaises(queries.GroupNotFoundError):
+            queries.queryDeleteGroupWithName('missing', 'owner')
+
+        self.assertEqual(self.memberships('python'),
+                         ({'owner', 'user'}, {'owner', 'user'}))
+
+    def test_interrupted_delete_blocks_the_name_until_retried(self):
+        """
+        Test that a group whose memberships could not be deleted cannot be
+        joined or recreated, and that retrying the delete finishes it
+        """
+        with mock.patch.object(queries, 'queryDeleteGroupMemberships',
+                               side_effect=throttled('Query')):
+            self.assertFalse(queries.queryDeleteGroupWithName('python', 'owner'))
+
+        with self.assertRaises(queries.GroupNotFoundError):
+            queries.queryCreateNewGroupMembership('python', 'late')
+        with self.assertRaises(queries.GroupAlreadyExistsError):
+            queries.queryCreateNewGroup('other', 'python', 'the language')
+
+        self.assertTrue(queries.queryDeleteGroupWithName('python', 'owner'))
+        self.assertEqual(self.memberships('python'), (set(), set()))
+
+
+class TestUpdateGroup(QueriesTestCase):
+    """Test updating the description of a group"""
+
+    def setUp(self):
+        super().setUp()
+        queries.queryCreateNewGroup('owner', 'python', 'snakes')
+
+    def test_creator_can_update(self):
+        """Test that the creator's update is seen through the cache"""
+        queries.queryGetGroupByName('python')
+
+        self.assertTrue(queries.queryUpdateGroup('python', 'the language',
+                                                 'owner'))
+        self.assertEqual(queries.queryGetGroupByName('python')['description'],
+                         'the language')
+
+    def test_only_the_creator_can_update(self):
+        """Test that an update by another user is rejected"""
+        with self.assertRaises(queries.NotGroupCreatorError):
+            queries.queryUpdateGroup('python', 'the language', 'user')
+
+        self.assertEqual(queries.queryGetGroupByName('python')['description'],
+                         'snakes')
+
+    def test_missing_group_is_not_created(self):
+        """Test that updating a missing group does not create it"""
+        with self.assertRaises(queries.GroupNotFoundError):
+            queries.queryUpdateGroup('missing', 'description', 'owner')
+
+        self.assertIsNone(queries.queryGetGroupByName('missing'))
+
+
+class TestGroupListing(QueriesTestCase):
+    """Test listing groups ordered over the sharded listing partitions"""
+
+    def setUp(self):
+        super().setUp()
+        for count in range(1, 13):
+            groupName = f'group-{count}'
+            self.tables.groups_table.put_item(Item={
+                'groupName': groupName,
+                'memberCount': count,
+                'lastActivityAt': 1000 - count,
+                'listingPartition': queries.listingPartitionFor(groupName),
+            })
+
+    def list_all(self, orderBy, limit):
+        """helper function to read every page of a listing"""
+        pages = []
+        position = None
+        while True:
+            groups, position = queries.queryGetGroupsOrderedPaginated(
+                orderBy, position, limit)
+            self.assertIsNotNone(groups)
+            pages.append([group['groupName'] for group in groups])
+            if position is None:
+                return pages
+
+    def test_groups_are_spread_over_partitions(self):
+        """Test that groups do not all share one listing partition"""
+        partitions = {queries.listingPartitionFor(f'group-{count}')
+                      for count in range(1, 13)}
+        self.assertGreater(len(partitions), 1)
+        self.assertLessEqual(partitions, set(queries.LISTING_PARTITIONS))
+
+    def test_pages_are_merged_in_order(self):
+        """Test that every group is listed once, most members first"""
+        pages = self.list_all('members', 5)
+
+        self.assertEqual([len(page) for page in pages], [5, 5, 2])
+        names = [name for page in pages for name in page]
+        self.assertEqual(names, [f'group-{count}'
+                                 for count in range(12, 0, -1)])
+
+    def test_listed_groups_have_no_internal_attributes(self):
+        """Test that listed groups do not include their partition"""
+        groups, _ = queries.queryGetGroupsOrderedPaginated('members', None, 20)
+
+        self.assertEqual(len(groups), 12)
+        for group in groups:
+            self.assertNotIn('listingPartition', group)
+
+    def test_activity_order(self):
+        """Test that groups can be listed by most recent activity"""
+        names = [name for page in self.list_all('activity', 20)
+                 for name in page]
+        self.assertEqual(names, [f'group-{count}' for count in range(1, 13)])
+
+    def test_member_count_updates_keep_partition(self):
+        """Test that joining a group changes its count in its partition"""
+        queries.queryCreateNewGroupMembership('group-1', 'member')
+        group = self.tables.groups_table.get_item(
+            Key={'groupName': 'group-1'})['Item']
+
+        self.assertEqual(group['memberCount'], 2)
+        self.assertEqual(group['listingPartition'],
+                         queries.listingPartitionFor('group-1'))
+
+
+class TestUsersGroups(QueriesTestCase):
+    """Test paging through the groups a user is a member of"""
+
+    def setUp(self):
+        super().setUp()
+        for count in range(7):
+            self.tables.user_groups_table.put_item(Item={
+                'userId': 'user', 'groupName': f'group-{count}'})
+        self.tables.user_groups_table.put_item(Item={
+            'userId': 'other', 'groupName': 'other-group'})
+
+    def test_pages_continue_after_last_name(self):
+        """Test that every group is listed once across the pages"""
+        pages = []
+        lastEvaluatedName = None
+        while True:
+            groups, lastEvaluatedName = queries.queryGetUsersGroups(
+                'user', lastEvaluatedName, 3)
+            pages.append([group['groupName'] for group in groups])
+            if lastEvaluatedName is None:
+                break
+            self.assertEqual(lastEvaluatedName, pages[-1][-1])
+
+        self.assertEqual([len(page) for page in pages], [3, 3, 1])
+        self.assertEqual([name for page in pages for name in page],
+                         [f'group-{count}' for count in range(7)])
+
+    def test_every_group_without_limit(self):
+        """Test that every group is returned on one page without a limit"""
+        groups, lastEvaluatedName = queries.queryGetUsersGroups('user')
+
+        self.assertEqual(len(groups), 7)
+        self.assertIsNone(lastEvaluatedName)
+
+    def test_short_table_pages_are_filled(self):
+        """Test that pages cut short by DynamoDB are read until full"""
+        query = queries.user_groups_table.query
+
+        def shortPages(**kwargs):
+            kwargs['Limit'] = min(kwargs.get('Limit', 2), 2)
+            return query(**kwargs)
+
+        with mock.patch.object(queries.user_groups_table, 'query',
+                               side_effect=shortPages):
+            groups, lastEvaluatedName = queries.queryGetUsersGroups(
+                'user', 'group-0', 5)
+
+        self.assertEqual([group['groupName'] for group in groups],
+                         [f'group-{count}' for count in range(1, 6)])
+        self.assertEqual(lastEvaluatedName, 'group-5')
+
+
+if __name__ == '__main__':
+    unittest.main(verbosity=2)
@@ -0,0 +1,259 @@
+from collections import OrderedDict
+import threading
+import time
+
+
+class _Load:
+    """
+    A load of one key that other callers asking for the same key wait on
+    """
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.value = None
+        self.error = None
+
+
+class ReadThroughCache:
+    """
+    Bounded, thread-safe LRU cache that loads missing entries with the
+    given loader function. Concurrent misses for the same key share a
+    single load. Entries are fresh for ttl seconds, and for stale_ttl more
+    seconds a stale entry is returned right away while it is reloaded in
+    the background. A None result is cached for negative_ttl seconds.
+    """
+
+    def __init__(self, loader, ttl: float = 60, stale_ttl: float = 0,
+                 negative_ttl: float = 5, max_size: int = 10000,
+                 clock=time.time):
+        self._loader = loader
+        self._ttl = ttl
+        self._stale_ttl = stale_ttl
+        self._negative_ttl = negative_ttl
+        self._max_size = max(int(max_size), 1)
+        self._clock = clock
+
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()
+        self._loads = {}
+        # [generation, loaders] of every key that is being loaded. The
+        # generation is bumped when the key is invalidated so loads that
+        # started before do not store what may be an outdated value
+        self._loading = {}
+
+        self._hits = 0
+        self._stale_hits = 0
+        self._misses = 0
+        self._coalesced = 0
+
+    def get(self, key):
+        """
+        Method to get the value for the given key, loading it if it is not
+        cached or has expired
+        """
+        now = self._clock()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                value, freshUntil, staleUntil = entry
+                if now < freshUntil:
+                    self._entries.move_to_end(key)
+                    self._hits += 1
+                    return value
+
+                if now < staleUntil:
+                    self._entries.move_to_end(key)
+                    self._stale_hits += 1
+                    if key not in self._loads:
+                        load = self._loads[key] = _Load()
+                        threading.Thread(
+                            target=self._load,
+                            args=(key, load, self._start_load(key)),
+                            daemon=True).start()
+                    return value
+
+            load = self._loads.get(key)
+            if load is None:
+                self._misses += 1
+                load = self._loads[key] = _Load()
+                generation = self._start_load(key)
+            else:
+                self._coalesced += 1
+                generation = None
+
+        if generation is None:
+            load.done.wait()
+        else:
+            self._load(key, load, generation)
+
+        if load.error is not None:
+            raise load.error
+        return load.value
+
+    def _load(self, key, load: _Load, generation: int):
+        """
+        Method to call the loader for key and cache its result unless the
+        key was invalidated while it was loading
+        """
+        try:
+            load.value = self._loader(key)
+        except Exception as e:
+            load.error = e
+
+        with self._lock:
+            self._loads.pop(key, None)
+            if self._finish_load(key, generation) and load.error is None:
+                self._store(key, load.value, self._clock())
+                self._evict()
+
+        load.done.set()
+
+    def _start_load(self, key) -> int:
+        """
+        Method to register a load of key and get the generation to pass to
+        _finish_load. Must be called holding the lock
+        """
+        loading = self._loading.setdefault(key, [0, 0])
+        loading[1] += 1
+        return loading[0]
+
+    def _finish_load(self, key, generation: int) -> bool:
+        """
+        Method to unregister a load of key, returning whether the key was
+        not invalidated since the load started. Must be called holding the
+        lock
+        """
+        loading = self._loading[key]
+        loading[1] -= 1
+        if not loading[1]:
+            del self._loading[key]
+        return generation == loading[0]
+
+    def _store(self, key, value, now: float):
+        """
+        Method to cache a loaded value. Must be called holding the lock
+        """
+        if value is None:
+            freshUntil = staleUntil = now + self._negative_ttl
+        else:
+            freshUntil = now + self._ttl
+            staleUntil = freshUntil + self._stale_ttl
+
+        self._entries[key] = (value, freshUntil, staleUntil)
+        self._entries.move_to_end(key)
+
+    def _evict(self):
+        """
+        Method to drop the least recently used entries above max_size. Must
+        be called holding the lock
+        """
+        while len(self._entries) > self._max_size:
+            self._entries.popitem(last=False)
+
+    def _load_many(self, keys, loads, generations, load_many):
+        """
+        Method to reload several stale keys with one load_many call and
+        cache the results of the keys that were not invalidated meanwhile
+        """
+        loaded, error = None, None
+        try:
+            loaded = load_many(keys)
+        except Exception as e:
+            error = e
+
+        with self._lock:
+            now = self._clock()
+            for key, load, generation in zip(keys, loads, generations):
+                self._loads.pop(key, None)
+                isCurrent = self._finish_load(key, generation)
+                if error is not None:
+                    load.error = error
+                    continue
+
+                load.value = loaded.get(key)
+                if isCurrent:
+                    self._store(key, load.value, now)
+            self._evict()
+
+        for load in loads:
+            load.done.set()
+
+    def get_many(self, keys, load_many):
+        """
+        Method to get the values for several keys at once. Keys that are
+        not cached are loaded together with load_many, which must return a
+        dict of the values it found. Stale keys are returned right away and
+        reloaded together in the background. Returns a dict with a value
+        for every key, which is None for keys without a value
+        """
+        values = {}
+        missing = []
+        stale = []
+        now = self._clock()
+        with self._lock:
+            for key in dict.fromkeys(keys):
+                entry = self._entries.get(key)
+                if entry is not None and now < entry[2]:
+                    self._entries.move_to_end(key)
+                    if now < entry[1]:
+                        self._hits += 1
+                    else:
+                        self._stale_hits += 1
+                        if key not in self._loads:
+                            stale.append(key)
+                    values[key] = entry[0]
+                else:
+                    self._misses += 1
+                    missing.append(key)
+            generations = {key: self._start_load(key)
+                           for key in stale + missing}
+
+            if stale:
+                loads = [_Load() for _ in stale]
+                self._loads.update(zip(stale, loads))
+                threading.Thread(
+                    target=self._load_many,
+                    args=(stale, loads, [generations[key] for key in stale],
+                          load_many),
+                    daemon=True).start()
+
+        if not missing:
+            return values
+
+        loaded = None
+        try:
+            loaded = load_many(missing)
+        finally:
+            with self._lock:
+                now = self._clock()
+                for key in missing:
+                    isCurrent = self._finish_load(key, generations[key])
+                    if loaded is None:
+                        continue
+
+                    value = values[key] = loaded.get(key)
+                    if isCurrent:
+                        self._store(key, value, now)
+                self._evict()
+
+        return values
+
+    def invalidate(self, key):
+        """Method to drop the cached value for the given key"""
+        with self._lock:
+            loading = self._loading.get(key)
+            if loading is not None:
+                loading[0] += 1
+            self._entries.pop(key, None)
+
+    def stats(self) -> dict:
+        """Method to get the cache counters"""
+        with self._lock:
+            return {
+                'size': len(self._entries),
+                'maxSize': self._max_size,
+                'hits': self._hits,
+                'staleHits': self._stale_hits,
+                'misses': self._misses,
+                'coalesced': self._coalesced,
+            }
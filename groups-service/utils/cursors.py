@@ -0,0 +1,76 @@
+from base64 import urlsafe_b64decode, urlsafe_b64encode
+from decimal import Decimal
+import hashlib
+import hmac
+import json
+import os
+import secrets
+
+
+# cursors are signed so clients cannot hand us arbitrary start keys. Every
+# instance must share the key for cursors to work across instances, so a
+# random key is only a fallback for running a single instance locally
+signing_key = (os.environ.get('CURSOR_SIGNING_KEY') or
+               secrets.token_hex(32)).encode()
+
+
+# marks a Decimal stored in a cursor as a string
+DECIMAL_TAG = '$decimal'
+
+
+def _sign(data: bytes) -> bytes:
+    """helper function to compute the signature of a cursor"""
+    return hmac.new(signing_key, data, hashlib.sha256).digest()
+
+
+def _toJsonNumber(value):
+    """
+    helper function to store the Decimal numbers of index keys in a cursor.
+    Numbers with a fraction are stored as strings so they are read back as
+    the exact same Decimal, since boto3 does not accept floats
+    """
+    if isinstance(value, Decimal):
+        if value == value.to_integral_value():
+            return int(value)
+        return {DECIMAL_TAG: str(value)}
+    raise TypeError(f'cannot store {type(value).__name__} in a cursor')
+
+
+def _fromJsonObject(value: dict):
+    """helper function to read back the numbers stored by _toJsonNumber"""
+    if list(value) == [DECIMAL_TAG]:
+        return Decimal(value[DECIMAL_TAG])
+    return value
+
+
+def encodeCursor(lastEvaluatedKey):
+    """
+    Function to turn the LastEvaluatedKey of a query into an opaque
+    signed cursor. Returns None when there are no more pages
+    """
+    if not lastEvaluatedKey:
+        return None
+
+    data = json.dumps(lastEvaluatedKey, sort_keys=True,
+                      separators=(',', ':'), default=_toJsonNumber).encode()
+    return '.'.join(urlsafe_b64encode(part).decode().rstrip('=')
+                    for part in (data, _sign(data)))
+
+
+def decodeCursor(cursor: str):
+    """
+    Function to get the start key stored in a cursor created by
+    encodeCursor. Returns None if the cursor is malformed or its
+    signature does not match
+    """
+    try:
+        data, signature = (urlsafe_b64decode(part + '=' * (-len(part) % 4))
+                           for part in cursor.split('.'))
+        if not hmac.compare_digest(signature, _sign(data)):
+            return None
+
+        key = json.loads(data, object_hook=_fromJsonObject,
+                         parse_float=Decimal)
+        return key if isinstance(key, dict) else None
+    except Exception:
+        return None
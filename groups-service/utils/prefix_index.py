@@ -0,0 +1,132 @@
+from bisect import bisect_left
+import threading
+import time
+
+
+class PrefixIndex:
+    """
+    Thread-safe index of names kept in a sorted list so every name starting
+    with a prefix can be found with a binary search. Matching ignores case.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        # (lowercased name, name) pairs in sorted order
+        self._entries = []
+        # changes made while a rebuild is loading names, replayed on top of
+        # the loaded names so they are not lost
+        self._changes = None
+        self._builder = None
+        self._built = threading.Event()
+
+    def add(self, name: str):
+        """Method to add a name to the index"""
+        with self._lock:
+            self._add(name)
+            if self._changes is not None:
+                self._changes.append((self._add, name))
+
+    def remove(self, name: str):
+        """Method to remove a name from the index if it is in it"""
+        with self._lock:
+            self._remove(name)
+            if self._changes is not None:
+                self._changes.append((self._remove, name))
+
+    def _add(self, name: str):
+        """helper function to add a name. Must be called holding the lock"""
+        entry = (name.lower(), name)
+        index = bisect_left(self._entries, entry)
+        if index == len(self._entries) or self._entries[index] != entry:
+            self._entries.insert(index, entry)
+
+    def _remove(self, name: str):
+        """helper function to remove a name. Must be called holding the lock"""
+        entry = (name.lower(), name)
+        index = bisect_left(self._entries, entry)
+        if index < len(self._entries) and self._entries[index] == entry:
+            del self._entries[index]
+
+    def search(self, prefix: str, limit: int):
+        """
+        Method to get at most limit names starting with prefix in
+        alphabetical order
+        """
+        prefix = prefix.lower()
+        names = []
+        with self._lock:
+            index = bisect_left(self._entries, (prefix,))
+            while index < len(self._entries) and len(names) < limit:
+                key, name = self._entries[index]
+                if not key.startswith(prefix):
+                    break
+                names.append(name)
+                index += 1
+
+        return names
+
+    def rebuild(self, loadNames):
+        """
+        Method to replace the indexed names with the names returned by
+        loadNames. Names added or removed while loading are kept
+        """
+        with self._lock:
+            self._changes = []
+
+        try:
+            names = loadNames()
+        except Exception:
+            with self._lock:
+                self._changes = None
+            raise
+
+        entries = sorted((name.lower(), name) for name in set(names))
+
+        with self._lock:
+            changes, self._changes = self._changes, None
+            self._entries = entries
+            for change, name in changes:
+                change(name)
+        self._built.set()
+
+    def start_build(self, loadNames, interval: float = 0,
+                    retry_interval: float = 5):
+        """
+        Method to start a background thread that fills the index with the
+        names returned by loadNames, so starting up does not wait for it.
+        A failed load is retried every retry_interval seconds. Once built
+        the index is only rebuilt every interval seconds if interval is
+        positive, otherwise it is kept up to date by add and remove alone
+        """
+        if self._builder is not None:
+            return
+
+        def build():
+            wait = 0
+            while True:
+                time.sleep(wait)
+                try:
+                    self.rebuild(loadNames)
+                except Exception:
+                    wait = retry_interval
+                    continue
+
+                if interval <= 0:
+                    return
+                wait = interval
+
+        self._builder = threading.Thread(
+            target=build, name='prefix-index-build', daemon=True)
+        self._builder.start()
+
+    def wait_until_built(self, timeout: float = None) -> bool:
+        """
+        Method to wait for the first rebuild to finish, returning whether
+        it did within timeout seconds
+        """
+        return self._built.wait(timeout)
+
+    def size(self) -> int:
+        """Method to get the number of indexed names"""
+        with self._lock:
+            return len(self._entries)
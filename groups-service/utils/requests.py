@@ -31,6 +31,79 @@ def getCreateGroupFieldsFromRequest(request):
     return group
 
 
+def getGroupNamesFromRequest(request, maxGroupNames: int):
+    """
+    Function to retrieve a list of at most maxGroupNames group names
+    from the flask request
+    """
+    if request is None:
+        return None
+
+    body = request.get_json(force=True)
+    if not body or 'groupNames' not in body:
+        return None
+
+    groupNames = body['groupNames']
+    if not isinstance(groupNames, list) or len(groupNames) > maxGroupNames:
+        return None
+
+    if not all(isinstance(name, str) and name for name in groupNames):
+        return None
+
+    return groupNames
+
+
+def getMembershipChangesFromRequest(request, maxChanges: int):
+    """
+    Function to retrieve the lists of group names to join and to leave
+    from the flask request. At most maxChanges names may be given in total
+    and a group cannot be both joined and left
+    """
+    if request is None:
+        return None
+
+    body = request.get_json(force=True)
+    if not body or ('join' not in body and 'leave' not in body):
+        return None
+
+    changes = {}
+    for change in ('join', 'leave'):
+        groupNames = body.get(change, [])
+        if not isinstance(groupNames, list):
+            return None
+        if not all(isinstance(name, str) and name for name in groupNames):
+            return None
+        changes[change] = groupNames
+
+    if len(changes['join']) + len(changes['leave']) > maxChanges:
+        return None
+    if set(changes['join']) & set(changes['leave']):
+        return None
+
+    return changes
+
+
+def getLimitFromRequest(request, default: int, maxLimit: int):
+    """
+    Function to retrieve the page size from the limit query parameter of
+    the flask request, or default if it is not given. Returns None unless
+    the limit is a whole number between 1 and maxLimit
+    """
+    if request is None:
+        return None
+
+    limit = request.args.get('limit') or default
+    try:
+        limit = int(limit)
+    except (TypeError, ValueError):
+        return None
+
+    if not 0 < limit <= maxLimit:
+        return None
+
+    return limit
+
+
 def getAuthTokenFromRequestBody(request):
     body = request.get_json(force=True)
     if not body or 'token' not in body:
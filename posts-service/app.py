@@ -1,6 +1,7 @@
 from flask import Flask, request, make_response
 from flask_cors import CORS
 from middleware.tokens import authTokenRequired
+from utils.revocation import RevocationList, fetchRevocations
 from utils.requests import (
     getGroupNameFromRequestBody,
     getPostFromRequestBody,
@@ -35,6 +36,17 @@ import os
 
 # load environment variables
 groups_service_url = os.environ.get('GROUPS_SERVICE_URL')
+auth_service_url = os.environ.get('AUTH_SERVICE_URL')
+revocation_sync_interval = float(
+    os.environ.get('REVOCATION_SYNC_INTERVAL', 5))
+
+# keep a copy of the auth service's revoked token ids in memory
+access_token_lifetime = 60 * 20
+revocation_list = RevocationList(access_token_lifetime)
+if auth_service_url:
+    revocation_list.start_sync(
+        lambda since: fetchRevocations(auth_service_url, since),
+        revocation_sync_interval)
 
 # Create a new Flask app
 app = Flask(__name__)
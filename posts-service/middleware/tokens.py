@@ -1,5 +1,6 @@
 from flask import request
-from utils.tokens import getUserIdFromToken
+from utils.tokens import decodeToken
+from utils.revocation import RevocationList
 from utils.requests import getAuthTokenFromRequestBody
 import functools
 
@@ -26,10 +27,16 @@ def authTokenRequired(handler):
                 return {'error': 'missing auth token'}, 400
 
         # decode the token to get the user id
-        userId = getUserIdFromToken(token)
+        payload = decodeToken(token)
+        userId = payload.get('userId') if payload else None
         if not userId:
             return {'error': 'invalid auth token provided'}, 400
 
+        # check the token has not been revoked without a network call
+        revocation_list = RevocationList.get_instance()
+        if revocation_list.is_revoked(payload.get('tokenId')):
+            return {'error': 'auth token has been revoked'}, 400
+
         context['token'] = token
         context['userId'] = userId
 
@@ -0,0 +1,45 @@
+import time
+import unittest
+from unittest import mock
+import jwt
+from cryptography.hazmat.backends import default_backend
+from cryptography.hazmat.primitives.asymmetric import rsa
+from utils import tokens
+
+
+class TestDecodeToken(unittest.TestCase):
+    """Test verifying the tokens issued by the auth service"""
+
+    @classmethod
+    def setUpClass(cls):
+        cls.signing_key = rsa.generate_private_key(
+            backend=default_backend(), public_exponent=65537, key_size=2048)
+
+    def setUp(self):
+        for name, value in (('verifying_key', self.signing_key.public_key()),
+                            ('jwks_client', None)):
+            patcher = mock.patch.object(tokens, name, value)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    def createToken(self, tokenType):
+        """helper function to sign a token of the given type"""
+        return jwt.encode({'sub': 'user', 'jti': f'{tokenType}-token',
+                           'typ': tokenType, 'exp': int(time.time()) + 600},
+                          self.signing_key, algorithm='RS256')
+
+    def test_access_token_is_accepted(self):
+        """Test that an access token is decoded into its payload"""
+        payload = tokens.decodeToken(self.createToken('access'))
+        self.assertEqual(payload['userId'], 'user')
+        self.assertEqual(payload['tokenType'], 'access')
+
+    def test_refresh_token_is_rejected(self):
+        """Test that a refresh token cannot be used as an access token"""
+        self.assertIsNone(tokens.decodeToken(self.createToken('refresh')))
+        self.assertIsNone(
+            tokens.getUserIdFromToken(self.createToken('refresh')))
+
+
+if __name__ == '__main__':
+    unittest.main(verbosity=2)
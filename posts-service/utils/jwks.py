@@ -0,0 +1,152 @@
+from jwt.algorithms import get_default_algorithms
+from urllib.error import HTTPError
+from urllib.request import Request, urlopen
+import json
+import re
+import threading
+import time
+
+
+class JwksClient:
+    """
+    Client that fetches the auth service's JSON Web Key Set and caches
+    the keys by key id. Keys are refreshed by a background thread before
+    they expire, so once the cache is warm looking up a key never waits
+    on the network. If a refresh fails the previous keys are kept.
+    """
+
+    def __init__(self, jwks_url: str, algorithm: str, ttl: float = 300,
+                 refresh_ahead: float = 30, min_refresh_interval: float = 5,
+                 timeout: float = 5, clock=time.time):
+        self._jwks_url = jwks_url
+        self._algorithm = get_default_algorithms()[algorithm]
+        self._ttl = ttl
+        self._refresh_ahead = refresh_ahead
+        self._min_refresh_interval = min_refresh_interval
+        self._timeout = timeout
+        self._clock = clock
+
+        self._keys = {}
+        self._etag = None
+        self._expires_at = 0
+        self._last_fetch_at = 0
+        self._fetches = 0
+
+        self._fetch_lock = threading.Lock()
+        self._wake_up = threading.Event()
+        self._refresher = None
+
+    def _fetch(self):
+        """
+        Method to download the key set, sending the ETag of the cached copy
+        so an unchanged key set only costs a 304 response
+        """
+        request = Request(self._jwks_url)
+        if self._etag:
+            request.add_header('If-None-Match', self._etag)
+
+        self._fetches += 1
+        self._last_fetch_at = self._clock()
+        try:
+            with urlopen(request, timeout=self._timeout) as res:
+                body = json.loads(res.read())
+                headers = res.headers
+        except HTTPError as e:
+            if e.code != 304:
+                raise
+            headers = e.headers
+        else:
+            keys = {}
+            for jwk in body.get('keys', []):
+                if 'kid' in jwk:
+                    keys[jwk['kid']] = self._algorithm.from_jwk(
+                        json.dumps(jwk))
+            self._keys = keys
+            self._etag = headers.get('ETag')
+
+        # honour the lifetime the server gave the key set
+        ttl = self._ttl
+        match = re.search(r'max-age=(\d+)', headers.get('Cache-Control', ''))
+        if match:
+            ttl = int(match.group(1))
+        self._expires_at = self._clock() + ttl
+
+    def refresh(self):
+        """
+        Method to fetch the key set. Concurrent callers are collapsed into a
+        single fetch: anyone arriving while a fetch is running waits for it
+        and uses its result
+        """
+        if not self._fetch_lock.acquire(blocking=False):
+            with self._fetch_lock:
+                return
+
+        try:
+            self._fetch()
+        finally:
+            self._fetch_lock.release()
+
+    def _run_refresher(self):
+        """
+        Method run by the background thread to refresh the key set shortly
+        before it expires, or early when an unknown key id is seen
+        """
+        while True:
+            try:
+                self.refresh()
+            except Exception:
+                pass
+
+            wait = self._min_refresh_interval
+            if self._keys:
+                wait = self._expires_at - self._refresh_ahead - self._clock()
+            self._wake_up.wait(max(wait, 0))
+            self._wake_up.clear()
+
+            # never fetch more often than once every min_refresh_interval
+            time.sleep(max(self._last_fetch_at + self._min_refresh_interval
+                           - self._clock(), 0))
+
+    def start(self):
+        """Method to start the background refresh thread"""
+        if self._refresher is not None:
+            return
+
+        self._refresher = threading.Thread(
+            target=self._run_refresher, name='jwks-refresh', daemon=True)
+        self._refresher.start()
+
+    def get_key(self, key_id: str):
+        """
+        Method to get the public key with the given key id. Only a cold
+        cache fetches the key set on the calling thread; afterwards an
+        unknown key id returns None right away and asks the background
+        thread to refresh early. A cold cache also returns None right away
+        if a fetch finished less than min_refresh_interval ago, so requests
+        do not each wait on an auth service that is down
+        """
+        if not self._keys:
+            # a fetch that is still running is waited for by refresh
+            recently_fetched = self._clock() - self._last_fetch_at \
+                < self._min_refresh_interval
+            if recently_fetched and not self._fetch_lock.locked():
+                return None
+
+            try:
+                self.refresh()
+            except Exception:
+                return None
+
+        key = self._keys.get(key_id)
+        if key is None and self._refresher is not None:
+            self._wake_up.set()
+
+        return key
+
+    def stats(self) -> dict:
+        """Method to get the state of the key cache"""
+        return {
+            'keys': len(self._keys),
+            'fetches': self._fetches,
+            'expiresAt': self._expires_at,
+        }
@@ -1,22 +1,84 @@
 import jwt
+from cryptography.hazmat.backends import default_backend
+from cryptography.hazmat.primitives import serialization
 from dotenv import dotenv_values
+from utils.jwks import JwksClient
+import json
 import os
 
 
 public_key = os.environ.get('TOKEN_PUBLIC_KEY')
+algorithm = os.environ.get('TOKEN_ALGORITHM', 'RS256')
 
+# parse the public key once so it is not rebuilt for every verification
+verifying_key = None
+if public_key is not None:
+    verifying_key = serialization.load_pem_public_key(
+        public_key.encode(), backend=default_backend())
 
-def getUserIdFromToken(token):
+# fetch verifying keys from the auth service so keys can be rotated
+# without redeploying. TOKEN_PUBLIC_KEY is only used as a fallback
+auth_service_url = os.environ.get('AUTH_SERVICE_URL')
+jwks_client = None
+if auth_service_url:
+    jwks_client = JwksClient(f'{auth_service_url}/jwks', algorithm)
+    jwks_client.start()
+
+# short claim names the auth service stores payload keys under
+PAYLOAD_KEYS = {
+    'sub': 'userId',
+    'jti': 'tokenId',
+    'typ': 'tokenType',
+    'ati': 'accessTokenId',
+}
+
+
+def getVerifyingKey(token):
     """
-    Function to decode and return the Id of a user contained in
-    a JSON Web Token
+    Function to get the public key that should verify the given token
+    based on the key id in its header
+    """
+    if jwks_client is None:
+        return verifying_key
+
+    key_id = jwt.get_unverified_header(token).get('kid')
+    key = jwks_client.get_key(key_id) if key_id else None
+    return key or verifying_key
+
+
+def decodeToken(token):
+    """
+    Function to verify an access token and return the payload the auth
+    service stored in it. Older tokens keep the payload as a JSON string
+    in the 'payload' claim instead of flat claims. Refresh tokens are
+    rejected since they are never revoked when a user logs out
     """
     try:
-        payload = jwt.decode(
-            token, public_key.encode(), algorithms=["RS256"])
-        if not payload or 'id' not in payload:
+        claims = jwt.decode(
+            token, getVerifyingKey(token), algorithms=[algorithm])
+        if not claims:
             return None
 
-        return payload['id']
+        if 'payload' in claims:
+            payload = json.loads(claims['payload'])
+        else:
+            payload = {PAYLOAD_KEYS.get(claim, claim): value
+                       for claim, value in claims.items() if claim != 'exp'}
+
+        if payload.get('tokenType') != 'access':
+            return None
+        return payload
     except Exception:
         return None
+
+
+def getUserIdFromToken(token):
+    """
+    Function to decode and return the Id of a user contained in
+    a JSON Web Token
+    """
+    payload = decodeToken(token)
+    if not payload or 'userId' not in payload:
+        return None
+
+    return payload['userId']
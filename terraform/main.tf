@@ -81,6 +81,8 @@ resource "aws_iam_role" "ec2_role" {
             "dynamodb:Query",
             "dynamodb:Scan",
             "dynamodb:GetItem",
+            "dynamodb:BatchGetItem",
+            "dynamodb:BatchWriteItem",
             "dynamodb:PutItem",
             "dynamodb:UpdateItem",
             "dynamodb:DeleteItem"
@@ -670,6 +672,10 @@ resource "aws_ecs_task_definition" "auth_service" {
           {
             "containerPath": "/usr/local/apache2/htdocs",
             "sourceVolume": "my-vol"
+          },
+          {
+            "containerPath": "/var/lib/auth-service",
+            "sourceVolume": "auth-service-state"
           }
         ],
         "portMappings": [
@@ -679,9 +685,14 @@ resource "aws_ecs_task_definition" "auth_service" {
         ],
         "environment": [
           ${jsonencode(var.ENV_USER_TABLE_NAME)},
+          ${jsonencode(var.ENV_USER_PROFILES_TABLE_NAME)},
           ${jsonencode(var.ENV_TOKEN_TABLE_NAME)},
           ${jsonencode(var.ENV_TOKEN_PUBLIC_KEY)},
           ${jsonencode(var.ENV_TOKEN_PRIVATE_KEY)},
+          ${jsonencode(var.ENV_INTROSPECTION_SECRET)},
+          ${jsonencode(var.ENV_TOKEN_ALGORITHM)},
+          ${jsonencode(var.ENV_TRUSTED_PROXY_HOPS)},
+          ${jsonencode(var.ENV_BCRYPT_CALIBRATION_FILE)},
           ${jsonencode(var.ENV_AWS_REGION)}
         ]
       }
@@ -690,6 +701,13 @@ resource "aws_ecs_task_definition" "auth_service" {
   volume {
     name = "my-vol"
   }
+
+  // host directory that keeps the bcrypt calibration across task restarts,
+  // so only the first task started on an instance measures the CPU
+  volume {
+    name      = "auth-service-state"
+    host_path = "/var/lib/auth-service"
+  }
 }
 
 // create a service for the groups service
@@ -731,9 +749,16 @@ resource "aws_ecs_task_definition" "groups_service" {
         }
       ],
       "environment": [
+        {
+          "name": "AUTH_SERVICE_URL",
+          "value": "http://${aws_lb.load_balancer.dns_name}/api/v1/auth"
+        },
         ${jsonencode(var.ENV_GROUPS_TABLE_NAME)},
         ${jsonencode(var.ENV_MEMBERS_TABLE_NAME)},
+        ${jsonencode(var.ENV_USER_GROUPS_TABLE_NAME)},
+        ${jsonencode(var.ENV_CURSOR_SIGNING_KEY)},
         ${jsonencode(var.ENV_TOKEN_PUBLIC_KEY)},
+        ${jsonencode(var.ENV_TOKEN_ALGORITHM)},
         ${jsonencode(var.ENV_AWS_REGION)}
       ]
     }
@@ -742,6 +767,7 @@ resource "aws_ecs_task_definition" "groups_service" {
   volume {
     name = "my-vol"
   }
+  depends_on = [aws_lb.load_balancer]
 }
 
 // create a service for the posts service
@@ -787,11 +813,16 @@ resource "aws_ecs_task_definition" "posts_service" {
           "name": "GROUPS_SERVICE_URL",
           "value": "http://${aws_lb.load_balancer.dns_name}/api/v1/groups"
         },
+        {
+          "name": "AUTH_SERVICE_URL",
+          "value": "http://${aws_lb.load_balancer.dns_name}/api/v1/auth"
+        },
         ${jsonencode(var.ENV_POSTS_TABLE_NAME)},
         ${jsonencode(var.ENV_RESPONSES_TABLE_NAME)},
         ${jsonencode(var.ENV_DOWNVOTES_TABLE_NAME)},
         ${jsonencode(var.ENV_UPVOTES_TABLE_NAME)},
         ${jsonencode(var.ENV_TOKEN_PUBLIC_KEY)},
+        ${jsonencode(var.ENV_TOKEN_ALGORITHM)},
         ${jsonencode(var.ENV_AWS_REGION)}
       ]
     }
@@ -945,18 +976,64 @@ resource "aws_appautoscaling_policy" "posts_ecs_service_cpu_scale_out_policy" {
 #   }
 # }
 
+# resource "aws_dynamodb_table" "user_profiles_table" {
+#   name           = var.ENV_USER_PROFILES_TABLE_NAME.value
+#   billing_mode   = "PROVISIONED"
+#   read_capacity  = 20
+#   write_capacity = 20
+#   hash_key       = "userId"
+
+#   attribute {
+#     name = "userId"
+#     type = "S"
+#   }
+
+#   tags = {
+#     Name        = "user profiles table"
+#     Environment = "production"
+#   }
+# }
+
 # resource "aws_dynamodb_table" "tokens_table" {
 #   name           = var.ENV_TOKEN_TABLE_NAME.value
 #   billing_mode   = "PROVISIONED"
 #   read_capacity  = 20
 #   write_capacity = 20
 #   hash_key       = "userId"
+#   range_key      = "tokenId"
 
 #   attribute {
 #     name = "userId"
 #     type = "S"
 #   }
 
+#   attribute {
+#     name = "tokenId"
+#     type = "S"
+#   }
+
+#   attribute {
+#     name = "revokedAt"
+#     type = "N"
+#   }
+
+#   # only revocations have a revokedAt attribute, so this index holds just
+#   # the '#revoked#<shard>' partitions and lets instances fetch new revocations
+#   global_secondary_index {
+#     name               = "revokedAtIndex"
+#     hash_key           = "userId"
+#     range_key          = "revokedAt"
+#     read_capacity      = 20
+#     write_capacity     = 20
+#     projection_type    = "INCLUDE"
+#     non_key_attributes = ["expiresAt"]
+#   }
+
+#   ttl {
+#     attribute_name = "expiresAt"
+#     enabled        = true
+#   }
+
 #   tags = {
 #     Name        = "tokens table"
 #     Environment = "production"
@@ -975,6 +1052,39 @@ resource "aws_appautoscaling_policy" "posts_ecs_service_cpu_scale_out_policy" {
 #     type = "S"
 #   }
 
+#   attribute {
+#     name = "listingPartition"
+#     type = "S"
+#   }
+
+#   attribute {
+#     name = "memberCount"
+#     type = "N"
+#   }
+
+#   attribute {
+#     name = "lastActivityAt"
+#     type = "N"
+#   }
+
+#   global_secondary_index {
+#     name            = "memberCountIndex"
+#     hash_key        = "listingPartition"
+#     range_key       = "memberCount"
+#     read_capacity   = 20
+#     write_capacity  = 20
+#     projection_type = "ALL"
+#   }
+
+#   global_secondary_index {
+#     name            = "lastActivityIndex"
+#     hash_key        = "listingPartition"
+#     range_key       = "lastActivityAt"
+#     read_capacity   = 20
+#     write_capacity  = 20
+#     projection_type = "ALL"
+#   }
+
 #   tags = {
 #     Name        = "groups table"
 #     Environment = "production"
@@ -1005,6 +1115,30 @@ resource "aws_appautoscaling_policy" "posts_ecs_service_cpu_scale_out_policy" {
 #   }
 # }
 
+# resource "aws_dynamodb_table" "user_groups_table" {
+#   name           = var.ENV_USER_GROUPS_TABLE_NAME.value
+#   billing_mode   = "PROVISIONED"
+#   read_capacity  = 20
+#   write_capacity = 20
+#   hash_key       = "userId"
+#   range_key       = "groupName"
+
+#   attribute {
+#     name = "userId"
+#     type = "S"
+#   }
+
+#   attribute {
+#     name = "groupName"
+#     type = "S"
+#   }
+
+#   tags = {
+#     Name        = "user groups table"
+#     Environment = "production"
+#   }
+# }
+
 # resource "aws_dynamodb_table" "posts_table" {
 #   name           = var.ENV_POSTS_TABLE_NAME.value
 #   billing_mode   = "PROVISIONED"
@@ -69,6 +69,13 @@ variable "ENV_USER_TABLE_NAME" {
     })
 }
 
+variable "ENV_USER_PROFILES_TABLE_NAME" {
+    type = object({
+        name = string
+        value = string
+    })
+}
+
 variable "ENV_TOKEN_TABLE_NAME" {
     type = object({
         name = string
@@ -90,6 +97,20 @@ variable "ENV_MEMBERS_TABLE_NAME" {
     })
 }
 
+variable "ENV_USER_GROUPS_TABLE_NAME" {
+    type = object({
+        name = string
+        value = string
+    })
+}
+
+variable "ENV_CURSOR_SIGNING_KEY" {
+    type = object({
+        name = string
+        value = string
+    })
+}
+
 variable "ENV_POSTS_TABLE_NAME" {
     type = object({
         name = string
@@ -142,3 +163,48 @@ variable "ENV_TOKEN_PRIVATE_KEY" {
     })
     sensitive = true
 }
+
+variable "ENV_INTROSPECTION_SECRET" {
+    description = "Environment variable for the secret other services send to introspect auth tokens"
+    type = object({
+        name = string
+        value = string
+    })
+    sensitive = true
+}
+
+variable "ENV_TOKEN_ALGORITHM" {
+    description = "Environment variable for the algorithm used to sign auth tokens (RS256, ES256 or EdDSA)"
+    type = object({
+        name = string
+        value = string
+    })
+    default = {
+        name = "TOKEN_ALGORITHM"
+        value = "RS256"
+    }
+}
+
+variable "ENV_TRUSTED_PROXY_HOPS" {
+    description = "Environment variable for the number of proxies in front of the auth service whose X-Forwarded-For entries are trusted"
+    type = object({
+        name = string
+        value = string
+    })
+    default = {
+        name = "TRUSTED_PROXY_HOPS"
+        value = "1"
+    }
+}
+
+variable "ENV_BCRYPT_CALIBRATION_FILE" {
+    description = "Environment variable for the file the bcrypt calibration is cached in. It must be on the auth-service-state host volume so it outlives the container"
+    type = object({
+        name = string
+        value = string
+    })
+    default = {
+        name = "BCRYPT_CALIBRATION_FILE"
+        value = "/var/lib/auth-service/bcrypt_calibration.json"
+    }
+}